@@ -1,19 +1,30 @@
-from flask import Flask
+from flask import Flask, send_from_directory
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
-from utils.database import db
+from utils.database import check_dialects, db
+from utils.json_provider import FastJSONProvider
+from utils.metrics import init_metrics
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.json = FastJSONProvider(app)  # orjson when installed
+    
+    # Client address and scheme from the trusted proxies' X-Forwarded-* headers
+    if app.config['TRUSTED_PROXIES']:
+        hops = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
     
     # Initialize extensions
     db.init_app(app)
+    check_dialects(app)
     jwt = JWTManager(app)
     mail = Mail(app)
     CORS(app, origins=["http://localhost:3000"])  # Next.js frontend
+    init_metrics(app, db)  # served at /api/admin/metrics
     
     # Register blueprints
     from routes.auth import auth_bp
@@ -28,15 +39,29 @@ def create_app():
     app.register_blueprint(users_bp, url_prefix='/api/users')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
     
+    # flask CLI commands
+    from commands import register_commands
+    register_commands(app)
+    
+    # Listen for order events from boot so Last-Event-ID replay covers every
+    # event this worker could have seen, not just those after its first stream
+    if app.config['ORDER_EVENTS_TRANSPORT'] == 'postgres':
+        from utils.order_events import order_events
+        with app.app_context():
+            order_events.start()
+    
+    # Serve images written by the local storage backend
+    if app.config['IMAGE_STORAGE_BACKEND'] == 'local':
+        @app.route(f"{app.config['LOCAL_STORAGE_URL'].rstrip('/')}/<path:filename>")
+        def local_upload(filename):
+            return send_from_directory(app.config['LOCAL_STORAGE_DIR'], filename)
+    
     #just root server is running msg
     @app.route('/')
     def index():
         return 'E-commerce Backend is running!'
-
-    # Create tables
-    with app.app_context():
-        db.create_all()
     
+    # The schema is created by `flask db upgrade`, not on every boot
     return app
 
 if __name__ == '__main__':
@@ -0,0 +1,86 @@
+"""
+Menu latency during a login flood, with and without admission control
+
+    python -m benchmarks.bench_admission --flood 16 --duration 5
+    python -m benchmarks.bench_admission --database-url postgresql://localhost/fastfood_bench
+
+Flood threads hammer POST /api/auth/login while a probe thread reads
+GET /api/products/ every --probe-ms. Runs once with no limits, once with
+the auth concurrency cap and once with the cap plus the login rate
+limits, and reports the probe's latency and what the flood got back.
+"""
+import threading
+import time
+from collections import Counter
+from benchmarks.common import make_app, parse_args, print_table, seed_menu, seed_users, summarize
+
+def run(app, flood, duration, probe_interval):
+    stop = threading.Event()
+    statuses = Counter()
+    probes = []
+
+    def flooder(index):
+        client = app.test_client()
+        # Each thread is its own client address, as a botnet would be
+        environ = {'REMOTE_ADDR': f'10.0.{index // 250}.{index % 250 + 1}'}
+        while not stop.is_set():
+            response = client.post('/api/auth/login', json={'email': 'user0@example.com', 'password': 'wrong'},
+                                   environ_base=environ)
+            statuses[response.status_code] += 1
+
+    def prober():
+        client = app.test_client()
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = client.get('/api/products/?limit=20')
+            response.get_data()
+            probes.append(time.perf_counter() - start)
+            assert response.status_code == 200
+            time.sleep(probe_interval)
+
+    threads = [threading.Thread(target=flooder, args=(i,)) for i in range(flood)] + [threading.Thread(target=prober)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return summarize(probes), statuses
+
+def main():
+    args = parse_args(
+        __doc__,
+        flood={'type': int, 'default': 16},
+        duration={'type': float, 'default': 5.0},
+        probe_ms={'type': float, 'default': 20.0},
+        cap={'type': int, 'default': 2},
+        method={'default': 'pbkdf2:sha256:100000'},
+        hash_workers={'type': int, 'default': 0},
+    )
+    app = make_app(args.database_url, args.latency_ms, PASSWORD_HASH_METHOD=args.method,
+                   PASSWORD_HASH_WORKERS=args.hash_workers, MENU_CACHE_TTL=0)
+    with app.app_context():
+        seed_users(1)
+        seed_menu()
+
+    from utils.rate_limit import MemoryBuckets, rate_limiter
+
+    modes = [
+        ('no limits', {'CONCURRENCY_AUTH': 0, 'RATE_LIMIT_ENABLED': False}),
+        (f'auth cap {args.cap}', {'CONCURRENCY_AUTH': args.cap, 'RATE_LIMIT_ENABLED': False}),
+        (f'auth cap {args.cap} + rate limits', {'CONCURRENCY_AUTH': args.cap, 'RATE_LIMIT_ENABLED': True}),
+    ]
+    rows = []
+    for name, config in modes:
+        app.config.update(config)
+        rate_limiter.memory = MemoryBuckets()
+        probe, statuses = run(app, args.flood, args.duration, args.probe_ms / 1000)
+        rows.append((name, f"{probe['p50_ms']:.1f}", f"{probe['p99_ms']:.1f}", probe['n'],
+                     statuses[401], statuses[503], statuses[429]))
+
+    print(f'{args.flood} flood threads for {args.duration:.0f}s, {args.method}, '
+          f'{args.hash_workers or "inline"} hash workers')
+    print_table(('mode', 'menu p50 ms', 'menu p99 ms', 'menu reads', 'logins run', '503', '429'), rows)
+
+if __name__ == '__main__':
+    main()
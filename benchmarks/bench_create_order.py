@@ -0,0 +1,51 @@
+"""
+Order creation latency against cart size
+
+    python -m benchmarks.bench_create_order --latency-ms 5
+
+Products for a cart are resolved in a single query, so only the inserts
+scale with the cart. SQLite issues one INSERT per item while psycopg2 on
+Postgres batches them, so run against Postgres to see the full effect.
+"""
+import time
+from benchmarks.common import (QueryCounter, auth_header, make_app, parse_args,
+                               print_table, seed_menu, seed_users, summarize)
+
+def main():
+    args = parse_args(
+        __doc__,
+        cart_sizes={'default': '1,5,15,30,60'},
+        repeat={'type': int, 'default': 50},
+    )
+    app = make_app(args.database_url, args.latency_ms)
+
+    from utils.database import db
+    with app.app_context():
+        user_id = seed_users()[0]
+        product_ids = seed_menu(products=100)
+        counter = QueryCounter(db.engine)
+    headers = auth_header(app, user_id)
+    client = app.test_client()
+
+    rows = []
+    for size in [int(s) for s in args.cart_sizes.split(',')]:
+        payload = {
+            'items': [{'product_id': product_ids[i % len(product_ids)], 'quantity': 1} for i in range(size)],
+            'delivery_address': '1 Bench Street',
+            'phone': '555-0100',
+        }
+        samples = []
+        counter.reset()
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            response = client.post('/api/orders/', json=payload, headers=headers)
+            samples.append(time.perf_counter() - start)
+            assert response.status_code == 201, response.get_json()
+        stats = summarize(samples)
+        rows.append((size, f"{stats['mean_ms']:.2f}", f"{stats['p50_ms']:.2f}",
+                     f"{stats['p95_ms']:.2f}", f'{counter.reset() / args.repeat:.1f}'))
+
+    print_table(('cart', 'mean ms', 'p50 ms', 'p95 ms', 'queries/order'), rows)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Local image preprocessing against shipping the raw upload
+
+    python -m benchmarks.bench_image_preprocess --uplink-mbps 20
+
+Builds a synthetic phone-sized photo and compares, per output format, the
+bytes sent upstream and the estimated upload time at the given uplink. It
+also times preprocess_image with JPEG draft decoding against a naive full
+decode and resize.
+"""
+import io
+import time
+from PIL import Image, ImageFilter, ImageOps
+from benchmarks.common import parse_args, print_table
+
+def make_photo(width, height, quality=92):
+    """A noisy, blurred gradient compresses roughly like a real photo"""
+    noise = Image.effect_noise((width // 4, height // 4), 64).resize((width, height))
+    gradient = Image.linear_gradient('L').resize((width, height))
+    image = Image.merge('RGB', (noise, gradient, ImageOps.invert(noise))).filter(ImageFilter.GaussianBlur(1))
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=quality, exif=Image.Exif().tobytes())
+    return output.getvalue()
+
+def naive_preprocess(data, max_size=(800, 600), image_format='webp', quality=80):
+    """Full-resolution decode followed by a single resample"""
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGB')
+        image.thumbnail(max_size, Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format=image_format.upper(), quality=quality)
+        return output.getvalue()
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+def main():
+    args = parse_args(
+        __doc__,
+        width={'type': int, 'default': 4032},
+        height={'type': int, 'default': 3024},
+        uplink_mbps={'type': float, 'default': 20.0},
+        repeat={'type': int, 'default': 5},
+    )
+    from utils.cloudinary_service import preprocess_image
+
+    raw = make_photo(args.width, args.height)
+    bytes_per_ms = args.uplink_mbps * 1_000_000 / 8 / 1000
+
+    rows = [('raw upload', len(raw), '-', f'{len(raw) / bytes_per_ms:.0f}', '1.0x')]
+    for image_format in ('webp', 'jpeg'):
+        result = preprocess_image(io.BytesIO(raw), image_format=image_format)
+        sent = len(result['image']) + len(result['thumbnail'])
+        elapsed = best_of(lambda: preprocess_image(io.BytesIO(raw), image_format=image_format), args.repeat)
+        naive = best_of(lambda: naive_preprocess(raw, image_format=image_format), args.repeat)
+        rows.append((
+            f'{image_format} + thumb',
+            sent,
+            f'{elapsed:.1f} (naive {naive:.1f})',
+            f'{elapsed + sent / bytes_per_ms:.0f}',
+            f'{len(raw) / sent:.1f}x',
+        ))
+
+    print(f'source: {args.width}x{args.height} JPEG, uplink {args.uplink_mbps} Mbit/s')
+    print_table(('variant', 'bytes sent', 'preprocess ms', 'total ms', 'reduction'), rows)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+List endpoint serialization: ORM + to_dict() + json versus column rows + orjson
+
+    python -m benchmarks.bench_list_serialization --products 2000 --orders 1000
+    python -m benchmarks.bench_list_serialization --database-url postgresql://localhost/fastfood_bench
+
+For each list payload, times the previous path (hydrated entities,
+to_dict() and the stdlib encoder) against the column-tuple queries in
+utils/list_queries.py with the stdlib and then the orjson encoder. Then
+times whole requests through the test client with the menu cache
+disabled, under each encoder.
+"""
+import json
+import random
+import time
+from benchmarks.common import auth_header, make_app, parse_args, print_table, seed_users, summarize
+
+def seed(products, orders, seed_value=3):
+    """Menu plus orders of three items each for one customer; returns the customer id"""
+    from models.order import Order, OrderItem
+    from models.product import Category, Product
+    from utils.database import db
+
+    rng = random.Random(seed_value)
+    customer = seed_users(1, prefix='customer')[0]
+    db.session.execute(db.insert(Category), [
+        {'id': i, 'name': f'Category {i}', 'description': f'Everything {i}'} for i in range(1, 21)
+    ])
+    db.session.execute(db.insert(Product), [
+        {'id': i, 'name': f'Product {i}', 'description': f'Tasty item number {i}', 'price': round(rng.uniform(2, 15), 2),
+         'image_url': f'https://res.cloudinary.com/demo/image/upload/fastfood-app/{i}.webp',
+         'category_id': i % 20 + 1}
+        for i in range(1, products + 1)
+    ])
+    db.session.execute(db.insert(Order), [
+        {'id': i, 'user_id': customer, 'total_amount': 24.5, 'status': 'pending',
+         'delivery_address': '1 Main Street', 'phone': '555-0100', 'notes': 'No onions'}
+        for i in range(1, orders + 1)
+    ])
+    db.session.execute(db.insert(OrderItem), [
+        {'order_id': i, 'product_id': rng.randint(1, products), 'quantity': rng.randint(1, 3), 'price': 8.0}
+        for i in range(1, orders + 1) for _ in range(3)
+    ])
+    db.session.commit()
+    return customer
+
+def encoder(app, use_orjson):
+    """The app's JSON provider pinned to one encoder, with jsonify's compact output"""
+    def dumps(payload):
+        app.json.use_orjson = use_orjson
+        return app.json.dumps_bytes(payload, separators=(',', ':'))
+    return dumps
+
+def timed(fn, repeat):
+    from utils.database import db
+
+    samples = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def main():
+    args = parse_args(
+        __doc__,
+        products={'type': int, 'default': 2000},
+        orders={'type': int, 'default': 1000},
+        repeat={'type': int, 'default': 30},
+    )
+    app = make_app(args.database_url, args.latency_ms, MENU_CACHE_TTL=0)
+
+    from models.order import Order
+    from models.product import Category, Product
+    from utils.list_queries import category_dicts, order_dicts, order_query, product_query, row_dicts
+
+    with app.app_context():
+        customer = seed(args.products, args.orders)
+
+    payloads = [
+        # (name, previous builder, column-row builder)
+        ('products', lambda: [p.to_dict() for p in Product.query.filter_by(is_available=True)],
+         lambda: row_dicts(product_query().filter_by(is_available=True))),
+        ('categories', lambda: [c.to_dict() for c in Category.query.all()], category_dicts),
+        ('orders', lambda: [o.to_dict() for o in Order.query.options(Order.with_items())
+                            .filter_by(user_id=customer).order_by(Order.created_at.desc())],
+         lambda: order_dicts(order_query().filter_by(user_id=customer).order_by(Order.created_at.desc()).all())),
+        ('orders, page of 50', lambda: [o.to_dict() for o in Order.query.options(Order.with_items())
+                                        .order_by(Order.created_at.desc(), Order.id.desc()).limit(50)],
+         lambda: order_dicts(order_query().order_by(Order.created_at.desc(), Order.id.desc()).limit(50).all())),
+    ]
+
+    rows = []
+    with app.app_context():
+        stdlib, fast = encoder(app, False), encoder(app, True)
+        for name, previous, columns in payloads:
+            assert json.loads(stdlib(previous())) == json.loads(fast(columns())), name
+            baseline = None
+            for label, fn in (('orm + to_dict + json', lambda: stdlib(previous())),
+                              ('columns + json', lambda: stdlib(columns())),
+                              ('columns + orjson', lambda: fast(columns()))):
+                p50 = timed(fn, args.repeat)['p50_ms']
+                baseline = baseline or p50
+                rows.append((name, label, f'{p50:.2f}', f'{baseline / p50:.1f}x'))
+
+    print(f'{args.products} products, {args.orders} orders x 3 items, {args.repeat} runs')
+    print_table(('payload', 'path', 'p50 ms', 'speedup'), rows)
+
+    headers = auth_header(app, customer)
+    client = app.test_client()
+    rows = []
+    for url in ('/api/products/', '/api/products/categories', '/api/orders/', '/api/orders/?limit=50'):
+        for name in ('stdlib', 'orjson'):
+            app.json.use_orjson = name == 'orjson'
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                response = client.get(url, headers=headers)
+                response.get_data()
+                samples.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.get_json()
+            stats = summarize(samples)
+            rows.append((url, name, f"{stats['p50_ms']:.2f}", f"{1000 / stats['mean_ms']:.0f}"))
+    print()
+    print_table(('endpoint', 'encoder', 'p50 ms', 'req/s'), rows)
+
+if __name__ == '__main__':
+    main()
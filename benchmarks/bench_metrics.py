@@ -0,0 +1,68 @@
+"""
+Per-request cost of the request, SQL and upstream metrics
+
+    python -m benchmarks.bench_metrics --requests 3000
+    python -m benchmarks.bench_metrics --database-url postgresql://localhost/fastfood_bench
+
+Replays a few read endpoints through the test client with METRICS_ENABLED
+on and off, alternating in rounds so drift hits both equally, and
+reports the difference per request. Ends with the time to render
+/api/admin/metrics once every route has series.
+"""
+import time
+from benchmarks.common import auth_header, make_app, parse_args, print_table, seed_menu, seed_users, summarize
+
+ENDPOINTS = (
+    ('menu page', '/api/products/?limit=20'),
+    ('product', '/api/products/1'),
+    ('categories', '/api/products/categories'),
+    ('own orders', '/api/orders/'),
+)
+
+def timed(client, url, headers, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        response.get_data()
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200, (url, response.status_code)
+    return samples
+
+def main():
+    args = parse_args(
+        __doc__,
+        requests={'type': int, 'default': 3000},
+        rounds={'type': int, 'default': 6},
+    )
+    app = make_app(args.database_url, args.latency_ms, MENU_CACHE_TTL=0)
+    with app.app_context():
+        admin = seed_users(1, admin=True, prefix='admin')[0]
+        customer = seed_users(1, prefix='customer')[0]
+        seed_menu()
+    headers = auth_header(app, customer)
+    client = app.test_client()
+    per_round = max(1, args.requests // args.rounds)
+
+    rows = []
+    for name, url in ENDPOINTS:
+        samples = {True: [], False: []}
+        timed(client, url, headers, 50)
+        for _ in range(args.rounds):
+            for enabled in (False, True):
+                app.config['METRICS_ENABLED'] = enabled
+                samples[enabled].extend(timed(client, url, headers, per_round))
+        off, on = summarize(samples[False]), summarize(samples[True])
+        rows.append((name, f"{off['p50_ms']:.3f}", f"{on['p50_ms']:.3f}",
+                     f"{(on['mean_ms'] - off['mean_ms']) * 1000:+.1f}",
+                     f"{(on['mean_ms'] / off['mean_ms'] - 1) * 100:+.1f}%"))
+    print_table(('endpoint', 'off p50 ms', 'on p50 ms', 'mean delta us', 'overhead'), rows)
+
+    app.config['METRICS_ENABLED'] = True
+    admin_headers = auth_header(app, admin)
+    render = summarize(timed(client, '/api/admin/metrics', admin_headers, 200))
+    print(f"GET /api/admin/metrics: p50 {render['p50_ms']:.2f} ms, "
+          f"{len(client.get('/api/admin/metrics', headers=admin_headers).get_data())} bytes")
+
+if __name__ == '__main__':
+    main()
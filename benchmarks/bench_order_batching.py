@@ -0,0 +1,118 @@
+"""
+Order throughput with one commit per order versus group commit
+
+    python -m benchmarks.bench_order_batching --clients 32 --commit-ms 5
+    python -m benchmarks.bench_order_batching --database-url postgresql://localhost/fastfood_bench --latency-ms 2
+
+Client threads place orders back to back for --duration seconds, first
+through the direct path and then with ORDER_BATCHING at each of
+--batch-sizes. --commit-ms adds a fixed cost to every commit, standing in
+for the fsync and round trip to a remote primary, and --latency-ms one to
+every statement. Reports orders/s, latency and orders per commit, and
+checks every 201 left an order behind.
+"""
+import os
+import tempfile
+import threading
+import time
+from benchmarks.common import (auth_header, make_app, parse_args, print_table, seed_menu,
+                               seed_users, summarize)
+
+def run(app, headers, product_ids, clients, duration):
+    stop = threading.Event()
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+
+    def client_loop(index):
+        client = app.test_client()
+        mine, codes = [], {}
+        n = 0
+        while not stop.is_set():
+            n += 1
+            payload = {
+                'items': [{'product_id': product_ids[(index * 7 + n + i) % len(product_ids)], 'quantity': 1 + i % 2}
+                          for i in range(1 + n % 3)],
+                'delivery_address': '1 Bench Street',
+                'phone': '555-0100',
+            }
+            start = time.perf_counter()
+            response = client.post('/api/orders/', json=payload, headers=headers[index % len(headers)])
+            mine.append(time.perf_counter() - start)
+            codes[response.status_code] = codes.get(response.status_code, 0) + 1
+        with lock:
+            latencies.extend(mine)
+            for status, count in codes.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses
+
+def main():
+    args = parse_args(
+        __doc__,
+        clients={'type': int, 'default': 32},
+        duration={'type': float, 'default': 5.0},
+        batch_sizes={'default': '10,50'},
+        linger_ms={'type': float, 'default': 5.0},
+        commit_ms={'type': float, 'default': 5.0},
+    )
+    database_url = args.database_url
+    if database_url == 'sqlite:///:memory:':
+        # Client threads need their own connections, which :memory: cannot share
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='batching-'), 'bench.db')}"
+    app = make_app(database_url, args.latency_ms, CONCURRENCY_WRITE=0, METRICS_SLOW_REQUEST_MS=0)
+
+    from sqlalchemy import event
+    from models.order import Order
+    from utils.database import db
+
+    commits = [0]
+
+    with app.app_context():
+        user_ids = seed_users(min(args.clients, 50), prefix='customer')
+        product_ids = seed_menu(products=100)
+
+        @event.listens_for(db.engine, 'commit')
+        def _commit_cost(conn):
+            commits[0] += 1
+            if args.commit_ms:
+                time.sleep(args.commit_ms / 1000.0)
+
+    headers = [auth_header(app, user_id) for user_id in user_ids]
+
+    modes = [('one commit per order', {'ORDER_BATCHING': False})] + [
+        (f'batch {size}, linger {args.linger_ms:g}ms',
+         {'ORDER_BATCHING': True, 'ORDER_BATCH_SIZE': size, 'ORDER_BATCH_LINGER_MS': args.linger_ms})
+        for size in (int(s) for s in args.batch_sizes.split(','))
+    ]
+    rows = []
+    baseline = None
+    for name, config in modes:
+        app.config.update(config)
+        with app.app_context():
+            before = db.session.scalar(db.select(db.func.count(Order.id)))
+        commits[0] = 0
+        latencies, statuses = run(app, headers, product_ids, args.clients, args.duration)
+        with app.app_context():
+            stored = db.session.scalar(db.select(db.func.count(Order.id))) - before
+        created = statuses.get(201, 0)
+        assert stored == created, f'{name}: {created} orders answered 201 but {stored} stored'
+        summary = summarize(latencies)
+        throughput = created / args.duration
+        baseline = baseline or throughput
+        rows.append((name, f'{throughput:.0f}', f'{throughput / baseline:.1f}x', f"{summary['p50_ms']:.1f}",
+                     f"{summary['p99_ms']:.1f}", f'{created / max(commits[0], 1):.1f}',
+                     sum(count for status, count in statuses.items() if status != 201)))
+
+    print(f'{args.clients} clients for {args.duration:g}s, {args.commit_ms:g}ms per commit, '
+          f'{args.latency_ms:g}ms per statement')
+    print_table(('mode', 'orders/s', 'speedup', 'p50 ms', 'p99 ms', 'orders/commit', 'errors'), rows)
+
+if __name__ == '__main__':
+    main()
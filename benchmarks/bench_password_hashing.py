@@ -0,0 +1,64 @@
+"""
+Login throughput against password hashing pool size
+
+    python -m benchmarks.bench_password_hashing --pool-sizes 0,1,2,4 --concurrency 16
+
+Drives concurrent password checks through PasswordHasher, the same path
+POST /api/auth/login takes. For each pool size it also times a small
+CPU-bound request-handling stand-in on the calling process, to show how
+much the login storm slows everything else down.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.common import parse_args, print_table, summarize
+
+def busy_request():
+    """Roughly the CPU cost of serializing a small menu response"""
+    start = time.perf_counter()
+    sum(i * i for i in range(20000))
+    return time.perf_counter() - start
+
+def run(hasher, pwhash, logins, concurrency):
+    stop = threading.Event()
+    probe = []
+
+    def prober():
+        while not stop.is_set():
+            probe.append(busy_request())
+            time.sleep(0.005)
+
+    probe_thread = threading.Thread(target=prober)
+    probe_thread.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: hasher.verify(pwhash, 'password'), range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    probe_thread.join()
+    assert all(results)
+    return logins / elapsed, summarize(probe)
+
+def main():
+    args = parse_args(
+        __doc__,
+        pool_sizes={'default': '0,1,2,4'},
+        concurrency={'type': int, 'default': 16},
+        logins={'type': int, 'default': 64},
+        method={'default': 'pbkdf2:sha256:600000'},
+    )
+    from utils.password_hashing import PasswordHasher
+
+    rows = []
+    for workers in [int(n) for n in args.pool_sizes.split(',')]:
+        hasher = PasswordHasher(method=args.method, workers=workers, max_pending=args.logins)
+        pwhash = hasher.hash('password')  # also warms up the pool
+        rate, probe = run(hasher, pwhash, args.logins, args.concurrency)
+        hasher.shutdown()
+        rows.append((workers or 'inline', f'{rate:.1f}', f"{probe['p50_ms']:.2f}", f"{probe['p99_ms']:.2f}"))
+
+    print(f'{args.method}, {args.concurrency} concurrent clients, {args.logins} logins')
+    print_table(('pool', 'logins/s', 'other p50 ms', 'other p99 ms'), rows)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Product search latency at menu scale
+
+    python -m benchmarks.bench_product_search --products 100000
+    python -m benchmarks.bench_product_search --database-url postgresql://localhost/fastfood_bench
+
+Seeds a synthetic menu, builds the schema through the migrations (so the
+SQLite FTS5 table or the Postgres search indexes exist) and times
+GET /api/products/search for exact, prefix, misspelled and multi-word
+queries on each backend.
+"""
+import random
+import time
+from benchmarks.common import make_app, parse_args, print_table, summarize
+
+ADJECTIVES = ['spicy', 'crispy', 'smoky', 'classic', 'double', 'grilled', 'loaded', 'mini', 'giant', 'vegan',
+              'cheesy', 'honey', 'garlic', 'tangy', 'sweet', 'fiery', 'golden', 'rustic', 'creamy', 'zesty']
+FOODS = ['burger', 'chicken', 'wrap', 'fries', 'nuggets', 'salad', 'taco', 'burrito', 'pizza', 'sandwich',
+         'hotdog', 'milkshake', 'sundae', 'falafel', 'quesadilla', 'onion rings', 'coleslaw', 'brownie']
+EXTRAS = ['with bacon', 'with jalapenos', 'with avocado', 'with pickles', 'with mushrooms', 'with ranch',
+          'with chipotle mayo', 'with blue cheese', 'with caramelized onions', 'with sriracha']
+
+QUERIES = [
+    ('exact', 'burger'),
+    ('exact, 2 words', 'spicy chicken'),
+    ('prefix', 'quesa'),
+    ('typo', 'chiken'),
+    ('typo, 2 words', 'crsipy burgr'),
+    ('rare', 'caramelized brownie'),
+    ('no match', 'lasagna'),
+]
+
+def seed(count, seed_value=7):
+    from models.product import Category, Product
+    from utils.database import db
+
+    rng = random.Random(seed_value)
+    db.session.execute(db.insert(Category), [{'id': i, 'name': f'Category {i}'} for i in range(1, 13)])
+    for first in range(1, count + 1, 10000):
+        db.session.execute(db.insert(Product), [
+            {
+                'id': i,
+                'name': f'{rng.choice(ADJECTIVES).title()} {rng.choice(FOODS).title()} {i}',
+                'description': f'{rng.choice(ADJECTIVES)} {rng.choice(FOODS)} {rng.choice(EXTRAS)}',
+                'price': round(rng.uniform(2, 15), 2),
+                'is_available': rng.random() < 0.95,
+                'category_id': rng.randint(1, 12)
+            }
+            for i in range(first, min(first + 10000, count + 1))
+        ])
+    db.session.commit()
+
+def main():
+    args = parse_args(
+        __doc__,
+        products={'type': int, 'default': 100000},
+        repeat={'type': int, 'default': 50},
+        backends={'default': 'memory,auto'},
+    )
+    app = make_app(args.database_url, args.latency_ms, migrate=True)
+    with app.app_context():
+        seed(args.products)
+
+    from utils.product_search import get_search_backend
+    client = app.test_client()
+
+    rows = []
+    for backend in args.backends.split(','):
+        app.config['SEARCH_BACKEND'] = backend
+        with app.app_context():
+            name = type(get_search_backend()).__name__
+        start = time.perf_counter()
+        client.get('/api/products/search?q=warmup')  # builds the in-memory index
+        rows.append((name, 'first search', f'{(time.perf_counter() - start) * 1000:.1f}', '', '', ''))
+
+        for label, query in QUERIES:
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                response = client.get('/api/products/search', query_string={'q': query, 'limit': 20})
+                samples.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.get_json()
+            stats = summarize(samples)
+            rows.append((name, f'{label}: {query}', f"{stats['p50_ms']:.2f}", f"{stats['p95_ms']:.2f}",
+                         f"{stats['p99_ms']:.2f}", len(response.get_json()['products'])))
+
+    print(f'{args.products} products, {args.repeat} runs per query, page size 20')
+    print_table(('backend', 'query', 'p50 ms', 'p95 ms', 'p99 ms', 'hits'), rows)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Cold start: import time and time to first response
+
+    python -m benchmarks.bench_startup --runs 20
+    python -m benchmarks.bench_startup --database-url postgresql://localhost/fastfood_bench --importtime 15
+
+Each run starts a fresh interpreter, as a new worker or serverless
+instance would, and times importing the app, create_app() and the first
+request through the test client. The schema is created once up front,
+so the runs measure what a worker pays on boot and not migrations.
+--importtime re-runs one boot under `python -X importtime` and lists
+the slowest top-level imports.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.common import ROOT, make_app, parse_args, print_table
+
+# Modules only the image and upstream paths should load
+HEAVY_MODULES = ['cloudinary', 'PIL', 'requests', 'sqlalchemy.dialects.postgresql']
+
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get({path!r})
+response.get_data()
+responded = time.perf_counter()
+print(json.dumps({{
+    'import': imported - started,
+    'create_app': created - imported,
+    'first_response': responded - created,
+    'status': response.status_code,
+    'loaded': [name for name in {heavy!r} if name in sys.modules],
+}}))
+'''
+
+def child_env(database_url):
+    env = dict(os.environ, DATABASE_URL=database_url, PASSWORD_HASH_WORKERS='0')
+    env.pop('NEON_DATABASE_URL', None)
+    return env
+
+def boot(database_url, path):
+    """Boot the app in a fresh interpreter; returns its timings and the wall time"""
+    code = CHILD.format(root=ROOT, path=path, heavy=HEAVY_MODULES)
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', code], env=child_env(database_url), cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process'] = time.perf_counter() - started
+    return result
+
+def slowest_imports(database_url, path, count):
+    """Cumulative microseconds of the slowest top-level imports of one boot"""
+    code = CHILD.format(root=ROOT, path=path, heavy=HEAVY_MODULES)
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=child_env(database_url),
+                            cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the module that triggered them
+        if not name[1:].startswith(' '):
+            rows.append((name.strip(), int(cumulative)))
+    return sorted(rows, key=lambda row: -row[1])[:count]
+
+def main():
+    args = parse_args(
+        __doc__,
+        runs={'type': int, 'default': 10},
+        path={'default': '/api/products/categories', 'help': 'URL of the first request'},
+        importtime={'type': int, 'default': 0, 'help': 'list this many of the slowest imports'},
+    )
+    database_url = args.database_url
+    if database_url.endswith(':memory:'):
+        # Every run is a new process, so the schema has to live in a file
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'startup.db')
+    make_app(database_url, migrate=True)
+
+    runs = [boot(database_url, args.path) for _ in range(args.runs)]
+    assert all(run['status'] == 200 for run in runs), runs[-1]
+
+    rows = []
+    for stage in ('import', 'create_app', 'first_response', 'process'):
+        samples = sorted(run[stage] * 1000 for run in runs)
+        rows.append((stage, f'{samples[len(samples) // 2]:.1f}', f'{sum(samples) / len(samples):.1f}',
+                     f'{samples[-1]:.1f}'))
+    print(f'{args.runs} cold starts, first request GET {args.path}')
+    print_table(('stage', 'p50 ms', 'mean ms', 'max ms'), rows)
+    print('heavy modules loaded:', ', '.join(runs[-1]['loaded']) or 'none')
+
+    if args.importtime:
+        print()
+        print_table(('module', 'cumulative ms'),
+                    [(name, f'{micros / 1000:.1f}')
+                     for name, micros in slowest_imports(database_url, args.path, args.importtime)])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+Query-plan regression check for the hot list endpoints
+
+    python -m benchmarks.check_query_plans --orders 200000
+    python -m benchmarks.check_query_plans --database-url postgresql://localhost/fastfood_bench
+
+Builds the schema through the migrations, seeds a large dataset, then
+calls each endpoint through the test client while capturing the SQL it
+runs. Every captured SELECT is re-run under EXPLAIN (EXPLAIN QUERY PLAN on
+SQLite, EXPLAIN (FORMAT JSON) on Postgres). The check fails when a large
+table is read with a full scan, or when a newest-first listing needs an
+explicit sort instead of walking an index in order. Exits non-zero on
+any failure so it can gate CI.
+"""
+import json
+import random
+import re
+import sys
+from datetime import datetime, timedelta
+from benchmarks.common import auth_header, make_app, parse_args, print_table
+
+LARGE_TABLES = {'orders', 'order_items', 'products'}
+# Postgres may read the whole menu once to hash-join it against a page of
+# order items; only a filtered full scan of products is a regression
+HASHABLE_TABLES = {'products'}
+STATUSES = ['delivered'] * 92 + ['cancelled'] * 4 + ['pending', 'confirmed', 'preparing', 'ready']
+
+def seed(users, products, orders, seed_value=42):
+    """Bulk-insert a dataset through Core executemany; returns a heavy customer and an admin"""
+    from models.order import Order, OrderItem
+    from models.product import Category, Product
+    from models.user import User
+    from utils.database import db
+
+    rng = random.Random(seed_value)
+    start = datetime(2023, 1, 1)
+    span = int(timedelta(days=730).total_seconds())
+
+    db.session.execute(db.insert(User), [
+        {'id': i, 'email': f'user{i}@example.com', 'password_hash': 'x', 'first_name': 'Plan',
+         'last_name': str(i), 'is_admin': i == 1, 'created_at': start}
+        for i in range(1, users + 1)
+    ])
+    db.session.execute(db.insert(Category), [{'id': i, 'name': f'Category {i}'} for i in range(1, 21)])
+    db.session.execute(db.insert(Product), [
+        {'id': i, 'name': f'Product {i}', 'price': 5.0, 'category_id': i % 20 + 1,
+         'is_available': rng.random() < 0.9, 'created_at': start + timedelta(seconds=rng.randrange(span))}
+        for i in range(1, products + 1)
+    ])
+
+    item_id = 0
+    for first in range(1, orders + 1, 10000):
+        order_rows, item_rows = [], []
+        for order_id in range(first, min(first + 10000, orders + 1)):
+            # A tenth of the users place most of the orders
+            user_id = rng.randint(2, max(2, users // 10)) if rng.random() < 0.7 else rng.randint(2, users)
+            created_at = start + timedelta(seconds=rng.randrange(span))
+            order_rows.append({
+                'id': order_id, 'user_id': user_id, 'total_amount': 10.0, 'status': rng.choice(STATUSES),
+                'delivery_address': 'x', 'phone': '1', 'created_at': created_at, 'updated_at': created_at
+            })
+            for _ in range(rng.randint(1, 4)):
+                item_id += 1
+                item_rows.append({'id': item_id, 'order_id': order_id, 'product_id': rng.randint(1, products),
+                                  'quantity': 1, 'price': 5.0})
+        db.session.execute(db.insert(Order), order_rows)
+        db.session.execute(db.insert(OrderItem), item_rows)
+    db.session.commit()
+
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql('ANALYZE')
+        conn.commit()
+
+    heavy = db.session.execute(
+        db.select(Order.user_id).group_by(Order.user_id).order_by(db.func.count().desc()).limit(1)
+    ).scalar()
+    return heavy, 1
+
+def sqlite_problems(cursor, statement, parameters, ordered):
+    cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+    details = [row[-1] for row in cursor.fetchall()]
+    problems = []
+    for detail in details:
+        match = re.match(r'SCAN (\w+)$', detail)
+        if match and match.group(1) in LARGE_TABLES:
+            problems.append(f'full scan of {match.group(1)}')
+        if ordered and 'TEMP B-TREE FOR ORDER BY' in detail:
+            problems.append('sort instead of index order')
+    return problems, '; '.join(details)
+
+def postgres_problems(cursor, statement, parameters, ordered):
+    cursor.execute('EXPLAIN (FORMAT JSON) ' + statement, parameters)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    problems, nodes = [], []
+
+    def walk(node):
+        kind = node['Node Type']
+        relation = node.get('Relation Name')
+        nodes.append(f"{kind} {node.get('Index Name') or relation or ''}".strip())
+        if kind == 'Seq Scan' and relation in LARGE_TABLES:
+            if relation not in HASHABLE_TABLES or 'Filter' in node:
+                problems.append(f'full scan of {relation}')
+        if ordered and kind in ('Sort', 'Incremental Sort'):
+            problems.append('sort instead of index order')
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(plan[0]['Plan'])
+    return problems, '; '.join(nodes)
+
+def main():
+    args = parse_args(
+        __doc__,
+        users={'type': int, 'default': 5000},
+        products={'type': int, 'default': 5000},
+        orders={'type': int, 'default': 200000},
+    )
+    app = make_app(args.database_url, args.latency_ms, migrate=True, PASSWORD_HASH_WORKERS=0)
+
+    from sqlalchemy import event
+    from utils.database import db
+    from utils.menu_cache import menu_cache
+
+    with app.app_context():
+        customer, admin = seed(args.users, args.products, args.orders)
+        engine = db.engine
+        explain = postgres_problems if engine.dialect.name == 'postgresql' else sqlite_problems
+
+    customer_headers = auth_header(app, customer)
+    admin_headers = auth_header(app, admin)
+    client = app.test_client()
+
+    def cursor_of(url, headers):
+        return client.get(url, headers=headers).get_json()['next_cursor']
+
+    order_id = client.get('/api/orders/?limit=1', headers=customer_headers).get_json()['orders'][0]['id']
+
+    items = 'ix_order_items_order'
+    checks = [
+        # (name, url, headers, listing ordered newest first, indexes the plans must use)
+        ('customer orders', '/api/orders/?limit=20', customer_headers, True, ['ix_orders_user_created', items]),
+        ('customer orders p2', '/api/orders/?limit=20&cursor=' + cursor_of('/api/orders/?limit=20', customer_headers),
+         customer_headers, True, ['ix_orders_user_created', items]),
+        ('profile orders', '/api/users/orders?limit=20', customer_headers, True, ['ix_orders_user_created', items]),
+        ('admin orders', '/api/admin/orders?limit=50', admin_headers, True, ['ix_orders_created', items]),
+        ('admin orders p2', '/api/admin/orders?limit=50&cursor=' + cursor_of('/api/admin/orders?limit=50', admin_headers),
+         admin_headers, True, ['ix_orders_created', items]),
+        ('admin pending', '/api/admin/orders?status=pending&limit=50', admin_headers, True,
+         ['ix_orders_status_created', items]),
+        ('menu', '/api/products/?limit=50', None, True, ['ix_products_available_created']),
+        ('menu by category', '/api/products/?category_id=3&limit=50', None, True, ['ix_products_category_available']),
+        ('single order', f'/api/orders/{order_id}', customer_headers, False, [items]),
+        ('order export, one day', '/api/admin/orders/export?from=2024-03-01&to=2024-03-02', admin_headers, False,
+         ['ix_orders_created', items]),
+    ]
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    rows, failures = [], 0
+    for name, url, headers, ordered, indexes in checks:
+        menu_cache.invalidate()
+        captured.clear()
+        response = client.get(url, headers=headers)
+        response.get_data()
+        if response.status_code != 200:
+            print(f'{name}: {url} returned {response.status_code}', file=sys.stderr)
+            failures += 1
+            continue
+        statements = list(captured)
+        plans = []
+        with app.app_context():
+            raw = engine.raw_connection()
+            try:
+                cursor = raw.cursor()
+                for statement, parameters in statements:
+                    tables = set(re.findall(r'\bFROM (\w+)|\bJOIN (\w+)', statement))
+                    tables = {table for pair in tables for table in pair if table}
+                    if not tables & LARGE_TABLES:
+                        continue
+                    # Only the statement driving the listing must come back in index order
+                    problems, plan = explain(cursor, statement, parameters,
+                                             ordered and 'ORDER BY' in statement and 'LIMIT' in statement)
+                    failures += bool(problems)
+                    plans.append(plan)
+                    rows.append((name, 'FAIL: ' + ', '.join(problems) if problems else 'ok', plan[:110]))
+            finally:
+                raw.close()
+        missing = [index for index in indexes if not any(index in plan for plan in plans)]
+        if missing:
+            failures += 1
+            rows.append((name, 'FAIL: unused ' + ', '.join(missing), ''))
+    event.remove(engine, 'before_cursor_execute', capture)
+
+    print(f'{engine.dialect.name}: {args.orders} orders, {args.products} products, {args.users} users')
+    print_table(('check', 'result', 'plan'), rows)
+    if failures:
+        print(f'{failures} query plan regression(s)', file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Shared helpers for the benchmark scripts
+
+Benchmarks run against an in-memory SQLite database by default. Pass
+--database-url to point them at a local Postgres instead. Use
+--latency-ms to add a fake network round trip to every statement, which
+makes query-count savings visible even on a local database.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+def parse_args(description, **extra):
+    """Build the common benchmark argument parser, extra maps flag -> kwargs"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--database-url', default='sqlite:///:memory:')
+    parser.add_argument('--latency-ms', type=float, default=0.0,
+                        help='simulated round-trip latency added to every statement')
+    for flag, kwargs in extra.items():
+        parser.add_argument('--' + flag.replace('_', '-'), **kwargs)
+    return parser.parse_args()
+
+def make_app(database_url='sqlite:///:memory:', latency_ms=0.0, migrate=False, **config):
+    """
+    Create the app against database_url with a fresh schema
+
+    The schema comes from db.create_all(), or from the migrations when
+    migrate is set.
+    """
+    # Config reads the environment at import time
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.pop('NEON_DATABASE_URL', None)
+
+    from app import create_app
+    from utils.database import db
+
+    app = create_app()
+    # Benchmarks replay many requests from one client
+    app.config['RATE_LIMIT_ENABLED'] = False
+    app.config.update(config)
+    with app.app_context():
+        db.drop_all()
+        if migrate:
+            from utils.migrations import schema_migrations, upgrade
+            schema_migrations.drop(db.engine, checkfirst=True)
+            upgrade()
+        else:
+            db.create_all()
+        if latency_ms:
+            from sqlalchemy import event
+
+            @event.listens_for(db.engine, 'before_cursor_execute')
+            def _round_trip(*args):
+                time.sleep(latency_ms / 1000.0)
+    return app
+
+class QueryCounter:
+    """Counts statements executed on the app's engine"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def reset(self):
+        count, self.count = self.count, 0
+        return count
+
+def seed_users(count=1, admin=False, prefix='user'):
+    """Insert users with password 'password' and return their ids"""
+    from models.user import User
+    from utils.database import db
+
+    users = []
+    for i in range(count):
+        user = User(email=f'{prefix}{i}@example.com', first_name='Bench', last_name=str(i), is_admin=admin)
+        user.set_password('password')
+        users.append(user)
+    db.session.add_all(users)
+    db.session.commit()
+    return [user.id for user in users]
+
+def seed_menu(categories=5, products=100):
+    """Insert a menu and return the product ids"""
+    from models.product import Category, Product
+    from utils.database import db
+
+    rows = [Category(name=f'Category {i}') for i in range(categories)]
+    db.session.add_all(rows)
+    db.session.flush()
+    items = [
+        Product(name=f'Product {i}', description=f'Tasty item number {i}',
+                price=round(2 + (i % 40) * 0.25, 2), category_id=rows[i % categories].id)
+        for i in range(products)
+    ]
+    db.session.add_all(items)
+    db.session.commit()
+    return [product.id for product in items]
+
+def auth_header(app, user_id):
+    """Authorization header carrying an access token for user_id"""
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        return {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+
+def summarize(samples):
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))] * 1000
+
+    return {
+        'n': len(ordered),
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'p50_ms': pct(50),
+        'p95_ms': pct(95),
+        'p99_ms': pct(99),
+    }
+
+def print_table(headers, rows):
+    """Print rows as an aligned plain-text table"""
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print('  '.join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print('  '.join(str(c).rjust(w) for c, w in zip(row, widths)))
@@ -0,0 +1,341 @@
+"""
+Load test: a seeded database, weighted request mixes and latency baselines
+
+    python -m benchmarks.loadtest --mix lunch --workers 8 --duration 20
+    python -m benchmarks.loadtest --mix lunch --save baselines/lunch-sqlite.json
+    python -m benchmarks.loadtest --mix lunch --compare baselines/lunch-sqlite.json
+    python -m benchmarks.loadtest --database-url postgresql://localhost/fastfood_bench --orders 50000
+
+Boots create_app(), generates --users, --categories, --products and
+--orders from --seed with the `flask data generate` generator, and has
+--workers threads replay one of the MIXES for --duration seconds after a
+--warmup. Neon Auth and Cloudinary are the
+local stubs in benchmarks/stubs.py (--stub-latency-ms each); --local-auth
+logs in with the password hash instead. Prints throughput and
+p50/p95/p99 per endpoint.
+
+--save writes the results as JSON. --compare checks a run against such a
+file and exits with status 1 when an endpoint's p95 or p99 grew, or its
+throughput fell, by more than --tolerance (plus --slack-ms for latencies,
+judged only with --min-samples requests), or its error rate rose by more
+than a point. Compare runs made with the same settings on the same
+machine.
+"""
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from random import Random
+from benchmarks.common import make_app, parse_args, print_table, summarize
+from benchmarks.stubs import UpstreamStubs
+
+# Scenario -> weight; weights are relative within a mix
+MIXES = {
+    'browse': {'menu': 45, 'product': 30, 'categories': 15, 'search': 10},
+    'lunch': {'menu': 30, 'product': 20, 'categories': 5, 'search': 5, 'login': 10, 'place_order': 20, 'my_orders': 10},
+    'admin': {'admin_orders': 45, 'admin_sales': 20, 'menu': 25, 'upload_product': 10},
+    'mixed': {'menu': 28, 'product': 18, 'categories': 5, 'search': 6, 'login': 8, 'place_order': 14, 'my_orders': 8,
+              'admin_orders': 8, 'admin_sales': 4, 'upload_product': 1},
+}
+
+WORDS = ('burger', 'chicken', 'fries', 'wrap', 'salad', 'shake', 'spicy', 'crispy', 'bbq', 'veggie')
+# Tokens are issued for this many customers; more adds nothing to the mix
+TOKEN_USERS = 200
+BASELINE_VERSION = 1
+
+def seed(seed_value, users, categories, products, orders, days=30):
+    """
+    Generate the load-test data set with utils/data_generator.py
+
+    Every user's password is 'password' and the first user is the admin.
+
+    Returns:
+        dict: Ids the scenarios draw from
+    """
+    from models.product import Product
+    from models.user import User
+    from utils.data_generator import generate
+    from utils.database import db
+
+    generate(seed=seed_value, users=users, categories=categories, products=products, orders=orders, days=days)
+    available = db.session.scalars(db.select(Product.id).filter_by(is_available=True).order_by(Product.id)).all()
+    return {
+        'admin': db.session.scalars(db.select(User.id).filter_by(is_admin=True)).first(),
+        'customers': db.session.scalars(db.select(User.id).filter_by(is_admin=False).order_by(User.id)).all(),
+        'categories': list(range(1, categories + 1)),
+        'products': available,
+        'popularity': [1.0 / rank for rank in range(1, len(available) + 1)],
+    }
+
+def _image():
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), (200, 120, 40)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+class Scenarios:
+    """One method per scenario, each sending a request and returning the response"""
+
+    def __init__(self, data, tokens, admin_token, worker):
+        self.data = data
+        self.tokens = tokens
+        self.customers = list(tokens)
+        self.admin = {'Authorization': f'Bearer {admin_token}'}
+        self.worker = worker
+        self.created = 0
+        self.image = None
+
+    def _customer(self, rng):
+        user_id = rng.choice(self.customers)
+        return user_id, {'Authorization': f'Bearer {self.tokens[user_id]}'}
+
+    def _product(self, rng):
+        return rng.choices(self.data['products'], self.data['popularity'])[0]
+
+    def menu(self, client, rng):
+        if rng.random() < 0.5:
+            return client.get(f"/api/products/?limit=20&category_id={rng.choice(self.data['categories'])}")
+        return client.get('/api/products/?limit=20')
+
+    def product(self, client, rng):
+        return client.get(f'/api/products/{self._product(rng)}')
+
+    def categories(self, client, rng):
+        return client.get('/api/products/categories')
+
+    def search(self, client, rng):
+        return client.get(f'/api/products/search?q={rng.choice(WORDS)}&limit=20')
+
+    def login(self, client, rng):
+        user_id, _ = self._customer(rng)
+        return client.post('/api/auth/login', json={'email': f'user{user_id}@example.com', 'password': 'password'})
+
+    def place_order(self, client, rng):
+        _, headers = self._customer(rng)
+        items = {self._product(rng): rng.randint(1, 3) for _ in range(rng.randint(1, 4))}
+        headers = dict(headers, **{'Idempotency-Key': f'{self.worker}-{rng.getrandbits(64):x}'})
+        return client.post('/api/orders/', headers=headers, json={
+            'items': [{'product_id': product_id, 'quantity': quantity} for product_id, quantity in items.items()],
+            'delivery_address': '1 Main Street',
+            'phone': '555-0100',
+        })
+
+    def my_orders(self, client, rng):
+        _, headers = self._customer(rng)
+        return client.get('/api/orders/?limit=20', headers=headers)
+
+    def admin_orders(self, client, rng):
+        return client.get(f"/api/admin/orders?status={rng.choice(('pending', 'confirmed', 'preparing'))}&limit=50",
+                          headers=self.admin)
+
+    def admin_sales(self, client, rng):
+        return client.get(f"/api/admin/analytics/sales?group_by={rng.choice(('total', 'category'))}",
+                          headers=self.admin)
+
+    def upload_product(self, client, rng):
+        if self.image is None:
+            self.image = _image()
+        self.created += 1
+        return client.post('/api/products/', headers=self.admin, content_type='multipart/form-data', data={
+            'name': f'Load {self.worker}-{self.created}-{rng.getrandbits(24):x}',
+            'price': '9.5',
+            'category_id': str(rng.choice(self.data['categories'])),
+            'image': (io.BytesIO(self.image), 'load.png'),
+        })
+
+def run(app, mix, data, workers, duration, warmup, seed_value, think):
+    """
+    Drive the mix from closed-loop worker threads
+
+    Returns:
+        tuple: ({scenario: [latency seconds]}, {scenario: Counter of statuses}, seconds measured)
+    """
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        tokens = {user_id: create_access_token(identity=user_id) for user_id in data['customers'][:TOKEN_USERS]}
+        admin_token = create_access_token(identity=data['admin'])
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies = {name: [] for name in names}
+    statuses = {name: Counter() for name in names}
+    lock = threading.Lock()
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    def worker(index):
+        rng = Random(seed_value * 1000 + index)
+        scenarios = Scenarios(data, tokens, admin_token, index)
+        client = app.test_client()
+        mine = {name: [] for name in names}
+        codes = {name: Counter() for name in names}
+        while True:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            if start >= stop_at:
+                break
+            try:
+                response = getattr(scenarios, name)(client, rng)
+                response.get_data()
+                status = response.status_code
+            except Exception as e:
+                print(f'{name} raised {e!r}', file=sys.stderr)
+                status = 0
+            end = time.perf_counter()
+            if start >= measure_from:
+                mine[name].append(end - start)
+                codes[name][status] += 1
+            if think:
+                time.sleep(rng.expovariate(1 / think))
+        with lock:
+            for name in names:
+                latencies[name].extend(mine[name])
+                statuses[name].update(codes[name])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, duration
+
+def results(latencies, statuses, seconds):
+    """Per-scenario and total summaries in the baseline format"""
+    def entry(samples, codes):
+        summary = summarize(samples) if samples else {'n': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0}
+        # Status 0 marks a request that raised instead of answering
+        errors = sum(count for status, count in codes.items() if status >= 400 or status == 0)
+        summary.update(rps=summary['n'] / seconds, errors=errors, error_rate=errors / summary['n'] if summary['n'] else 0.0,
+                       statuses={str(status): count for status, count in sorted(codes.items())})
+        return summary
+
+    endpoints = {name: entry(latencies[name], statuses[name]) for name in latencies}
+    total = entry([s for samples in latencies.values() for s in samples], sum(statuses.values(), Counter()))
+    return endpoints, total
+
+def report(endpoints, total):
+    rows = [(name, r['n'], f"{r['rps']:.1f}", f"{r['p50_ms']:.2f}", f"{r['p95_ms']:.2f}", f"{r['p99_ms']:.2f}",
+             r['errors'], ' '.join(f'{status}:{count}' for status, count in r['statuses'].items()))
+            for name, r in sorted(endpoints.items()) + [('total', total)]]
+    print_table(('endpoint', 'n', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors', 'statuses'), rows)
+
+def compare(baseline, endpoints, total, settings, tolerance, slack_ms, min_samples):
+    """
+    Print the run against the baseline
+
+    Percentiles of endpoints with fewer than min_samples requests in either
+    run are too noisy to judge and are only shown.
+
+    Returns:
+        int: Number of regressions
+    """
+    differing = {key: (baseline['settings'].get(key), value) for key, value in settings.items()
+                 if key != 'python' and baseline['settings'].get(key) != value}
+    for key, (before, now) in differing.items():
+        print(f'warning: baseline was recorded with {key}={before!r}, this run used {now!r}')
+
+    rows = []
+    regressions = 0
+    current = dict(endpoints, total=total)
+    for name, base in sorted(baseline['endpoints'].items()) + [('total', baseline['total'])]:
+        run_ = current.get(name)
+        if run_ is None or not run_['n']:
+            rows.append((name, 'n', base['n'], 0, '', 'MISSING'))
+            regressions += 1
+            continue
+        judged = min(base['n'], run_['n']) >= min_samples
+        checks = [
+            ('p95_ms', judged and run_['p95_ms'] > base['p95_ms'] * (1 + tolerance) + slack_ms),
+            ('p99_ms', judged and run_['p99_ms'] > base['p99_ms'] * (1 + tolerance) + slack_ms),
+            ('rps', run_['rps'] < base['rps'] * (1 - tolerance)),
+            ('error_rate', run_['error_rate'] > base['error_rate'] + 0.01),
+        ]
+        for metric, regressed in checks:
+            change = (run_[metric] / base[metric] - 1) * 100 if base[metric] else 0.0
+            rows.append((name, metric, f'{base[metric]:.3f}', f'{run_[metric]:.3f}', f'{change:+.1f}%',
+                         'REGRESSED' if regressed else 'ok'))
+            regressions += regressed
+    print_table(('endpoint', 'metric', 'baseline', 'current', 'change', ''), rows)
+    return regressions
+
+def main():
+    args = parse_args(
+        __doc__,
+        mix={'default': 'mixed', 'choices': sorted(MIXES)},
+        workers={'type': int, 'default': 8},
+        duration={'type': float, 'default': 15.0},
+        warmup={'type': float, 'default': 3.0},
+        seed={'type': int, 'default': 42},
+        users={'type': int, 'default': 1000},
+        categories={'type': int, 'default': 12},
+        products={'type': int, 'default': 300},
+        orders={'type': int, 'default': 20000},
+        think_ms={'type': float, 'default': 0.0, 'help': 'mean pause between a worker\'s requests'},
+        stub_latency_ms={'type': float, 'default': 20.0},
+        local_auth={'action': 'store_true'},
+        save={'help': 'write the results to this JSON file'},
+        compare={'help': 'compare against this JSON baseline, exit 1 on regression'},
+        tolerance={'type': float, 'default': 0.25},
+        slack_ms={'type': float, 'default': 2.0},
+        min_samples={'type': int, 'default': 100},
+    )
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('version') != BASELINE_VERSION:
+            sys.exit(f'{args.compare} is not a version {BASELINE_VERSION} baseline')
+
+    database_url = args.database_url
+    if database_url == 'sqlite:///:memory:':
+        # Worker threads need their own connections, which :memory: cannot share
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='loadtest-'), 'loadtest.db')}"
+    # Slow requests are what the report is for; keep the log quiet
+    app = make_app(database_url, args.latency_ms, METRICS_SLOW_REQUEST_MS=0)
+    settings = {
+        'mix': args.mix, 'workers': args.workers, 'duration': args.duration, 'seed': args.seed,
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+        'users': args.users, 'categories': args.categories, 'products': args.products, 'orders': args.orders,
+        'think_ms': args.think_ms, 'latency_ms': args.latency_ms, 'stub_latency_ms': args.stub_latency_ms,
+        'auth': 'local' if args.local_auth else 'stub', 'python': platform.python_version(),
+    }
+
+    with UpstreamStubs(args.stub_latency_ms) as stubs:
+        stubs.configure(app)
+        if args.local_auth:
+            app.config['NEON_AUTH_ENABLED'] = False
+        with app.app_context():
+            started = time.perf_counter()
+            data = seed(args.seed, max(args.users, 2), max(args.categories, 1), max(args.products, 1), args.orders)
+        print(f'Seeded {args.users} users, {args.products} products and {args.orders} orders '
+              f'in {time.perf_counter() - started:.1f}s')
+
+        latencies, statuses, seconds = run(app, MIXES[args.mix], data, args.workers, args.duration,
+                                           args.warmup, args.seed, args.think_ms / 1000)
+        endpoints, total = results(latencies, statuses, seconds)
+        print(f"{args.mix} mix, {args.workers} workers, {args.duration:.0f}s on {settings['database']}, "
+              f"stub calls: {dict(sorted(stubs.calls.items()))}")
+        report(endpoints, total)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'version': BASELINE_VERSION, 'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+                       'settings': settings, 'endpoints': endpoints, 'total': total}, f, indent=2, sort_keys=True)
+        print(f'Saved baseline to {args.save}')
+    if baseline is not None:
+        regressions = compare(baseline, endpoints, total, settings, args.tolerance, args.slack_ms,
+                              args.min_samples)
+        if regressions:
+            sys.exit(f'{regressions} regression(s) against {args.compare}')
+        print(f'No regressions against {args.compare}')
+
+if __name__ == '__main__':
+    main()
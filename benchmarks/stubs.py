@@ -0,0 +1,98 @@
+"""
+Local stand-ins for Neon Auth and Cloudinary
+
+One threaded HTTP server on 127.0.0.1 answers the Neon Auth endpoints
+under /auth and the Cloudinary upload API under /v1_1, after an optional
+delay. The app reaches them through its usual pooled upstream clients, so
+benchmarks exercise the real retry and breaker code without leaving the
+machine.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        stubs = self.server.stubs
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if stubs.latency:
+            time.sleep(stubs.latency)
+        stubs.count(self.path)
+
+        if self.path == '/auth/token':
+            return self._reply(200, {'access_token': 'stub', 'token_type': 'bearer'})
+        if self.path == '/auth/users':
+            return self._reply(201, {'id': f'neon-{stubs.next_id()}'})
+        if self.path == '/auth/recover':
+            return self._reply(200, {})
+        if self.path.endswith('/image/upload'):
+            public_id = f'fastfood-app/stub-{stubs.next_id()}'
+            return self._reply(200, {
+                'public_id': public_id,
+                'secure_url': f'{stubs.url}/images/{public_id}.webp',
+                'width': 800,
+                'height': 600,
+            })
+        if self.path.endswith('/image/destroy'):
+            return self._reply(200, {'result': 'ok'})
+        return self._reply(404, {'error': f'No stub for {self.path}'})
+
+class UpstreamStubs:
+    """
+    Serve the stubs in a background thread
+
+        with UpstreamStubs(latency_ms=20) as stubs:
+            stubs.configure(app)
+    """
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000.0
+        self.calls = {}
+        self._ids = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.stubs = self
+        self.url = f'http://127.0.0.1:{self._server.server_port}'
+
+    def next_id(self):
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def count(self, path):
+        with self._lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+
+    def configure(self, app):
+        """Point the app's Neon Auth and Cloudinary clients at the stubs"""
+        import cloudinary
+        from utils.cloudinary_service import configure_cloudinary
+
+        app.config.update(NEON_AUTH_ENABLED=True, NEON_AUTH_URL=f'{self.url}/auth', NEON_API_KEY='stub',
+                          IMAGE_STORAGE_BACKEND='cloudinary')
+        # Load the app's settings first so they cannot overwrite the stub's
+        configure_cloudinary()
+        cloudinary.config(cloud_name='stub', api_key='stub', api_secret='stub', upload_prefix=self.url)
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
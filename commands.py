@@ -0,0 +1,72 @@
+import time
+import click
+from flask.cli import AppGroup
+
+db_cli = AppGroup('db', help='Manage the database schema.')
+rollups_cli = AppGroup('rollups', help='Maintain the sales rollup tables.')
+data_cli = AppGroup('data', help='Generate synthetic data.')
+
+@db_cli.command('upgrade')
+@click.option('--to', 'target', help='Stop after this migration version')
+def upgrade_db(target):
+    """Apply pending schema migrations."""
+    from utils.migrations import upgrade
+    
+    applied = upgrade(target, log=click.echo)
+    if not applied:
+        click.echo('Schema is up to date')
+
+@db_cli.command('status')
+def db_status():
+    """List migrations and whether they have been applied."""
+    from utils.migrations import status
+    
+    for migration, applied in status():
+        click.echo(f"{'applied' if applied else 'pending':8} {migration.version} {migration.description}")
+
+@rollups_cli.command('backfill')
+@click.option('--from', 'start', type=click.DateTime(), help='First day to rebuild (default: oldest order)')
+@click.option('--to', 'end', type=click.DateTime(), help='Rebuild up to this day, exclusive (default: after newest order)')
+@click.option('--window-days', default=31, show_default=True, help='Days rebuilt per transaction')
+def backfill_rollups(start, end, window_days):
+    """Rebuild the sales rollups from historical orders."""
+    from utils.sales_rollups import backfill
+    
+    started = time.perf_counter()
+    counted = backfill(start, end, window_days=window_days)
+    click.echo(f'Counted {counted} orders in {time.perf_counter() - started:.1f}s')
+
+@rollups_cli.command('flush')
+def flush_rollups():
+    """Apply pending order changes from the rollup outbox."""
+    from utils.sales_rollups import rollup_queue
+    
+    click.echo(f'Applied {rollup_queue.flush()} pending changes')
+
+@data_cli.command('generate')
+@click.option('--seed', default=42, show_default=True, help='Same seed, volumes and --end give the same rows')
+@click.option('--users', default=1000, show_default=True)
+@click.option('--categories', default=12, show_default=True)
+@click.option('--products', default=300, show_default=True)
+@click.option('--orders', default=20000, show_default=True, help='Each has 1 to 6 items')
+@click.option('--days', default=90, show_default=True, help='Days of order history')
+@click.option('--end', type=click.DateTime(), help='Newest order time (default: start of the current UTC hour)')
+@click.option('--admins', default=1, show_default=True, help='Leading users made admins')
+@click.option('--password', default='password', show_default=True, help='Password of every generated user')
+@click.option('--batch-size', default=50000, show_default=True, help='Orders per transaction')
+@click.option('--skip-rollups', is_flag=True, help='Do not rebuild the sales rollups afterwards')
+def generate_data(seed, users, categories, products, orders, days, end, admins, password, batch_size, skip_rollups):
+    """Bulk load deterministic users, menu and order history."""
+    from utils.data_generator import generate
+    
+    started = time.perf_counter()
+    written = generate(seed=seed, users=users, categories=categories, products=products, orders=orders,
+                       days=days, end=end, admins=admins, password=password, batch_size=batch_size,
+                       rollups=not skip_rollups, log=click.echo)
+    click.echo(f'Wrote {sum(written.values())} rows in {time.perf_counter() - started:.1f}s: '
+               + ', '.join(f'{count} {table}' for table, count in written.items()))
+
+def register_commands(app):
+    app.cli.add_command(db_cli)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(data_cli)
@@ -1,9 +1,44 @@
 import os
+import tempfile
 from datetime import timedelta
 from dotenv import load_dotenv
+from sqlalchemy.pool import NullPool
 
 load_dotenv()
 
+def engine_options(uri):
+    """
+    Connection pool settings for a Postgres URI; other databases keep the defaults
+
+    Neon suspends idle computes and drops their connections, so pooled
+    connections are pinged before use and recycled before they go stale.
+    With DB_POOLER=pgbouncer (e.g. Neon's -pooler endpoints) the external
+    pooler owns the connections and the app opens one per checkout.
+    Transaction-mode poolers break LISTEN and session advisory locks, so
+    ORDER_EVENTS_TRANSPORT=postgres and `flask db upgrade` need a direct URL.
+    """
+    if not uri or not uri.startswith('postgresql'):
+        return {}
+    
+    connect_args = {
+        'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '10')),
+        'keepalives': 1,
+        'keepalives_idle': 30
+    }
+    if os.getenv('DB_POOLER', '').lower() == 'pgbouncer':
+        return {'poolclass': NullPool, 'connect_args': connect_args}
+    
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '240')),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true',
+        # Reusing the most recent connection lets surplus ones idle out
+        'pool_use_lifo': True,
+        'connect_args': connect_args
+    }
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
     
@@ -14,11 +49,90 @@ class Config:
     else:
         # Fallback to SQLite if Neon DB URL is not properly configured
         SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///fastfood.db')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    
+    # Optional read replica; views marked with use_replica read from it
+    DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+    SQLALCHEMY_BINDS = {
+        'replica': {'url': DATABASE_REPLICA_URL, **engine_options(DATABASE_REPLICA_URL)}
+    } if DATABASE_REPLICA_URL else {}
+    # Seconds the replica may trail the primary; cached menus rebuilt this
+    # soon after a menu write read from the primary instead
+    REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', '5'))
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-here')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     
+    # Access tokens carry an is_admin claim that is trusted for this many
+    # seconds; older tokens re-check the cached profile, which expires after
+    # USER_CACHE_TTL seconds
+    ADMIN_CLAIM_TTL = int(os.getenv('ADMIN_CLAIM_TTL', '300'))
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '60'))
+    
+    # Password hashing runs in a process pool (0 workers hashes inline). The
+    # method must be spelled out in full; hashes made with any other method
+    # or cost are upgraded on the next successful login
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+    PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', '64'))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', '2'))
+    
+    # Rate limits as <requests>/<second|minute|hour|day>, empty to disable
+    # one. 'memory' counts per worker, 'database' shares the counts through
+    # the rate_limit_buckets table
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_LOGIN_IP = os.getenv('RATE_LIMIT_LOGIN_IP', '30/minute')
+    RATE_LIMIT_LOGIN_ACCOUNT = os.getenv('RATE_LIMIT_LOGIN_ACCOUNT', '10/minute')
+    RATE_LIMIT_REGISTER_IP = os.getenv('RATE_LIMIT_REGISTER_IP', '10/hour')
+    RATE_LIMIT_ORDER_IP = os.getenv('RATE_LIMIT_ORDER_IP', '60/minute')
+    RATE_LIMIT_ORDER_USER = os.getenv('RATE_LIMIT_ORDER_USER', '20/minute')
+    # Reverse proxies (load balancer, ingress) in front of the app. Per-IP
+    # limits need the client address from X-Forwarded-For, otherwise every
+    # client shares the proxy's. Leave at 0 when clients connect directly,
+    # or they can spoof the header
+    TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', '0'))
+    
+    # Requests per worker that may run at once in the KDF-bound auth routes
+    # and in order writes (0 for no cap). Keeping these below the thread
+    # count and DB_POOL_SIZE + DB_MAX_OVERFLOW leaves room for menu reads;
+    # requests beyond the cap wait CONCURRENCY_QUEUE_TIMEOUT seconds, then get 503
+    CONCURRENCY_AUTH = int(os.getenv('CONCURRENCY_AUTH', '4'))
+    CONCURRENCY_WRITE = int(os.getenv('CONCURRENCY_WRITE', '8'))
+    CONCURRENCY_QUEUE_TIMEOUT = float(os.getenv('CONCURRENCY_QUEUE_TIMEOUT', '0.5'))
+    
+    # Idempotency-Key on order creation: 'memory' deduplicates retries that
+    # reach the same worker, 'database' shares keys through the
+    # idempotency_keys table. Duplicates of an in-flight request wait up to
+    # IDEMPOTENCY_WAIT seconds; a request holding its key for longer than
+    # IDEMPOTENCY_LOCK_TIMEOUT is presumed dead
+    IDEMPOTENCY_BACKEND = os.getenv('IDEMPOTENCY_BACKEND', 'memory')
+    IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', '86400'))
+    IDEMPOTENCY_MAX_KEYS = int(os.getenv('IDEMPOTENCY_MAX_KEYS', '10000'))
+    IDEMPOTENCY_WAIT = float(os.getenv('IDEMPOTENCY_WAIT', '10'))
+    IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', '30'))
+    
+    # Group commit for POST /api/orders/: concurrent orders are written in
+    # batches of up to ORDER_BATCH_SIZE with one transaction each, the first
+    # order waiting at most ORDER_BATCH_LINGER_MS for company. Waiting
+    # requests hold no database connection, so CONCURRENCY_WRITE can be
+    # raised towards the batch size. ORDER_BATCH_TIMEOUT bounds the wait
+    # for a batch to pick an order up before answering 503
+    ORDER_BATCHING = os.getenv('ORDER_BATCHING', 'false').lower() == 'true'
+    ORDER_BATCH_SIZE = int(os.getenv('ORDER_BATCH_SIZE', '50'))
+    ORDER_BATCH_LINGER_MS = float(os.getenv('ORDER_BATCH_LINGER_MS', '5'))
+    ORDER_BATCH_TIMEOUT = float(os.getenv('ORDER_BATCH_TIMEOUT', '10'))
+    
+    # Seconds between drains of the rollup_changes outbox into the sales
+    # rollups; analytics trail orders by up to this much
+    ROLLUP_FLUSH_INTERVAL = float(os.getenv('ROLLUP_FLUSH_INTERVAL', '1'))
+    
+    # Per-route latency, SQL and upstream metrics for /api/admin/metrics;
+    # requests slower than METRICS_SLOW_REQUEST_MS are logged (0 turns it off)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_SLOW_REQUEST_MS = int(os.getenv('METRICS_SLOW_REQUEST_MS', '1000'))
+    
     # Cloudinary configuration
     CLOUDINARY_CLOUD_NAME = os.getenv('CLOUDINARY_CLOUD_NAME')
     CLOUDINARY_API_KEY = os.getenv('CLOUDINARY_API_KEY')
@@ -28,7 +142,49 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
     
+    # Image uploads run on a background pool; 'local' stores files on disk
+    # instead of Cloudinary for development and tests
+    IMAGE_STORAGE_BACKEND = os.getenv('IMAGE_STORAGE_BACKEND', 'cloudinary')
+    UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '4'))
+    UPLOAD_SPOOL_DIR = os.getenv('UPLOAD_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'fastfood-uploads'))
+    LOCAL_STORAGE_DIR = os.getenv('LOCAL_STORAGE_DIR', os.path.abspath('uploads'))
+    LOCAL_STORAGE_URL = os.getenv('LOCAL_STORAGE_URL', '/uploads')
+    
+    # Uploads are resized and re-encoded with Pillow before they leave the server
+    IMAGE_PREPROCESS = os.getenv('IMAGE_PREPROCESS', 'true').lower() == 'true'
+    IMAGE_OUTPUT_FORMAT = os.getenv('IMAGE_OUTPUT_FORMAT', 'webp')  # webp or jpeg
+    IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', '80'))
+    
+    # Seconds a worker may serve a cached menu before re-reading it, bounds
+    # staleness when another worker changed the menu
+    MENU_CACHE_TTL = int(os.getenv('MENU_CACHE_TTL', '60'))
+    
+    # Product search: 'auto' uses the database's full-text search (Postgres
+    # tsvector or SQLite FTS5) once its migration has run, and otherwise an
+    # in-process index; 'memory' always uses the in-process index
+    SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+    
+    # Responses are encoded with orjson when it is installed; 'stdlib'
+    # forces Python's json module
+    JSON_ENCODER = os.getenv('JSON_ENCODER', 'auto')
+    
+    # Live order feed: 'memory' reaches subscribers of the same worker only,
+    # 'postgres' fans out to every worker through LISTEN/NOTIFY
+    ORDER_EVENTS_TRANSPORT = os.getenv('ORDER_EVENTS_TRANSPORT', 'memory')
+    ORDER_EVENTS_HEARTBEAT = float(os.getenv('ORDER_EVENTS_HEARTBEAT', '15'))
+    
     # Neon Auth configuration (if using Neon's authentication)
     NEON_AUTH_ENABLED = os.getenv('NEON_AUTH_ENABLED', 'false').lower() == 'true'
     NEON_AUTH_URL = os.getenv('NEON_AUTH_URL', 'https://api.neon.tech/auth/v1')
-    NEON_API_KEY = os.getenv('NEON_API_KEY')
\ No newline at end of file
+    NEON_API_KEY = os.getenv('NEON_API_KEY')
+    
+    # Upstream HTTP calls (Neon Auth, Cloudinary): per-call timeouts in
+    # seconds, bounded retries and a circuit breaker that fails fast after
+    # repeated errors
+    NEON_AUTH_TIMEOUT = float(os.getenv('NEON_AUTH_TIMEOUT', '5'))
+    CLOUDINARY_TIMEOUT = float(os.getenv('CLOUDINARY_TIMEOUT', '30'))
+    UPSTREAM_RETRIES = int(os.getenv('UPSTREAM_RETRIES', '2'))
+    UPSTREAM_RETRY_BACKOFF = float(os.getenv('UPSTREAM_RETRY_BACKOFF', '0.2'))
+    UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', '10'))
+    UPSTREAM_BREAKER_THRESHOLD = int(os.getenv('UPSTREAM_BREAKER_THRESHOLD', '5'))
+    UPSTREAM_BREAKER_RESET = float(os.getenv('UPSTREAM_BREAKER_RESET', '30'))
\ No newline at end of file
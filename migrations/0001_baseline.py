@@ -0,0 +1,86 @@
+"""Baseline schema as created by db.create_all() before migrations existed"""
+import sqlalchemy as sa
+
+# Frozen copy of the tables at this version. Later migrations change the
+# schema; this module must not follow the models.
+metadata = sa.MetaData()
+
+sa.Table(
+    'users', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('email', sa.String(120), unique=True, nullable=False),
+    sa.Column('password_hash', sa.String(255)),
+    sa.Column('first_name', sa.String(50), nullable=False),
+    sa.Column('last_name', sa.String(50), nullable=False),
+    sa.Column('phone', sa.String(20)),
+    sa.Column('address', sa.Text),
+    sa.Column('is_admin', sa.Boolean),
+    sa.Column('neon_user_id', sa.String(100)),
+    sa.Column('created_at', sa.DateTime)
+)
+
+sa.Table(
+    'categories', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('name', sa.String(50), unique=True, nullable=False),
+    sa.Column('description', sa.Text),
+    sa.Column('image_url', sa.String(255))
+)
+
+sa.Table(
+    'products', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('name', sa.String(100), nullable=False),
+    sa.Column('description', sa.Text),
+    sa.Column('price', sa.Float, nullable=False),
+    sa.Column('image_url', sa.String(255)),
+    sa.Column('is_available', sa.Boolean),
+    sa.Column('category_id', sa.Integer, sa.ForeignKey('categories.id'), nullable=False),
+    sa.Column('created_at', sa.DateTime)
+)
+
+sa.Table(
+    'orders', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id'), nullable=False),
+    sa.Column('total_amount', sa.Float, nullable=False),
+    sa.Column('status', sa.String(20)),
+    sa.Column('delivery_address', sa.Text, nullable=False),
+    sa.Column('phone', sa.String(20), nullable=False),
+    sa.Column('notes', sa.Text),
+    sa.Column('created_at', sa.DateTime),
+    sa.Column('updated_at', sa.DateTime)
+)
+
+sa.Table(
+    'order_items', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('order_id', sa.Integer, sa.ForeignKey('orders.id'), nullable=False),
+    sa.Column('product_id', sa.Integer, sa.ForeignKey('products.id'), nullable=False),
+    sa.Column('quantity', sa.Integer, nullable=False),
+    sa.Column('price', sa.Float, nullable=False)
+)
+
+sa.Table(
+    'sales_rollups', metadata,
+    sa.Column('granularity', sa.String(8), primary_key=True),
+    sa.Column('bucket', sa.DateTime, primary_key=True),
+    sa.Column('product_id', sa.Integer, sa.ForeignKey('products.id'), primary_key=True),
+    sa.Column('category_id', sa.Integer, nullable=False),
+    sa.Column('quantity', sa.Integer, nullable=False),
+    sa.Column('revenue', sa.Float, nullable=False),
+    sa.Column('order_count', sa.Integer, nullable=False),
+    sa.Index('ix_sales_rollups_product', 'granularity', 'product_id', 'bucket')
+)
+
+sa.Table(
+    'order_rollups', metadata,
+    sa.Column('granularity', sa.String(8), primary_key=True),
+    sa.Column('bucket', sa.DateTime, primary_key=True),
+    sa.Column('order_count', sa.Integer, nullable=False),
+    sa.Column('revenue', sa.Float, nullable=False)
+)
+
+def upgrade(conn):
+    # Databases built by create_all already have these tables
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,29 @@
+"""Indexes behind the order, order item and menu list queries"""
+
+# CREATE INDEX CONCURRENTLY cannot run inside a transaction
+transactional = False
+
+INDEXES = [
+    # Customer order history: user_id = ? ORDER BY created_at DESC, id DESC
+    ('ix_orders_user_created', 'orders', ['user_id', 'created_at', 'id']),
+    # Admin order list filtered by status, newest first
+    ('ix_orders_status_created', 'orders', ['status', 'created_at', 'id']),
+    # Admin order list, exports and backfills by date range
+    ('ix_orders_created', 'orders', ['created_at', 'id']),
+    # Loading items for a page of orders, and the orders.id foreign key
+    ('ix_order_items_order', 'order_items', ['order_id']),
+    # Product deletes and per-product sales lookups
+    ('ix_order_items_product', 'order_items', ['product_id']),
+    # Menu: is_available = true ORDER BY created_at DESC, id DESC
+    ('ix_products_available_created', 'products', ['is_available', 'created_at', 'id']),
+    # Menu by category, also covers the categories.id foreign key
+    ('ix_products_category_available', 'products', ['category_id', 'is_available', 'created_at', 'id'])
+]
+
+def upgrade(conn):
+    # Building concurrently keeps writes to large tables flowing on Postgres
+    concurrently = 'CONCURRENTLY ' if conn.dialect.name == 'postgresql' else ''
+    for name, table, columns in INDEXES:
+        conn.exec_driver_sql(
+            f'CREATE INDEX {concurrently}IF NOT EXISTS {name} ON {table} ({", ".join(columns)})'
+        )
@@ -0,0 +1,52 @@
+"""Full-text search indexes for GET /api/products/search"""
+
+transactional = False
+
+# Weighted document searched on Postgres: name (A) ranks above description (B)
+PG_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
+SQLITE_STATEMENTS = [
+    # External-content FTS5 table over products, kept in sync by triggers
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "name, description, content='products', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    # Vocabulary view used to expand misspelled terms
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts_vocab USING fts5vocab(products_fts, row)",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN "
+    "INSERT INTO products_fts (rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN "
+    "INSERT INTO products_fts (products_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description ON products BEGIN "
+    "INSERT INTO products_fts (products_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO products_fts (rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    # Index the products that already exist
+    "INSERT INTO products_fts (products_fts) VALUES ('rebuild')"
+]
+
+def upgrade(conn):
+    if conn.dialect.name == 'sqlite':
+        for statement in SQLITE_STATEMENTS:
+            conn.exec_driver_sql(statement)
+        return
+
+    # Stored, so ranking reads the vector instead of re-parsing every match.
+    # Adding it rewrites products, which is small next to the order tables.
+    conn.exec_driver_sql(
+        f'ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector '
+        f'GENERATED ALWAYS AS ({PG_DOCUMENT}) STORED'
+    )
+    conn.exec_driver_sql('CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_search ON products USING gin (search_vector)')
+    # Typo tolerance needs pg_trgm; without it search still does full-text
+    # and prefix matching
+    try:
+        conn.exec_driver_sql('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except Exception:
+        return
+    conn.exec_driver_sql(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)'
+    )
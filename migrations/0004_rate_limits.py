@@ -0,0 +1,16 @@
+"""Shared token buckets for RATE_LIMIT_BACKEND=database"""
+import sqlalchemy as sa
+
+# Frozen copy of the table at this version
+metadata = sa.MetaData()
+
+sa.Table(
+    'rate_limit_buckets', metadata,
+    sa.Column('key', sa.String(255), primary_key=True),
+    sa.Column('tokens', sa.Float, nullable=False),
+    sa.Column('updated_at', sa.Float, nullable=False),
+    sa.Index('ix_rate_limit_buckets_updated', 'updated_at')
+)
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,19 @@
+"""Stored responses for IDEMPOTENCY_BACKEND=database"""
+import sqlalchemy as sa
+
+# Frozen copy of the table at this version
+metadata = sa.MetaData()
+
+sa.Table(
+    'idempotency_keys', metadata,
+    sa.Column('key', sa.String(255), primary_key=True),
+    sa.Column('fingerprint', sa.String(64), nullable=False),
+    sa.Column('status_code', sa.Integer),
+    sa.Column('body', sa.LargeBinary),
+    sa.Column('content_type', sa.String(100)),
+    sa.Column('created_at', sa.Float, nullable=False),
+    sa.Index('ix_idempotency_keys_created', 'created_at')
+)
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
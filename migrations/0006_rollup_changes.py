@@ -0,0 +1,15 @@
+"""Outbox of order changes waiting to be applied to the sales rollups"""
+import sqlalchemy as sa
+
+# Frozen copy of the table at this version
+metadata = sa.MetaData()
+
+sa.Table(
+    'rollup_changes', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('order_id', sa.Integer, nullable=False),
+    sa.Column('sign', sa.Integer, nullable=False)
+)
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,11 @@
+"""Thumbnail URLs rendered by the upload worker"""
+import sqlalchemy as sa
+
+TABLES = ('categories', 'products')
+
+def upgrade(conn):
+    inspector = sa.inspect(conn)
+    for table in TABLES:
+        # Databases built by create_all already have the column
+        if 'thumbnail_url' not in {column['name'] for column in inspector.get_columns(table)}:
+            conn.execute(sa.text(f'ALTER TABLE {table} ADD COLUMN thumbnail_url VARCHAR(255)'))
@@ -0,0 +1,15 @@
+from utils.database import db
+
+class IdempotencyKey(db.Model):
+    """Responses to requests sent with an Idempotency-Key, when IDEMPOTENCY_BACKEND is 'database'"""
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.Index('ix_idempotency_keys_created', 'created_at'),
+    )
+
+    key = db.Column(db.String(255), primary_key=True)  # user id:header value
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 of the request
+    status_code = db.Column(db.Integer)  # null while the first request is in flight
+    body = db.Column(db.LargeBinary)
+    content_type = db.Column(db.String(100))
+    created_at = db.Column(db.Float, nullable=False)  # unix time the key was claimed
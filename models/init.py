@@ -1,5 +1,8 @@
 from .user import User
 from .product import Product, Category
 from .order import Order, OrderItem
+from .rollup import SalesRollup, OrderRollup
+from .rate_limit import RateLimitBucket
+from .idempotency import IdempotencyKey
 
-__all__ = ['User', 'Product', 'Category', 'Order', 'OrderItem']
\ No newline at end of file
+__all__ = ['User', 'Product', 'Category', 'Order', 'OrderItem', 'SalesRollup', 'OrderRollup', 'RateLimitBucket', 'IdempotencyKey']
\ No newline at end of file
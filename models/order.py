@@ -1,8 +1,24 @@
 from utils.database import db
 from datetime import datetime
 
+# Legal status moves; delivered and cancelled are terminal
+ORDER_TRANSITIONS = {
+    'pending': ['confirmed', 'cancelled'],
+    'confirmed': ['preparing', 'cancelled'],
+    'preparing': ['ready', 'cancelled'],
+    'ready': ['delivered', 'cancelled'],
+    'delivered': [],
+    'cancelled': []
+}
+
 class Order(db.Model):
     __tablename__ = 'orders'
+    # Kept in step with migrations/0002_query_indexes.py
+    __table_args__ = (
+        db.Index('ix_orders_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_orders_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_orders_created', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -16,6 +32,11 @@ class Order(db.Model):
     
     items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     
+    @staticmethod
+    def with_items():
+        """Loader option that fetches items and their products alongside the orders"""
+        return db.selectinload(Order.items).joinedload(OrderItem.product)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -32,6 +53,10 @@ class Order(db.Model):
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
+    __table_args__ = (
+        db.Index('ix_order_items_order', 'order_id'),
+        db.Index('ix_order_items_product', 'product_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
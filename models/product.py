@@ -7,6 +7,7 @@ class Category(db.Model):
     name = db.Column(db.String(50), unique=True, nullable=False)
     description = db.Column(db.Text)
     image_url = db.Column(db.String(255))
+    thumbnail_url = db.Column(db.String(255))  # 400x300 rendition of image_url
     
     products = db.relationship('Product', backref='category', lazy=True)
     
@@ -15,17 +16,24 @@ class Category(db.Model):
             'id': self.id,
             'name': self.name,
             'description': self.description,
-            'image_url': self.image_url
+            'image_url': self.image_url,
+            'thumbnail_url': self.thumbnail_url
         }
 
 class Product(db.Model):
     __tablename__ = 'products'
+    # Kept in step with migrations/0002_query_indexes.py
+    __table_args__ = (
+        db.Index('ix_products_available_created', 'is_available', 'created_at', 'id'),
+        db.Index('ix_products_category_available', 'category_id', 'is_available', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     price = db.Column(db.Float, nullable=False)
     image_url = db.Column(db.String(255))
+    thumbnail_url = db.Column(db.String(255))  # 400x300 rendition of image_url
     is_available = db.Column(db.Boolean, default=True)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
@@ -39,6 +47,7 @@ class Product(db.Model):
             'description': self.description,
             'price': self.price,
             'image_url': self.image_url,
+            'thumbnail_url': self.thumbnail_url,
             'is_available': self.is_available,
             'category_id': self.category_id,
             'created_at': self.created_at.isoformat() if self.created_at else None
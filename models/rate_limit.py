@@ -0,0 +1,12 @@
+from utils.database import db
+
+class RateLimitBucket(db.Model):
+    """Token bucket state shared by all workers when RATE_LIMIT_BACKEND is 'database'"""
+    __tablename__ = 'rate_limit_buckets'
+    __table_args__ = (
+        db.Index('ix_rate_limit_buckets_updated', 'updated_at'),
+    )
+
+    key = db.Column(db.String(255), primary_key=True)  # scope:kind:identity
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False)  # unix time of the last take
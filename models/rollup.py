@@ -0,0 +1,50 @@
+from utils.database import db
+
+class SalesRollup(db.Model):
+    """Units sold and revenue per product per UTC hour, day or month, excluding cancelled orders"""
+    __tablename__ = 'sales_rollups'
+    __table_args__ = (
+        db.Index('ix_sales_rollups_product', 'granularity', 'product_id', 'bucket'),
+    )
+
+    granularity = db.Column(db.String(8), primary_key=True)  # hour, day, month
+    bucket = db.Column(db.DateTime, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    category_id = db.Column(db.Integer, nullable=False)  # category at the time of sale
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    order_count = db.Column(db.Integer, nullable=False, default=0)  # orders containing the product
+
+    def to_dict(self):
+        return {
+            'bucket': self.bucket.isoformat(),
+            'product_id': self.product_id,
+            'category_id': self.category_id,
+            'quantity': self.quantity,
+            'revenue': self.revenue,
+            'order_count': self.order_count
+        }
+
+class RollupChange(db.Model):
+    """An order to add to (sign 1) or take out of (sign -1) the rollups, written with the order"""
+    __tablename__ = 'rollup_changes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, nullable=False)
+    sign = db.Column(db.Integer, nullable=False)
+
+class OrderRollup(db.Model):
+    """Order count and revenue per UTC hour, day or month, excluding cancelled orders"""
+    __tablename__ = 'order_rollups'
+
+    granularity = db.Column(db.String(8), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'bucket': self.bucket.isoformat(),
+            'order_count': self.order_count,
+            'revenue': self.revenue
+        }
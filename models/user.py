@@ -1,5 +1,5 @@
 from utils.database import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from utils.password_hashing import get_hasher
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -18,13 +18,16 @@ class User(db.Model):
     orders = db.relationship('Order', backref='user', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = get_hasher().hash(password)
     
     def check_password(self, password):
         if not self.password_hash:
             # User authenticated through external service
             return False
-        return check_password_hash(self.password_hash, password)
+        return get_hasher().verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        return bool(self.password_hash) and get_hasher().needs_rehash(self.password_hash)
     
     def to_dict(self):
         return {
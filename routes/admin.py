@@ -1,19 +1,24 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models.user import User
+from flask import Blueprint, Response, current_app, request, jsonify
+from flask_jwt_extended import jwt_required
 from models.product import Product, Category
 from models.order import Order
-from utils.database import db
+from utils.database import db, use_replica
+from utils.authz import require_admin
+from utils.pagination import paginate, wants_pagination
+from utils.list_queries import order_dicts, order_query
+from utils.menu_cache import menu_cache
+from utils.metrics import metrics
+from utils.menu_io import MenuImport, EXPORT_FIELDS, export_rows
+from utils.streaming import read_records, request_format, stream_download
+from utils.upload_queue import upload_queue
+from utils.order_export import CSV_FIELDS, export_order_lines, export_orders, parse_filters
+from utils.order_events import format_sse, order_events, order_event_payload
+from utils.order_status import parse_order_ids, transition_orders
+from utils.sales_rollups import (category_series, order_series, parse_range, product_series,
+                                 record_status_changes, top_products)
 
 admin_bp = Blueprint('admin', __name__)
 
-def require_admin():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if not user or not user.is_admin:
-        return jsonify({'error': 'Admin access required'}), 403
-    return None
-
 @admin_bp.route('/products', methods=['POST'])
 @jwt_required()
 def create_product():
@@ -32,6 +37,7 @@ def create_product():
         
         db.session.add(product)
         db.session.commit()
+        menu_cache.invalidate()
         
         return jsonify({'message': 'Product created successfully', 'product': product.to_dict()}), 201
         
@@ -56,36 +62,212 @@ def update_product(product_id):
             product.price = data['price']
         if 'image_url' in data:
             product.image_url = data['image_url']
+            # The stored thumbnail belongs to the old image
+            product.thumbnail_url = None
         if 'is_available' in data:
             product.is_available = data['is_available']
         if 'category_id' in data:
             product.category_id = data['category_id']
         
         db.session.commit()
+        menu_cache.invalidate()
         return jsonify({'message': 'Product updated successfully', 'product': product.to_dict()}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@admin_bp.route('/products/import', methods=['POST'])
+@jwt_required()
+def import_products():
+    if error := require_admin():
+        return error
+    
+    try:
+        fmt = request_format(request)
+        report = MenuImport().run(read_records(request.stream, fmt))
+        db.session.commit()
+        menu_cache.invalidate()
+        
+        return jsonify({'message': 'Import finished', **report}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+@admin_bp.route('/products/export', methods=['GET'])
+@jwt_required()
+@use_replica
+def export_products():
+    if error := require_admin():
+        return error
+    
+    try:
+        fmt = request_format(request)
+        return stream_download(export_rows(), fmt, EXPORT_FIELDS, 'products')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@admin_bp.route('/uploads/<job_id>', methods=['GET'])
+@jwt_required()
+def get_upload_job(job_id):
+    if error := require_admin():
+        return error
+    
+    job = upload_queue.get(job_id)
+    if not job:
+        return jsonify({'error': 'Upload job not found'}), 404
+    return jsonify(job), 200
+
 @admin_bp.route('/orders', methods=['GET'])
 @jwt_required()
+@use_replica
 def get_all_orders():
     if error := require_admin():
         return error
     
     try:
         status = request.args.get('status')
-        query = Order.query.order_by(Order.created_at.desc())
+        query = order_query().order_by(Order.created_at.desc())
         
         if status:
             query = query.filter_by(status=status)
         
+        if wants_pagination(request.args):
+            orders, next_cursor = paginate(query, Order.created_at, Order.id, request.args)
+            return jsonify({
+                'orders': order_dicts(orders),
+                'next_cursor': next_cursor
+            }), 200
+        
         orders = query.all()
-        return jsonify([order.to_dict() for order in orders]), 200
+        return jsonify(order_dicts(orders)), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@admin_bp.route('/orders/export', methods=['GET'])
+@jwt_required()
+@use_replica
+def export_all_orders():
+    if error := require_admin():
+        return error
+    
+    try:
+        fmt = request_format(request)
+        filters = parse_filters(request.args)
+        
+        # CSV gets one line per item, NDJSON one object per order
+        rows = export_order_lines(filters) if fmt == 'csv' else export_orders(filters)
+        return stream_download(rows, fmt, CSV_FIELDS, 'orders')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@admin_bp.route('/orders/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_orders():
+    """Server-Sent Events feed of order.created and order.status_changed events"""
+    if error := require_admin():
+        return error
+    
+    # EventSource sends Last-Event-ID on reconnect; the query arg covers clients
+    # that reconnect by hand
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    heartbeat = current_app.config.get('ORDER_EVENTS_HEARTBEAT', 15)
+    order_events.start()
+    
+    def stream():
+        yield 'retry: 3000\n\n'
+        for event in order_events.subscribe(last_event_id, heartbeat=heartbeat):
+            yield format_sse(event)
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@admin_bp.route('/analytics/sales', methods=['GET'])
+@jwt_required()
+@use_replica
+def get_sales():
+    """Sales per bucket from the rollup tables; group_by is total, category or product"""
+    if error := require_admin():
+        return error
+    
+    try:
+        granularity, start, end = parse_range(request.args)
+        group_by = request.args.get('group_by', 'total')
+        product_id = request.args.get('product_id', type=int)
+        category_id = request.args.get('category_id', type=int)
+        
+        if group_by == 'total':
+            series = order_series(granularity, start, end)
+        elif group_by == 'category':
+            series = category_series(granularity, start, end, category_id=category_id)
+        elif group_by == 'product':
+            series = product_series(granularity, start, end, product_id=product_id, category_id=category_id)
+        else:
+            return jsonify({'error': 'group_by must be total, category or product'}), 400
+        
+        return jsonify({
+            'granularity': granularity,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'group_by': group_by,
+            'series': series
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@admin_bp.route('/analytics/top-products', methods=['GET'])
+@jwt_required()
+@use_replica
+def get_top_products():
+    if error := require_admin():
+        return error
+    
+    try:
+        _, start, end = parse_range(request.args, granularity='day', max_buckets=None)
+        limit = min(request.args.get('limit', 10, type=int), 100)
+        category_id = request.args.get('category_id', type=int)
+        
+        return jsonify({
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'products': top_products(start, end, limit=limit, category_id=category_id)
+        }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@admin_bp.route('/orders/status', methods=['POST'])
+@jwt_required()
+def bulk_update_order_status():
+    """Apply one status transition to many orders, e.g. {"order_ids": [1, 2], "status": "ready"}"""
+    if error := require_admin():
+        return error
+    
+    try:
+        data = request.get_json()
+        order_ids = parse_order_ids(data.get('order_ids'))
+        results, updated = transition_orders(order_ids, data.get('status'))
+        record_status_changes(updated, data['status'])
+        db.session.commit()
+        
+        if updated:
+            orders = Order.query.options(Order.with_items()).filter(Order.id.in_(updated)).order_by(Order.id)
+            for order in orders:
+                order_events.publish('order.status_changed',
+                                     order_event_payload(order, previous_status=updated[order.id]))
+        
+        return jsonify({'status': data['status'], 'updated': len(updated), 'results': results}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
 @admin_bp.route('/orders/<int:order_id>/status', methods=['PUT'])
 @jwt_required()
 def update_order_status(order_id):
@@ -93,17 +275,33 @@ def update_order_status(order_id):
         return error
     
     try:
-        order = Order.query.get_or_404(order_id)
         data = request.get_json()
+        # Same guarded transition as the bulk endpoint, for a single order
+        results, updated = transition_orders([order_id], data.get('status'))
+        result = results[0]
+        if result['result'] == 'not_found':
+            db.session.rollback()
+            return jsonify({'error': 'Order not found'}), 404
+        if result['result'] == 'invalid_transition':
+            db.session.rollback()
+            return jsonify({'error': f"Cannot move an order from {result['status']} to {data['status']}"}), 409
         
-        valid_statuses = ['pending', 'confirmed', 'preparing', 'ready', 'delivered', 'cancelled']
-        if data['status'] not in valid_statuses:
-            return jsonify({'error': 'Invalid status'}), 400
-        
-        order.status = data['status']
+        record_status_changes(updated, data['status'])
         db.session.commit()
+        order = Order.query.options(Order.with_items()).filter_by(id=order_id).one()
+        order_events.publish('order.status_changed', order_event_payload(order, previous_status=updated[order_id]))
         
         return jsonify({'message': 'Order status updated successfully', 'order': order.to_dict()}), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
\ No newline at end of file
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+@admin_bp.route('/metrics', methods=['GET'])
+@jwt_required()
+def get_metrics():
+    if error := require_admin():
+        return error
+    
+    # Prometheus text format; point the scraper at this worker with an admin token
+    return Response(metrics.render(db.engines), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,8 +1,13 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, create_refresh_token
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from models.user import User
 from utils.database import db
 from utils.neon_auth import NeonAuth
+from utils.authz import issue_tokens, token_claims
+from utils.user_cache import get_user_profile, invalidate_user
+from utils.password_hashing import HashingBusyError
+from utils.rate_limit import rate_limited
+from utils.admission import concurrency_limited
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -17,6 +22,8 @@ def get_request_json():
     return request.get_json()
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limited('register')
+@concurrency_limited('auth')
 def register():
     try:
         data = get_request_json()
@@ -46,8 +53,7 @@ def register():
             }
         )
         
-        access_token = create_access_token(identity=user.id)
-        refresh_token = create_refresh_token(identity=user.id)
+        access_token, refresh_token = issue_tokens(user)
         
         return jsonify({
             'message': 'User created successfully',
@@ -56,10 +62,14 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except HashingBusyError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limited('login')
+@concurrency_limited('auth')
 def login():
     try:
         data = get_request_json()
@@ -75,8 +85,7 @@ def login():
         user = NeonAuth.authenticate_user(data['email'], data['password'])
         
         if user:
-            access_token = create_access_token(identity=user.id)
-            refresh_token = create_refresh_token(identity=user.id)
+            access_token, refresh_token = issue_tokens(user)
             
             return jsonify({
                 'access_token': access_token,
@@ -86,6 +95,8 @@ def login():
         
         return jsonify({'error': 'Invalid credentials'}), 401
         
+    except HashingBusyError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -94,7 +105,13 @@ def login():
 def refresh():
     try:
         user_id = get_jwt_identity()
-        access_token = create_access_token(identity=user_id)
+        
+        # Re-read the role so a changed admin flag is picked up on refresh
+        profile = get_user_profile(user_id)
+        if not profile:
+            return jsonify({'error': 'User not found'}), 404
+        
+        access_token = create_access_token(identity=user_id, additional_claims=token_claims(profile))
         
         return jsonify({
             'access_token': access_token
@@ -107,10 +124,10 @@ def refresh():
 @jwt_required()
 def get_profile():
     user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if not user:
+    profile = get_user_profile(user_id)
+    if not profile:
         return jsonify({'error': 'User not found'}), 404
-    return jsonify(user.to_dict()), 200
+    return jsonify(profile), 200
 
 @auth_bp.route('/profile', methods=['PUT'])
 @jwt_required()
@@ -136,6 +153,7 @@ def update_profile():
             user.address = data['address']
         
         db.session.commit()
+        invalidate_user(user.id)
         return jsonify({'message': 'Profile updated successfully', 'user': user.to_dict()}), 200
         
     except Exception as e:
@@ -171,6 +189,7 @@ def forgot_password():
         return jsonify({'error': str(e)}), 400
 
 @auth_bp.route('/reset-password', methods=['POST'])
+@concurrency_limited('auth')
 def reset_password():
     try:
         data = get_request_json()
@@ -201,5 +220,7 @@ def reset_password():
         
         return jsonify({'message': 'Password reset successfully'}), 200
         
+    except HashingBusyError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': str(e)}), 400
\ No newline at end of file
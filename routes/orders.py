@@ -1,35 +1,40 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.order import Order, OrderItem
-from models.product import Product
 from utils.database import db
+from utils.pagination import paginate, wants_pagination
+from utils.list_queries import order_dicts, order_query
+from utils.order_events import order_events, order_event_payload
+from utils.sales_rollups import record_orders
+from utils.rate_limit import rate_limited
+from utils.admission import concurrency_limited
+from utils.idempotency import idempotent
+from utils.order_batcher import lock_products, order_batcher, order_product_ids, price_order
 
 orders_bp = Blueprint('orders', __name__)
 
 @orders_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotent
+@rate_limited('order')
+@concurrency_limited('write')
 def create_order():
     try:
         user_id = get_jwt_identity()
         data = request.get_json()
         
-        # Calculate total amount and validate products
-        total_amount = 0
-        order_items = []
+        # Group commit: wait for a batch to write this order with others
+        if current_app.config.get('ORDER_BATCHING'):
+            status, body = order_batcher.submit(current_app._get_current_object(), user_id, data)
+            return jsonify(body), status
         
-        for item in data['items']:
-            product = Product.query.get(item['product_id'])
-            if not product or not product.is_available:
-                return jsonify({'error': f'Product {item["product_id"]} not available'}), 400
-            
-            item_total = product.price * item['quantity']
-            total_amount += item_total
-            
-            order_items.append(OrderItem(
-                product_id=product.id,
-                quantity=item['quantity'],
-                price=product.price
-            ))
+        # Validate and price every line against products resolved in one round trip
+        products = lock_products(order_product_ids(data))
+        total_amount, lines = price_order(data, products)
+        order_items = [
+            OrderItem(product_id=product_id, quantity=quantity, price=price)
+            for product_id, quantity, price in lines
+        ]
         
         # Create order
         order = Order(
@@ -42,8 +47,14 @@ def create_order():
         )
         
         db.session.add(order)
+        db.session.flush()
+        record_orders([order.id])
         db.session.commit()
         
+        # Reload the committed order and its items in one go for the response
+        order = Order.query.options(Order.with_items()).filter_by(id=order.id).one()
+        order_events.publish('order.created', order_event_payload(order))
+        
         return jsonify({
             'message': 'Order created successfully',
             'order': order.to_dict()
@@ -57,8 +68,17 @@ def create_order():
 def get_user_orders():
     try:
         user_id = get_jwt_identity()
-        orders = Order.query.filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
-        return jsonify([order.to_dict() for order in orders]), 200
+        query = order_query().filter_by(user_id=user_id)
+        
+        if wants_pagination(request.args):
+            orders, next_cursor = paginate(query, Order.created_at, Order.id, request.args)
+            return jsonify({
+                'orders': order_dicts(orders),
+                'next_cursor': next_cursor
+            }), 200
+        
+        orders = query.order_by(Order.created_at.desc()).all()
+        return jsonify(order_dicts(orders)), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -68,7 +88,7 @@ def get_user_orders():
 def get_order(order_id):
     try:
         user_id = get_jwt_identity()
-        order = Order.query.get_or_404(order_id)
+        order = Order.query.options(Order.with_items()).get_or_404(order_id)
         
         # Check if user owns the order or is admin
         if order.user_id != user_id:
@@ -1,40 +1,66 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from models.product import Product, Category
-from models.user import User
-from utils.database import db
-from utils.cloudinary_service import upload_image, delete_image
+from utils.database import db, use_replica
+from utils.authz import require_admin
+from utils.cloudinary_service import allowed_file
+from utils.upload_queue import queue_image_upload
+from utils.pagination import paginate, wants_pagination
+from utils.menu_cache import cached_json, menu_cache
+from utils.product_search import search_products
+from utils.list_queries import category_dicts, product_query, row_dicts
 import os
 
 products_bp = Blueprint('products', __name__)
 
-def require_admin():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if not user or not user.is_admin:
-        return jsonify({'error': 'Admin access required'}), 403
-    return None
-
 @products_bp.route('/', methods=['GET'])
+@use_replica
 def get_products():
     try:
         category_id = request.args.get('category_id')
-        query = Product.query.filter_by(is_available=True)
         
-        if category_id:
-            query = query.filter_by(category_id=category_id)
+        def build():
+            query = product_query().filter_by(is_available=True)
+            
+            if category_id:
+                query = query.filter_by(category_id=category_id)
+            
+            if wants_pagination(request.args):
+                products, next_cursor = paginate(query, Product.created_at, Product.id, request.args)
+                return {
+                    'products': row_dicts(products),
+                    'next_cursor': next_cursor
+                }
+            
+            return row_dicts(query.all())
+        
+        key = ('products', category_id, request.args.get('limit'), request.args.get('cursor'))
+        return cached_json(key, build)
         
-        products = query.all()
-        return jsonify([product.to_dict() for product in products]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@products_bp.route('/search', methods=['GET'])
+@use_replica
+def search_menu():
+    """Ranked, typo-tolerant search over product names and descriptions"""
+    try:
+        results = search_products(
+            request.args.get('q'),
+            category_id=request.args.get('category_id', type=int),
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit')
+        )
+        return jsonify(results), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
 @products_bp.route('/<int:product_id>', methods=['GET'])
+@use_replica
 def get_product(product_id):
     try:
-        product = Product.query.get_or_404(product_id)
-        return jsonify(product.to_dict()), 200
+        return cached_json(('product', product_id), lambda: Product.query.get_or_404(product_id).to_dict())
         
     except Exception as e:
         return jsonify({'error': str(e)}), 404
@@ -48,13 +74,9 @@ def create_product():
     try:
         # Check if image file is included
         image_file = request.files.get('image')
-        image_url = None
-        
-        if image_file and image_file.filename != '':
-            upload_result = upload_image(image_file, folder="fastfood-app/products")
-            if 'error' in upload_result:
-                return jsonify({'error': upload_result['error']}), 400
-            image_url = upload_result['url']
+        has_image = image_file and image_file.filename != ''
+        if has_image and not allowed_file(image_file.filename):
+            return jsonify({'error': 'File type not allowed'}), 400
         
         # Get other form data
         data = request.form.to_dict()
@@ -63,13 +85,22 @@ def create_product():
             name=data['name'],
             description=data.get('description'),
             price=float(data['price']),
-            image_url=image_url,
             category_id=int(data['category_id']),
             is_available=data.get('is_available', 'true').lower() == 'true'
         )
         
         db.session.add(product)
         db.session.commit()
+        menu_cache.invalidate()
+        
+        # The image is uploaded in the background and patched in when done
+        if has_image:
+            job = queue_image_upload(image_file, "fastfood-app/products", Product, product.id)
+            return jsonify({
+                'message': 'Product created successfully, image upload queued',
+                'product': product.to_dict(),
+                'upload_job': job
+            }), 202
         
         return jsonify({
             'message': 'Product created successfully',
@@ -90,11 +121,9 @@ def update_product(product_id):
         
         # Check if new image is uploaded
         image_file = request.files.get('image')
-        if image_file and image_file.filename != '':
-            upload_result = upload_image(image_file, folder="fastfood-app/products")
-            if 'error' in upload_result:
-                return jsonify({'error': upload_result['error']}), 400
-            product.image_url = upload_result['url']
+        has_image = image_file and image_file.filename != ''
+        if has_image and not allowed_file(image_file.filename):
+            return jsonify({'error': 'File type not allowed'}), 400
         
         # Update other fields from form data
         data = request.form.to_dict()
@@ -111,6 +140,16 @@ def update_product(product_id):
             product.category_id = int(data['category_id'])
         
         db.session.commit()
+        menu_cache.invalidate()
+        
+        if has_image:
+            job = queue_image_upload(image_file, "fastfood-app/products", Product, product.id)
+            return jsonify({
+                'message': 'Product updated successfully, image upload queued',
+                'product': product.to_dict(),
+                'upload_job': job
+            }), 202
+        
         return jsonify({
             'message': 'Product updated successfully',
             'product': product.to_dict()
@@ -135,6 +174,7 @@ def delete_product(product_id):
         
         db.session.delete(product)
         db.session.commit()
+        menu_cache.invalidate()
         
         return jsonify({'message': 'Product deleted successfully'}), 200
         
@@ -142,10 +182,10 @@ def delete_product(product_id):
         return jsonify({'error': str(e)}), 400
 
 @products_bp.route('/categories', methods=['GET'])
+@use_replica
 def get_categories():
     try:
-        categories = Category.query.all()
-        return jsonify([category.to_dict() for category in categories]), 200
+        return cached_json(('categories',), category_dicts)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -159,25 +199,29 @@ def create_category():
     try:
         # Check if image file is included
         image_file = request.files.get('image')
-        image_url = None
-        
-        if image_file and image_file.filename != '':
-            upload_result = upload_image(image_file, folder="fastfood-app/categories")
-            if 'error' in upload_result:
-                return jsonify({'error': upload_result['error']}), 400
-            image_url = upload_result['url']
+        has_image = image_file and image_file.filename != ''
+        if has_image and not allowed_file(image_file.filename):
+            return jsonify({'error': 'File type not allowed'}), 400
         
         # Get other form data
         data = request.form.to_dict()
         
         category = Category(
             name=data['name'],
-            description=data.get('description'),
-            image_url=image_url
+            description=data.get('description')
         )
         
         db.session.add(category)
         db.session.commit()
+        menu_cache.invalidate()
+        
+        if has_image:
+            job = queue_image_upload(image_file, "fastfood-app/categories", Category, category.id)
+            return jsonify({
+                'message': 'Category created successfully, image upload queued',
+                'category': category.to_dict(),
+                'upload_job': job
+            }), 202
         
         return jsonify({
             'message': 'Category created successfully',
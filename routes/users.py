@@ -1,7 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.user import User
+from models.order import Order
 from utils.database import db
+from utils.pagination import paginate, wants_pagination
+from utils.list_queries import order_dicts, order_query
+from utils.user_cache import get_user_profile, invalidate_user
 
 users_bp = Blueprint('users', __name__)
 
@@ -11,12 +15,12 @@ def get_profile():
     """Get current user profile"""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        profile = get_user_profile(user_id)
         
-        if not user:
+        if not profile:
             return jsonify({'error': 'User not found'}), 404
             
-        return jsonify(user.to_dict()), 200
+        return jsonify(profile), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -44,6 +48,7 @@ def update_profile():
             user.address = data['address']
         
         db.session.commit()
+        invalidate_user(user.id)
         
         return jsonify({
             'message': 'Profile updated successfully',
@@ -59,15 +64,23 @@ def get_user_orders():
     """Get all orders for the current user"""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
         
-        if not user:
+        if not get_user_profile(user_id):
             return jsonify({'error': 'User not found'}), 404
             
+        query = order_query().filter_by(user_id=user_id)
+        
+        if wants_pagination(request.args):
+            orders, next_cursor = paginate(query, Order.created_at, Order.id, request.args)
+            return jsonify({
+                'orders': order_dicts(orders),
+                'next_cursor': next_cursor
+            }), 200
+        
         # Return orders sorted by creation date (newest first)
-        orders = sorted(user.orders, key=lambda x: x.created_at, reverse=True)
+        orders = query.order_by(Order.created_at.desc()).all()
         
-        return jsonify([order.to_dict() for order in orders]), 200
+        return jsonify(order_dicts(orders)), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 400
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Shared fixtures: the app on a fresh in-memory SQLite database, seeding
+helpers and a statement counter
+"""
+import os
+import pytest
+
+# Config reads the environment at import time
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+for name in ('NEON_DATABASE_URL', 'DATABASE_REPLICA_URL'):
+    os.environ.pop(name, None)
+
+class QueryCounter:
+    """Counts statements executed on an engine"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def reset(self):
+        count, self.count = self.count, 0
+        return count
+
+@pytest.fixture(scope='module')
+def app():
+    """The app with a fresh schema, shared by the tests of a module"""
+    from app import create_app
+    from utils.database import db
+
+    app = create_app()
+    app.config.update(
+        TESTING=True,
+        RATE_LIMIT_ENABLED=False,
+        PASSWORD_HASH_WORKERS=0,
+        PASSWORD_HASH_METHOD='pbkdf2:sha256:1000',
+        # Tests flush the rollups themselves
+        ROLLUP_FLUSH_INTERVAL=3600
+    )
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture(scope='module')
+def query_counter(app):
+    from utils.database import db
+
+    with app.app_context():
+        return QueryCounter(db.engine)
+
+@pytest.fixture(scope='module')
+def make_user(app):
+    """make_user(admin=False) -> (user id, Authorization header)"""
+    from flask_jwt_extended import create_access_token
+    from models.user import User
+    from utils.authz import token_claims
+    from utils.database import db
+
+    def make(admin=False):
+        with app.app_context():
+            user = User(email=f'user{User.query.count() + 1}@example.com', first_name='Test', last_name='User',
+                        is_admin=admin)
+            user.set_password('password')
+            db.session.add(user)
+            db.session.commit()
+            # Carry the role claim like a login does; the user cache outlives
+            # each module's schema, so a reused id must not fall back to it
+            token = create_access_token(identity=user.id, additional_claims=token_claims(user))
+            return user.id, {'Authorization': f'Bearer {token}'}
+    return make
+
+@pytest.fixture(scope='module')
+def make_menu(app):
+    """make_menu(categories=3, products=20) -> product ids"""
+    from models.product import Category, Product
+    from utils.database import db
+
+    def make(categories=3, products=20):
+        with app.app_context():
+            rows = [Category(name=f'Category {Category.query.count() + i}') for i in range(categories)]
+            db.session.add_all(rows)
+            db.session.flush()
+            items = [
+                Product(name=f'Product {i}', description=f'Tasty item number {i}',
+                        price=round(2 + (i % 40) * 0.25, 2), category_id=rows[i % categories].id)
+                for i in range(products)
+            ]
+            db.session.add_all(items)
+            db.session.commit()
+            return [product.id for product in items]
+    return make
+
+@pytest.fixture(scope='module')
+def make_orders(app):
+    """make_orders(user_id, product_ids, orders, items=1, status='pending') -> order ids"""
+    from models.order import Order, OrderItem
+    from utils.database import db
+
+    def make(user_id, product_ids, orders, items=1, status='pending'):
+        with app.app_context():
+            rows = [
+                Order(user_id=user_id, total_amount=items, delivery_address='1 Main Street', phone='555-0100',
+                      status=status,
+                      items=[OrderItem(product_id=product_ids[(n + k) % len(product_ids)], quantity=1, price=1.0)
+                             for k in range(items)])
+                for n in range(orders)
+            ]
+            db.session.add_all(rows)
+            db.session.commit()
+            return [order.id for order in rows]
+    return make
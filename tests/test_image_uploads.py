@@ -0,0 +1,75 @@
+"""
+The upload worker stores the resized image and its thumbnail and patches
+both URLs onto the row.
+"""
+import io
+import time
+import pytest
+
+@pytest.fixture
+def local_storage(app, tmp_path):
+    previous = {key: app.config[key] for key in ('IMAGE_STORAGE_BACKEND', 'LOCAL_STORAGE_DIR', 'UPLOAD_SPOOL_DIR')}
+    app.config.update(IMAGE_STORAGE_BACKEND='local', LOCAL_STORAGE_DIR=str(tmp_path / 'images'),
+                      UPLOAD_SPOOL_DIR=str(tmp_path / 'spool'))
+    yield tmp_path / 'images'
+    app.config.update(previous)
+
+def png(size=(1600, 1200)):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 120, 40)).save(buffer, 'PNG')
+    buffer.seek(0)
+    return buffer
+
+def wait_for(job_id, timeout=10):
+    from utils.upload_queue import upload_queue
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = upload_queue.get(job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'Upload {job_id} did not finish')
+
+def test_thumbnail_url_is_stored_and_served(app, client, make_user, make_menu, local_storage):
+    from PIL import Image
+    from models.product import Product
+    from utils.database import db
+
+    _, admin = make_user(admin=True)
+    with app.app_context():
+        category_id = db.session.get(Product, make_menu(categories=1, products=1)[0]).category_id
+    response = client.post('/api/products/', headers=admin, content_type='multipart/form-data', data={
+        'name': 'Smash Burger', 'price': '9.5', 'category_id': str(category_id), 'image': (png(), 'burger.png')
+    })
+    assert response.status_code == 202, response.get_json()
+    product_id = response.get_json()['product']['id']
+    job = wait_for(response.get_json()['upload_job']['id'])
+    assert job['status'] == 'done', job.get('error')
+
+    product = client.get(f'/api/products/{product_id}').get_json()
+    assert product['thumbnail_url'] == job['thumbnail_url']
+    assert product['thumbnail_url'].endswith('_thumb.webp')
+    listed = {row['id']: row for row in client.get('/api/products/').get_json()}
+    assert listed[product_id]['thumbnail_url'] == product['thumbnail_url']
+
+    stored = local_storage / product['thumbnail_url'].split('/uploads/', 1)[1]
+    with Image.open(stored) as thumbnail:
+        assert thumbnail.size == (400, 300)
+
+def test_new_image_url_drops_the_old_thumbnail(app, client, make_user, make_menu):
+    from models.product import Product
+    from utils.database import db
+
+    _, admin = make_user(admin=True)
+    product_id = make_menu(categories=1, products=1)[0]
+    with app.app_context():
+        db.session.get(Product, product_id).thumbnail_url = '/uploads/old_thumb.webp'
+        db.session.commit()
+
+    response = client.put(f'/api/admin/products/{product_id}', headers=admin,
+                          json={'image_url': 'https://cdn.example.com/new.webp'})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['product']['thumbnail_url'] is None
@@ -0,0 +1,52 @@
+"""
+Bulk menu import reports bad rows individually and keeps the good ones.
+"""
+import json
+import pytest
+
+@pytest.fixture(scope='module')
+def admin(make_user):
+    return make_user(admin=True)[1]
+
+def import_ndjson(client, admin, records):
+    body = '\n'.join(json.dumps(record) for record in records) + '\n'
+    return client.post('/api/admin/products/import?format=ndjson', headers=admin, data=body,
+                       content_type='application/x-ndjson')
+
+@pytest.mark.parametrize('record, error', [
+    ({'name': 123, 'price': 2, 'category': 'Mains'}, 'name must be a string'),
+    ({'name': 'Wrap', 'price': 2, 'category': ['Mains']}, 'category must be a string'),
+    ({'name': 'Wrap', 'price': 2, 'category': 'x' * 51}, 'category is longer than 50 characters'),
+    ({'name': 'Wrap', 'price': 2, 'category': 'Mains', 'description': {'text': 'hot'}},
+     'description must be a string'),
+    ({'name': 'Wrap', 'price': 2, 'category': 'Mains', 'image_url': 'https://cdn.example.com/' + 'a' * 250},
+     'image_url is longer than 255 characters'),
+    ({'name': 'Wrap', 'price': True, 'category': 'Mains'}, 'price must be a number'),
+    ({'name': 'Wrap', 'price': 'NaN', 'category': 'Mains'}, 'price must be a number'),
+    ({'name': 'Wrap', 'price': 2, 'category_id': 1.5}, 'category_id must be an integer'),
+    ({'id': True, 'name': 'Wrap', 'price': 2, 'category': 'Mains'}, 'id must be an integer'),
+])
+def test_bad_value_is_a_row_error(app, client, admin, request, record, error):
+    from models.product import Product
+
+    name = f'Burger {request.node.callspec.id}'
+    response = import_ndjson(client, admin, [{'name': name, 'price': 5.5, 'category': 'Mains'}, record])
+
+    assert response.status_code == 200, response.get_json()
+    report = response.get_json()
+    assert (report['created'], report['failed']) == (1, 1)
+    assert report['errors'] == [{'row': 2, 'error': error}]
+    with app.app_context():
+        assert Product.query.filter_by(name=name).count() == 1
+
+def test_text_fields_are_stripped(app, client, admin):
+    from models.product import Product
+
+    response = import_ndjson(client, admin, [
+        {'name': '  Fries  ', 'price': '2.5', 'category': ' Sides ', 'description': '   ', 'image_url': ''}
+    ])
+
+    assert response.get_json()['created'] == 1
+    with app.app_context():
+        product = Product.query.filter_by(name='Fries').one()
+        assert (product.category.name, product.description, product.image_url) == ('Sides', None, None)
@@ -0,0 +1,61 @@
+"""
+Order listings must run a fixed number of statements however many orders
+and items they return; a growing count means a lazy load slipped back in.
+"""
+import pytest
+
+# (orders, items per order) for the small and the large dataset
+DATASETS = ((2, 1), (25, 6))
+# The orders, then all of their items with product names
+MAX_QUERIES = 3
+PAGE = 10
+ENDPOINTS = (
+    ('admin', '/api/admin/orders'),
+    ('admin', f'/api/admin/orders?limit={PAGE}'),
+    ('customer', '/api/orders/'),
+    ('customer', f'/api/orders/?limit={PAGE}'),
+    ('customer', '/api/users/orders'),
+)
+
+@pytest.fixture(scope='module')
+def env(app, make_user, make_menu):
+    _, admin = make_user(admin=True)
+    customer, headers = make_user()
+    return {'customer': customer, 'products': make_menu(), 'headers': {'admin': admin, 'customer': headers}}
+
+@pytest.fixture
+def reseed(app, env, make_orders):
+    """Replace every order with `orders` orders of `items` lines each"""
+    from models.order import Order, OrderItem
+    from utils.database import db
+
+    def seed(orders, items):
+        with app.app_context():
+            OrderItem.query.delete()
+            Order.query.delete()
+            db.session.commit()
+        make_orders(env['customer'], env['products'], orders, items)
+    return seed
+
+def count_queries(client, counter, headers, url, orders):
+    """Statements one GET of url runs, checking it lists the expected orders"""
+    # Warm the per-user caches so only the listing itself is counted
+    assert client.get(url, headers=headers).status_code == 200
+    counter.reset()
+    response = client.get(url, headers=headers)
+    count = counter.reset()
+
+    assert response.status_code == 200
+    body = response.get_json()
+    listed = body if isinstance(body, list) else body['orders']
+    assert len(listed) == (min(orders, PAGE) if 'limit=' in url else orders)
+    return count
+
+@pytest.mark.parametrize('role, url', ENDPOINTS)
+def test_order_listing_query_count_is_constant(client, query_counter, env, reseed, role, url):
+    counts = []
+    for orders, items in DATASETS:
+        reseed(orders, items)
+        counts.append(count_queries(client, query_counter, env['headers'][role], url, orders))
+    assert counts[0] == counts[-1], f'{url} ran {counts} statements for datasets {DATASETS}'
+    assert counts[-1] <= MAX_QUERIES, f'{url} ran {counts[-1]} statements, at most {MAX_QUERIES} expected'
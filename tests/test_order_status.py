@@ -0,0 +1,142 @@
+"""
+Status changes go through the ORDER_TRANSITIONS state machine, one order at
+a time (PUT) or in bulk (POST /api/admin/orders/status).
+"""
+import pytest
+
+@pytest.fixture(scope='module')
+def env(app, make_user, make_menu):
+    _, admin = make_user(admin=True)
+    customer, headers = make_user()
+    return {'customer': customer, 'headers': headers, 'admin': admin, 'products': make_menu(products=5)}
+
+@pytest.fixture
+def orders(env, make_orders):
+    """orders(status, count=1) -> order ids"""
+    def make(status, count=1):
+        return make_orders(env['customer'], env['products'], count, status=status)
+    return make
+
+def statuses(app, order_ids):
+    from models.order import Order
+    from utils.database import db
+
+    with app.app_context():
+        return [db.session.get(Order, order_id).status for order_id in order_ids]
+
+def set_status(client, env, order_id, status):
+    return client.put(f'/api/admin/orders/{order_id}/status', headers=env['admin'], json={'status': status})
+
+def bulk(client, env, order_ids, status):
+    return client.post('/api/admin/orders/status', headers=env['admin'],
+                       json={'order_ids': order_ids, 'status': status})
+
+@pytest.mark.parametrize('current, target', [
+    ('pending', 'confirmed'),
+    ('confirmed', 'preparing'),
+    ('preparing', 'ready'),
+    ('ready', 'delivered'),
+    ('ready', 'cancelled'),
+])
+def test_legal_move(app, client, env, orders, current, target):
+    [order_id] = orders(current)
+    response = set_status(client, env, order_id, target)
+    assert response.status_code == 200
+    assert response.get_json()['order']['status'] == target
+    assert statuses(app, [order_id]) == [target]
+
+@pytest.mark.parametrize('current, target', [
+    ('delivered', 'pending'),
+    ('cancelled', 'confirmed'),
+    ('pending', 'ready'),
+    ('confirmed', 'confirmed'),
+    ('ready', 'preparing'),
+])
+def test_invalid_move_is_a_conflict(app, client, env, orders, current, target):
+    [order_id] = orders(current)
+    response = set_status(client, env, order_id, target)
+    assert response.status_code == 409
+    assert response.get_json()['error'] == f'Cannot move an order from {current} to {target}'
+    assert statuses(app, [order_id]) == [current]
+
+def test_unknown_order(client, env):
+    assert set_status(client, env, 999999, 'confirmed').status_code == 404
+
+def test_unknown_status(app, client, env, orders):
+    [order_id] = orders('pending')
+    response = set_status(client, env, order_id, 'lost')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid status'
+    assert statuses(app, [order_id]) == ['pending']
+
+def test_admin_only(client, env, orders):
+    [order_id] = orders('pending')
+    response = client.put(f'/api/admin/orders/{order_id}/status', headers=env['headers'], json={'status': 'confirmed'})
+    assert response.status_code == 403
+    response = client.post('/api/admin/orders/status', headers=env['headers'],
+                           json={'order_ids': [order_id], 'status': 'confirmed'})
+    assert response.status_code == 403
+
+def test_bulk_mixed_results(app, client, env, orders):
+    first, second = orders('pending', count=2)
+    [delivered] = orders('delivered')
+    [confirmed] = orders('confirmed')
+    response = bulk(client, env, [first, delivered, 999999, second, confirmed, first], 'confirmed')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['status'] == 'confirmed'
+    assert body['updated'] == 2
+    # One result per distinct id, in request order
+    assert body['results'] == [
+        {'id': first, 'result': 'updated', 'previous_status': 'pending'},
+        {'id': delivered, 'result': 'invalid_transition', 'status': 'delivered'},
+        {'id': 999999, 'result': 'not_found'},
+        {'id': second, 'result': 'updated', 'previous_status': 'pending'},
+        {'id': confirmed, 'result': 'invalid_transition', 'status': 'confirmed'},
+    ]
+    assert statuses(app, [first, second, delivered, confirmed]) == ['confirmed', 'confirmed', 'delivered', 'confirmed']
+
+def test_bulk_publishes_one_event_per_updated_order(client, env, orders):
+    from utils.order_events import order_events
+
+    updated = orders('preparing', count=2)
+    [skipped] = orders('pending')
+    before = len(order_events._events)
+    assert bulk(client, env, updated + [skipped], 'ready').status_code == 200
+    events = [event for _, event in list(order_events._events)[before:]]
+    assert [(event['type'], event['data']['id'], event['data']['previous_status']) for event in events] == [
+        ('order.status_changed', order_id, 'preparing') for order_id in updated
+    ]
+
+def test_bulk_cancel_takes_orders_out_of_rollups(app, client, env, orders):
+    from models.rollup import RollupChange
+
+    cancelled = orders('confirmed', count=2)
+    [already] = orders('cancelled')
+    assert bulk(client, env, cancelled + [already], 'cancelled').status_code == 200
+    with app.app_context():
+        changes = RollupChange.query.filter(RollupChange.order_id.in_(cancelled + [already])).all()
+        assert sorted((change.order_id, change.sign) for change in changes) == [(order_id, -1) for order_id in cancelled]
+
+def test_bulk_order_cap(client, env, orders):
+    from utils.order_status import MAX_BULK_ORDERS
+
+    [order_id] = orders('pending')
+    response = bulk(client, env, [order_id] + list(range(10 ** 6, 10 ** 6 + MAX_BULK_ORDERS - 1)), 'confirmed')
+    assert response.status_code == 200
+    assert response.get_json()['updated'] == 1
+
+    [order_id] = orders('pending')
+    response = bulk(client, env, [order_id] + list(range(10 ** 6, 10 ** 6 + MAX_BULK_ORDERS)), 'confirmed')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == f'At most {MAX_BULK_ORDERS} orders can be updated at once'
+
+@pytest.mark.parametrize('order_ids, status', [
+    ([], 'confirmed'),
+    (None, 'confirmed'),
+    ('1,2', 'confirmed'),
+    ([1, 'two'], 'confirmed'),
+    ([1], 'lost'),
+])
+def test_bulk_bad_request(client, env, order_ids, status):
+    assert bulk(client, env, order_ids, status).status_code == 400
@@ -0,0 +1,85 @@
+"""
+Order writes queue their rollup changes in the rollup_changes outbox; a
+flush must leave the rollups exactly as a full rebuild would.
+"""
+import pytest
+
+@pytest.fixture(scope='module')
+def env(app, make_user, make_menu):
+    _, admin = make_user(admin=True)
+    customer, headers = make_user()
+    return {'customer': customer, 'headers': headers, 'admin': admin, 'products': make_menu(products=5)}
+
+def place_order(client, env, product_index, quantity=1):
+    response = client.post('/api/orders/', headers=env['headers'], json={
+        'items': [{'product_id': env['products'][product_index], 'quantity': quantity}],
+        'delivery_address': '1 Main Street',
+        'phone': '555-0100'
+    })
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['order']['id']
+
+def snapshot(app):
+    from models.rollup import OrderRollup, SalesRollup
+
+    with app.app_context():
+        orders = sorted((row.granularity, row.order_count, round(row.revenue, 2))
+                        for row in OrderRollup.query if row.order_count)
+        sales = sorted((row.granularity, row.product_id, row.quantity, round(row.revenue, 2), row.order_count)
+                       for row in SalesRollup.query if row.quantity)
+        return orders, sales
+
+def pending(app):
+    from models.rollup import RollupChange
+
+    with app.app_context():
+        return RollupChange.query.count()
+
+def flush(app):
+    from utils.sales_rollups import rollup_queue
+
+    with app.app_context():
+        return rollup_queue.flush()
+
+def rebuild(app):
+    from utils.sales_rollups import backfill
+
+    with app.app_context():
+        backfill()
+
+def test_flush_matches_rebuild(app, client, env):
+    order_ids = [place_order(client, env, n % 5, quantity=n % 3 + 1) for n in range(6)]
+    response = client.post('/api/admin/orders/status', headers=env['admin'],
+                           json={'order_ids': order_ids[:2], 'status': 'cancelled'})
+    assert response.status_code == 200
+    assert pending(app) == 8
+
+    assert flush(app) == 8
+    assert pending(app) == 0
+    flushed = snapshot(app)
+    # The two cancelled orders were counted and taken out in the same flush
+    assert [(granularity, count) for granularity, count, _ in flushed[0]] == [('day', 4), ('hour', 4), ('month', 4)]
+    rebuild(app)
+    assert snapshot(app) == flushed
+
+def test_rejected_order_queues_nothing(app, client, env):
+    before = pending(app)
+    response = client.post('/api/orders/', headers=env['headers'], json={
+        'items': [{'product_id': 999999, 'quantity': 1}],
+        'delivery_address': '1 Main Street',
+        'phone': '555-0100'
+    })
+    assert response.status_code == 400
+    assert pending(app) == before
+
+def test_rebuild_drops_pending_changes(app, client, env):
+    flush(app)
+    place_order(client, env, 0)
+    place_order(client, env, 1)
+    assert pending(app) == 2
+
+    rebuild(app)
+    assert pending(app) == 0
+    rebuilt = snapshot(app)
+    assert flush(app) == 0
+    assert snapshot(app) == rebuilt
@@ -0,0 +1,51 @@
+import functools
+import threading
+from flask import current_app, jsonify
+
+class ConcurrencyLimiter:
+    """
+    Caps the requests of a route class running at once in this worker
+
+    Expensive classes (the password KDF, order writes) get fewer slots
+    than the worker has threads and database connections, so a burst on
+    them queues briefly and is then shed with 503 while the remaining
+    threads and connections keep serving the menu.
+    """
+
+    def __init__(self):
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def slots(self, route_class, limit):
+        with self._lock:
+            key = (route_class, limit)
+            if key not in self._slots:
+                self._slots[key] = threading.BoundedSemaphore(limit)
+            return self._slots[key]
+
+concurrency_limiter = ConcurrencyLimiter()
+
+def concurrency_limited(route_class):
+    """
+    Run the view in one of the route class's slots, or answer 503
+
+    The cap is CONCURRENCY_<ROUTE_CLASS> in the app config, 0 for none.
+    Requests wait up to CONCURRENCY_QUEUE_TIMEOUT seconds for a slot.
+    """
+    config_key = f'CONCURRENCY_{route_class.upper()}'
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            limit = current_app.config.get(config_key, 0)
+            if not limit:
+                return view(*args, **kwargs)
+            slots = concurrency_limiter.slots(route_class, limit)
+            if not slots.acquire(timeout=current_app.config.get('CONCURRENCY_QUEUE_TIMEOUT', 0.5)):
+                return jsonify({'error': 'Server is busy, try again shortly'}), 503, {'Retry-After': '1'}
+            try:
+                return view(*args, **kwargs)
+            finally:
+                slots.release()
+        return wrapper
+    return decorator
@@ -0,0 +1,45 @@
+import time
+from flask import current_app, jsonify
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt, get_jwt_identity
+from utils.user_cache import get_user_profile
+
+def token_claims(user):
+    """
+    Extra JWT claims minted into every access token
+
+    Args:
+        user: User model or profile dict
+
+    Returns:
+        dict: Claims carrying the user's role
+    """
+    is_admin = user['is_admin'] if isinstance(user, dict) else user.is_admin
+    return {'is_admin': bool(is_admin)}
+
+def issue_tokens(user):
+    """Create an access/refresh token pair for a user"""
+    return (
+        create_access_token(identity=user.id, additional_claims=token_claims(user)),
+        create_refresh_token(identity=user.id)
+    )
+
+def is_admin():
+    """
+    Check the current token's admin role without a database round trip
+
+    The is_admin claim is trusted for ADMIN_CLAIM_TTL seconds after the token
+    was issued. Older tokens fall back to the cached profile, so revoking
+    the admin flag takes effect within ADMIN_CLAIM_TTL plus USER_CACHE_TTL.
+    """
+    claims = get_jwt()
+    max_age = current_app.config.get('ADMIN_CLAIM_TTL', 300)
+    if 'is_admin' in claims and time.time() - claims.get('iat', 0) < max_age:
+        return bool(claims['is_admin'])
+
+    profile = get_user_profile(get_jwt_identity())
+    return bool(profile and profile['is_admin'])
+
+def require_admin():
+    if not is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    return None
@@ -1,23 +1,91 @@
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
 from config import Config
+from utils.http_client import get_upstream
 from werkzeug.utils import secure_filename
+import io
 import os
+import re
+
+# The Cloudinary SDK and Pillow are imported on first use: they are slow to
+# import and most workers only ever serve JSON
+
+_configured = False
 
 def configure_cloudinary():
-    """Configure Cloudinary with credentials from config"""
+    """Configure Cloudinary with credentials from config, once per process"""
+    global _configured
+    if _configured:
+        return
+    import cloudinary
     cloudinary.config(
         cloud_name=Config.CLOUDINARY_CLOUD_NAME,
         api_key=Config.CLOUDINARY_API_KEY,
         api_secret=Config.CLOUDINARY_API_SECRET
     )
+    _configured = True
+
+def _is_network_error(e):
+    """Cloudinary wraps transport failures in a plain Error with these prefixes"""
+    return str(e).startswith(("Unexpected error", "Socket error"))
+
+def _is_upstream_failure(e):
+    """
+    Whether an upload API error means Cloudinary itself is failing
+
+    Errors Cloudinary reports in its JSON body, such as an invalid image or
+    an unknown public_id, are answers from a healthy service. Only transport
+    failures and unparseable 5xx replies count against the circuit.
+    """
+    if _is_network_error(e):
+        return True
+    match = re.match(r"Error parsing server response \((\d+)\)", str(e))
+    return bool(match) and int(match.group(1)) >= 500
 
 def allowed_file(filename):
     """Check if the file extension is allowed"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
 
+# Suffix of the public_id the upload worker stores an image's thumbnail under
+THUMBNAIL_SUFFIX = "_thumb"
+
+DEFAULT_TRANSFORMATION = {
+    "width": 800,
+    "height": 600,
+    "crop": "limit",
+    "quality": "auto"
+}
+
+def _upload(source, folder, transformation, public_id=None):
+    """Send a file path or file-like object to Cloudinary"""
+    import cloudinary.uploader
+    configure_cloudinary()
+    
+    # Set default transformation if none provided, an empty one skips it
+    if transformation is None:
+        transformation = DEFAULT_TRANSFORMATION
+    
+    options = {"folder": folder}
+    if transformation:
+        options["transformation"] = [transformation]
+    if public_id:
+        options["public_id"] = public_id
+    
+    upstream = get_upstream('cloudinary', vars(Config))
+    options["timeout"] = upstream.timeout
+    
+    def send():
+        # A retried stream has to be re-read from the start
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return cloudinary.uploader.upload(source, **options)
+    
+    upload_result = upstream.call(send, retry_if=_is_network_error, failure_if=_is_upstream_failure)
+    
+    return {
+        "url": upload_result.get("secure_url"),
+        "public_id": upload_result.get("public_id")
+    }
+
 def upload_image(file, folder="fastfood-app", transformation=None):
     """
     Upload an image to Cloudinary
@@ -30,8 +98,6 @@ def upload_image(file, folder="fastfood-app", transformation=None):
     Returns:
         dict: Upload result with URL and public_id
     """
-    configure_cloudinary()
-    
     try:
         # Check if the file is allowed
         if not allowed_file(file.filename):
@@ -40,34 +106,95 @@ def upload_image(file, folder="fastfood-app", transformation=None):
         # Secure the filename
         filename = secure_filename(file.filename)
         
-        # Read file data
-        file_data = file.read()
-        
-        # Set default transformation if none provided
-        if transformation is None:
-            transformation = {
-                "width": 800,
-                "height": 600,
-                "crop": "limit",
-                "quality": "auto"
-            }
-        
-        # Upload to Cloudinary
-        upload_result = cloudinary.uploader.upload(
-            file_data,
-            folder=folder,
-            transformation=[transformation]
-        )
-        
-        return {
-            "url": upload_result.get("secure_url"),
-            "public_id": upload_result.get("public_id"),
-            "filename": filename
-        }
+        # Hand the stream to the SDK rather than reading it all into memory
+        result = _upload(file.stream, folder, transformation)
+        result["filename"] = filename
+        return result
         
     except Exception as e:
         return {"error": str(e)}
 
+def upload_file(path, folder="fastfood-app", transformation=None, public_id=None):
+    """
+    Upload an image stored on local disk to Cloudinary
+    
+    Args:
+        path: Path of the image file
+        folder: Cloudinary folder to store the image
+        transformation: Optional transformation parameters, {} for none
+        public_id: Optional public ID inside the folder
+    
+    Returns:
+        dict: Upload result with URL and public_id
+    """
+    try:
+        return _upload(path, folder, transformation, public_id)
+    except Exception as e:
+        return {"error": str(e)}
+
+def _encode(image, image_format, quality):
+    """Re-encode an image without any of the source metadata"""
+    image_format = image_format.upper()
+    if image_format == 'JPEG':
+        # JPEG has no alpha channel
+        image = image.convert('RGB')
+        options = {"quality": quality, "optimize": True, "progressive": True}
+    else:
+        options = {"quality": quality, "method": 4}
+    
+    output = io.BytesIO()
+    # No exif/icc_profile is passed on, so the output carries no metadata
+    image.save(output, format=image_format, **options)
+    return output.getvalue()
+
+def preprocess_image(source, max_size=(800, 600), thumbnail_size=(400, 300), image_format="webp", quality=80):
+    """
+    Decode, downsize, strip metadata and re-encode an image locally
+    
+    Produces the same renditions the CDN transformations used to: the main
+    image fits within max_size (Cloudinary's "limit" crop) and the thumbnail
+    fills thumbnail_size (the "fill" crop generate_image_url asks for).
+    
+    Args:
+        source: File path or file-like object
+        max_size: (width, height) bound of the main image
+        thumbnail_size: (width, height) of the thumbnail
+        image_format: "webp" or "jpeg"
+        quality: Encoder quality, 1-100
+    
+    Returns:
+        dict: image and thumbnail bytes, file extension and final size
+    """
+    from PIL import Image, ImageOps
+    
+    with Image.open(source) as image:
+        # JPEG can decode straight at 1/2, 1/4 or 1/8 scale, which skips most
+        # of the IDCT work for phone photos
+        if image.format == 'JPEG':
+            image.draft('RGB', (max_size[0], max_size[1]))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            has_alpha = 'transparency' in image.info or image.mode in ('LA', 'PA')
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+        
+        # Cheap box reduction first, so the quality resample runs on a
+        # much smaller image
+        factor = min(image.width // max_size[0], image.height // max_size[1])
+        if factor >= 2:
+            image = image.reduce(factor)
+        
+        main = image.copy()
+        main.thumbnail(max_size, Image.LANCZOS)
+        thumbnail = ImageOps.fit(image, thumbnail_size, Image.LANCZOS)
+    
+    return {
+        "image": _encode(main, image_format, quality),
+        "thumbnail": _encode(thumbnail, image_format, quality),
+        "extension": ".jpg" if image_format.lower() == "jpeg" else f".{image_format.lower()}",
+        "width": main.width,
+        "height": main.height
+    }
+
 def delete_image(public_id):
     """
     Delete an image from Cloudinary
@@ -78,10 +205,14 @@ def delete_image(public_id):
     Returns:
         dict: Result of the deletion operation
     """
+    import cloudinary.uploader
     configure_cloudinary()
     
     try:
-        result = cloudinary.uploader.destroy(public_id)
+        # Same breaker and timings as uploads; a destroy is safe to retry
+        upstream = get_upstream('cloudinary', vars(Config))
+        result = upstream.call(lambda: cloudinary.uploader.destroy(public_id, timeout=upstream.timeout),
+                               retry_if=_is_network_error, failure_if=_is_upstream_failure)
         return result
     except Exception as e:
         return {"error": str(e)}
@@ -90,6 +221,10 @@ def generate_image_url(public_id, transformation=None):
     """
     Generate a URL for an image with optional transformations
     
+    Without a transformation this is the 400x300 thumbnail the upload
+    worker rendered locally and stored next to the image, so the CDN has
+    nothing to compute.
+    
     Args:
         public_id: The public ID of the image
         transformation: Transformation parameters
@@ -97,14 +232,10 @@ def generate_image_url(public_id, transformation=None):
     Returns:
         str: The generated URL
     """
+    import cloudinary
     configure_cloudinary()
     
     if transformation is None:
-        transformation = {
-            "width": 400,
-            "height": 300,
-            "crop": "fill",
-            "quality": "auto"
-        }
+        return cloudinary.CloudinaryImage(public_id + THUMBNAIL_SUFFIX).build_url()
     
     return cloudinary.CloudinaryImage(public_id).build_url(transformation=transformation)
\ No newline at end of file
@@ -0,0 +1,318 @@
+import csv
+import io
+import math
+import time
+from datetime import datetime, timedelta
+from random import Random
+from utils.database import db
+
+CATEGORIES = (
+    ('Burgers', ('Burger', 'Cheeseburger', 'Smash Burger'), (6, 14)),
+    ('Chicken', ('Wings', 'Tenders', 'Chicken Sandwich'), (5, 13)),
+    ('Pizza', ('Pizza', 'Flatbread', 'Calzone'), (8, 18)),
+    ('Wraps', ('Wrap', 'Burrito', 'Quesadilla'), (6, 11)),
+    ('Salads', ('Salad', 'Bowl', 'Grain Bowl'), (6, 12)),
+    ('Sides', ('Fries', 'Onion Rings', 'Nuggets'), (2, 6)),
+    ('Drinks', ('Soda', 'Lemonade', 'Iced Tea'), (1.5, 4)),
+    ('Shakes', ('Shake', 'Malt', 'Float'), (3, 7)),
+    ('Desserts', ('Sundae', 'Brownie', 'Cookie'), (2, 6)),
+    ('Breakfast', ('Breakfast Sandwich', 'Hash Browns', 'Pancakes'), (3, 9)),
+    ('Kids', ('Kids Meal', 'Mini Burger', 'Kids Tenders'), (4, 7)),
+    ('Combos', ('Combo', 'Family Meal', 'Meal Deal'), (9, 25)),
+)
+FLAVOURS = ('Classic', 'Spicy', 'Smoky', 'Crispy', 'Double', 'BBQ', 'Garlic', 'Honey', 'Loaded', 'Veggie',
+            'Cheesy', 'Grilled', 'Jalapeno', 'Ranch', 'Teriyaki', 'Buffalo')
+FIRST_NAMES = ('Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn',
+               'Maria', 'Wei', 'Amara', 'Luca', 'Noor', 'Kenji', 'Ines', 'Tomas', 'Priya', 'Olu')
+LAST_NAMES = ('Smith', 'Garcia', 'Chen', 'Okafor', 'Rossi', 'Khan', 'Silva', 'Novak', 'Kim', 'Haddad',
+              'Muller', 'Tanaka', 'Lopez', 'Mensah', 'Patel', 'Dubois', 'Ivanova', 'Brown', 'Costa', 'Berg')
+STREETS = ('Main Street', 'Oak Avenue', 'Station Road', 'Park Lane', 'Market Street', 'River Road', 'Hill Crescent')
+NOTES = ('No onions', 'Extra sauce', 'Ring the bell', 'Leave at the door', 'No ice', 'Cut in half')
+
+# Share of a day's orders placed in each UTC hour: a lunch and a dinner peak
+HOUR_WEIGHTS = (1, 1, 0, 0, 0, 1, 2, 4, 5, 4, 6, 14, 20, 14, 6, 4, 5, 9, 13, 12, 8, 5, 3, 2)
+# Monday first; weekends are busier
+WEEKDAY_WEIGHTS = (0.9, 0.9, 0.95, 1.0, 1.25, 1.35, 1.15)
+ITEM_COUNTS = ((1, 2, 3, 4, 5, 6), (30, 30, 20, 11, 6, 3))
+QUANTITIES = ((1, 2, 3), (82, 14, 4))
+# Zipf exponent of product popularity and Pareto shape of customer activity
+POPULARITY_EXPONENT = 1.1
+LOYALTY_SHAPE = 1.2
+# Orders this close to `end` are still being worked on
+ACTIVE_WINDOW = timedelta(hours=1)
+ACTIVE_STATUSES = (('pending', 'confirmed', 'preparing', 'ready'), (4, 3, 3, 2))
+
+USER_COLUMNS = ('id', 'email', 'password_hash', 'first_name', 'last_name', 'phone', 'address', 'is_admin', 'created_at')
+CATEGORY_COLUMNS = ('id', 'name', 'description')
+PRODUCT_COLUMNS = ('id', 'name', 'description', 'price', 'is_available', 'category_id', 'created_at')
+ORDER_COLUMNS = ('id', 'user_id', 'total_amount', 'status', 'delivery_address', 'phone', 'notes',
+                 'created_at', 'updated_at')
+ITEM_COLUMNS = ('order_id', 'product_id', 'quantity', 'price')
+
+def _sqlite_value(value):
+    # The same text CURRENT_TIMESTAMP writes, see timestamp_param()
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+def bulk_insert(conn, table, columns, rows):
+    """
+    Insert rows through the fastest path the dialect has
+
+    Postgres gets COPY ... FROM STDIN; SQLite a raw executemany, skipping
+    SQLAlchemy's per-row processing. Anything else uses a Core insert.
+
+    Args:
+        conn: SQLAlchemy connection inside a transaction
+        table: Table name
+        columns: Column names, in row order
+        rows: List of tuples
+
+    Returns:
+        int: Rows written
+    """
+    if not rows:
+        return 0
+    dialect = conn.dialect.name
+    cursor = conn.connection.cursor()
+    try:
+        if dialect == 'postgresql':
+            buffer = io.StringIO()
+            # NULLs are written as empty unquoted fields, which CSV COPY reads back as NULL
+            csv.writer(buffer).writerows(rows)
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        elif dialect == 'sqlite':
+            placeholders = ', '.join('?' for _ in columns)
+            cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                               [tuple(_sqlite_value(value) for value in row) for row in rows])
+        else:
+            conn.execute(db.table(table, *(db.column(name) for name in columns)).insert(),
+                         [dict(zip(columns, row)) for row in rows])
+    finally:
+        cursor.close()
+    return len(rows)
+
+def _cumulative(weights):
+    total = 0.0
+    result = []
+    for weight in weights:
+        total += weight
+        result.append(total)
+    return result
+
+class DataGenerator:
+    """
+    Seeded synthetic users, menu and order history
+
+    Every table draws from its own Random, so the same seed gives the same
+    rows for a table whatever the volumes of the others. Ids continue from
+    the given offsets, so a generator can add to an existing database.
+    """
+
+    def __init__(self, seed=42, users=1000, categories=12, products=300, orders=20000, days=90,
+                 end=None, admins=1, password_hash=None, offsets=None):
+        self.seed = seed
+        self.users = users
+        self.categories = categories
+        self.products = products
+        self.orders = orders
+        self.days = days
+        self.end = end or datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        # Whole days of history, plus the part of the last day before end
+        self.start = self.end.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+        self.admins = min(admins, users)
+        self.password_hash = password_hash
+        self.offsets = offsets or {}
+        self._prices = {}
+
+    def _rng(self, name):
+        # String seeds hash the same in every process
+        return Random(f'{self.seed}:{name}')
+
+    def _ids(self, table, count):
+        first = self.offsets.get(table, 0) + 1
+        return range(first, first + count)
+
+    def category_rows(self):
+        rows = []
+        for n, category_id in enumerate(self._ids('categories', self.categories)):
+            name, nouns, _ = CATEGORIES[n % len(CATEGORIES)]
+            if category_id > len(CATEGORIES):
+                name = f'{name} {category_id}'
+            rows.append((category_id, name, f"{', '.join(nouns)} and more"))
+        return rows
+
+    def product_rows(self):
+        rng = self._rng('products')
+        category_ids = list(self._ids('categories', self.categories))
+        rows = []
+        for n, product_id in enumerate(self._ids('products', self.products)):
+            slot = n % len(category_ids)
+            _, nouns, (low, high) = CATEGORIES[slot % len(CATEGORIES)]
+            flavour, noun = rng.choice(FLAVOURS), rng.choice(nouns)
+            price = round(round(rng.uniform(low, high) * 4) / 4 - 0.01, 2)
+            self._prices[product_id] = price
+            created_at = self.start - timedelta(days=rng.randint(1, 365))
+            rows.append((product_id, f'{flavour} {noun}', f'Our {flavour.lower()} take on the {noun.lower()}',
+                         price, rng.random() > 0.04, category_ids[slot], created_at))
+        return rows
+
+    def user_rows(self):
+        rng = self._rng('users')
+        rows = []
+        for n, user_id in enumerate(self._ids('users', self.users)):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            rows.append((
+                user_id, f'user{user_id}@example.com', self.password_hash, first, last,
+                f'555-{user_id % 10000:04d}', f'{rng.randint(1, 999)} {rng.choice(STREETS)}', n < self.admins,
+                self.start - timedelta(days=rng.randint(0, 730), seconds=rng.randrange(86400)),
+            ))
+        return rows
+
+    def _orders_per_day(self):
+        """
+        Split the orders over the days by weekday, with some day-to-day noise
+
+        Returns:
+            list: (day, hours of it before end, order count) tuples
+        """
+        rng = self._rng('days')
+        days = []
+        for i in range(self.days + 1):
+            day = self.start + timedelta(days=i)
+            hours = [hour for hour in range(24) if day + timedelta(hours=hour) < self.end]
+            share = sum(HOUR_WEIGHTS[hour] for hour in hours) / sum(HOUR_WEIGHTS)
+            days.append((day, hours, WEEKDAY_WEIGHTS[day.weekday()] * rng.uniform(0.85, 1.15) * share))
+        total = sum(weight for _, _, weight in days)
+        counts = [math.floor(self.orders * weight / total) for _, _, weight in days]
+        busiest = max(range(len(days)), key=lambda i: days[i][2])
+        counts[busiest] += self.orders - sum(counts)
+        return [(day, hours, count) for (day, hours, _), count in zip(days, counts)]
+
+    def order_batches(self, user_rows, batch_size=50000):
+        """
+        Yield (order rows, item rows) in created_at order, about batch_size orders at a time
+
+        Args:
+            user_rows: Rows from user_rows(), for customer addresses and phones
+        """
+        rng = self._rng('orders')
+        if not self._prices:
+            self.product_rows()
+        customers = [row for row in user_rows if not row[7]] or user_rows
+        # A few regulars place most of the orders
+        loyalty = _cumulative(rng.paretovariate(LOYALTY_SHAPE) for _ in customers)
+        product_ids = list(self._prices)
+        rng.shuffle(product_ids)
+        popularity = _cumulative(1 / rank ** POPULARITY_EXPONENT for rank in range(1, len(product_ids) + 1))
+
+        order_id = self.offsets.get('orders', 0)
+        orders, items = [], []
+        for day, hours, count in self._orders_per_day():
+            if not count:
+                continue
+            placed = sorted(
+                day + timedelta(hours=hour, seconds=rng.randrange(
+                    max(1, min(3600, int((self.end - day).total_seconds()) - hour * 3600))
+                ))
+                for hour in rng.choices(hours, [HOUR_WEIGHTS[hour] for hour in hours], k=count)
+            )
+            buyers = rng.choices(customers, cum_weights=loyalty, k=count)
+            for created_at, customer in zip(placed, buyers):
+                order_id += 1
+                picked = dict.fromkeys(rng.choices(product_ids, cum_weights=popularity,
+                                                   k=rng.choices(*ITEM_COUNTS)[0]))
+                total = 0.0
+                for product_id in picked:
+                    quantity = rng.choices(*QUANTITIES)[0]
+                    price = self._prices[product_id]
+                    total += quantity * price
+                    items.append((order_id, product_id, quantity, price))
+                if self.end - created_at <= ACTIVE_WINDOW:
+                    status = rng.choices(*ACTIVE_STATUSES)[0]
+                else:
+                    status = 'cancelled' if rng.random() < 0.07 else 'delivered'
+                orders.append((
+                    order_id, customer[0], round(total, 2), status, customer[6], customer[5],
+                    rng.choice(NOTES) if rng.random() < 0.1 else None,
+                    created_at, created_at + timedelta(minutes=rng.randint(15, 50)),
+                ))
+                if len(orders) >= batch_size:
+                    yield orders, items
+                    orders, items = [], []
+        if orders:
+            yield orders, items
+
+def _max_ids(conn, tables):
+    return {table: conn.execute(db.text(f'SELECT coalesce(max(id), 0) FROM {table}')).scalar() for table in tables}
+
+def _advance_sequences(conn, tables):
+    """Rows copied with explicit ids leave the Postgres sequences behind them"""
+    if conn.dialect.name != 'postgresql':
+        return
+    for table in tables:
+        conn.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+        ))
+
+def generate(seed=42, users=1000, categories=12, products=300, orders=20000, days=90, end=None,
+             admins=1, password='password', batch_size=50000, rollups=True, log=None):
+    """
+    Generate and bulk load a data set, continuing after existing rows
+
+    Users, categories and products go in one transaction, orders and their
+    items in one transaction per batch_size orders. With the same seed,
+    volumes, end and starting ids the rows are identical.
+
+    Args:
+        end: Newest order time, defaults to the start of the current UTC hour
+        admins: How many of the users are admins; admins place no orders
+        password: Password of every user, hashed once
+        rollups: Rebuild the sales rollups over the generated orders
+        log: Optional callable receiving progress messages
+
+    Returns:
+        dict: Rows written per table
+    """
+    from utils.password_hashing import get_hasher
+    from utils.sales_rollups import backfill
+
+    if products and not categories:
+        raise ValueError('Generated products need at least one generated category')
+    log = log or (lambda message: None)
+    tables = ('users', 'categories', 'products', 'orders')
+    with db.engine.connect() as conn:
+        offsets = _max_ids(conn, tables)
+    generator = DataGenerator(seed, users, categories, products, orders, days, end, admins,
+                              get_hasher().hash(password) if password else None, offsets)
+
+    written = dict.fromkeys(tables + ('order_items',), 0)
+    started = time.perf_counter()
+    user_rows = generator.user_rows()
+    with db.engine.begin() as conn:
+        written['users'] = bulk_insert(conn, 'users', USER_COLUMNS, user_rows)
+        written['categories'] = bulk_insert(conn, 'categories', CATEGORY_COLUMNS, generator.category_rows())
+        written['products'] = bulk_insert(conn, 'products', PRODUCT_COLUMNS, generator.product_rows())
+    log(f"Loaded {written['users']} users, {written['categories']} categories and "
+        f"{written['products']} products in {time.perf_counter() - started:.1f}s")
+
+    if orders and user_rows and products:
+        for order_rows, item_rows in generator.order_batches(user_rows, batch_size):
+            with db.engine.begin() as conn:
+                written['orders'] += bulk_insert(conn, 'orders', ORDER_COLUMNS, order_rows)
+                written['order_items'] += bulk_insert(conn, 'order_items', ITEM_COLUMNS, item_rows)
+            elapsed = time.perf_counter() - started
+            log(f"{written['orders']} orders, {written['order_items']} items "
+                f"({(written['orders'] + written['order_items']) / elapsed:,.0f} rows/s)")
+
+    with db.engine.begin() as conn:
+        _advance_sequences(conn, tables)
+
+    if rollups and written['orders']:
+        rollup_started = time.perf_counter()
+        backfill(generator.start)
+        log(f'Rebuilt sales rollups in {time.perf_counter() - rollup_started:.1f}s')
+    return written
@@ -1,3 +1,94 @@
+import functools
+from flask import g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.dialects import sqlite
 
-db = SQLAlchemy()
\ No newline at end of file
+class RoutingSession(Session):
+    """
+    Session that sends the reads of replica-marked views to the 'replica' bind
+
+    Everything else uses the primary: writes, flushes, and any read that
+    follows a write in the same request, so a request always sees its own
+    changes. Without a configured replica the session behaves as usual.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica(clause):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        if not has_request_context() or not g.get('use_replica'):
+            return False
+        if getattr(clause, 'is_dml', False):
+            self.info['wrote'] = True
+        if self._flushing or self.info.get('wrote'):
+            return False
+        return 'replica' in self._db.engines
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    session.info['wrote'] = True
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+def use_replica(view):
+    """
+    Let a read-only view read from the replica
+
+    Only for views that can tolerate replica lag: pages that must show what
+    the same client just wrote belong on the primary.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+# Databases whose insert construct has on_conflict_do_update
+SUPPORTED_DIALECTS = ('postgresql', 'sqlite')
+
+def check_dialects(app):
+    """
+    Refuse to start on a database the rollups, rate limits and idempotency
+    keys cannot upsert into
+
+    Raises:
+        RuntimeError: A bind uses an unsupported database
+    """
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            if engine.dialect.name not in SUPPORTED_DIALECTS:
+                raise RuntimeError(
+                    f"Unsupported database {engine.dialect.name!r} for the {bind or 'primary'} bind, "
+                    f"use one of {', '.join(SUPPORTED_DIALECTS)}"
+                )
+
+def upsert_insert(dialect):
+    """
+    The dialect's insert construct, which supports on_conflict_do_update
+
+    Args:
+        dialect: Dialect name, 'postgresql' or 'sqlite'
+    """
+    # Imported here so SQLite deployments never load the Postgres dialect
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects import postgresql
+        return postgresql.insert
+    if dialect == 'sqlite':
+        return sqlite.insert
+    # check_dialects() keeps the app from starting on anything else
+    raise ValueError(f'Upserts are not supported on {dialect}')
+
+def timestamp_param(value):
+    """
+    Bind a datetime for comparison against a DateTime column
+
+    Rows written through the server-side CURRENT_TIMESTAMP default are stored
+    by SQLite as text without fractional seconds, so whole-second values must
+    be bound the same way or the text comparison is off at the boundary.
+    """
+    storage = sqlite.DATETIME(truncate_microseconds=value.microsecond == 0)
+    return db.literal(value, db.DateTime().with_variant(storage, 'sqlite'))
@@ -0,0 +1,210 @@
+import random
+import threading
+import time
+from utils.metrics import metrics
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream that is known to be failing"""
+
+class UpstreamUnavailable(Exception):
+    """A gateway/unavailable response, raised internally to drive retries"""
+
+    def __init__(self, response):
+        super().__init__(f'Upstream returned {response.status_code}')
+        self.response = response
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after repeated failures
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail fast with CircuitOpenError. Once reset_timeout seconds have passed a
+    single trial call is let through; its outcome closes or re-opens the
+    circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """Check whether a call may go through right now"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+class Upstream:
+    """
+    Timeout-bounded, retrying, circuit-broken access to one upstream service
+
+    HTTP upstreams share a keep-alive requests.Session, so repeated calls
+    reuse pooled TLS connections instead of paying a handshake each time.
+    """
+
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(self, name, timeout=(3.05, 10), retries=2, backoff=0.2,
+                 pool_size=10, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Lazily created pooled session"""
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def _sleep_before_retry(self, attempt):
+        # Full jitter keeps retrying workers from hammering the upstream in step
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def call(self, fn, retry_if=None, failure_if=None):
+        """
+        Run fn() through the circuit breaker with bounded retries
+
+        Args:
+            fn: Callable performing the upstream call
+            retry_if: Predicate on a raised exception, True when it is worth retrying
+            failure_if: Predicate on a raised exception, True when it means the
+                upstream is failing. Other exceptions, such as a rejected
+                request, are re-raised without opening the circuit. By
+                default every exception counts as a failure.
+
+        Returns:
+            The result of fn()
+        """
+        if not self.breaker.allow():
+            metrics.upstream_duration.observe((self.name, 'circuit_open'), 0.0)
+            raise CircuitOpenError(f'{self.name} circuit is open')
+
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                result = fn()
+            except Exception as e:
+                if retry_if is not None and retry_if(e) and attempt < self.retries:
+                    metrics.upstream_retries.inc((self.name,))
+                    self._sleep_before_retry(attempt)
+                    attempt += 1
+                    continue
+                if failure_if is not None and not failure_if(e):
+                    # The upstream answered; the request itself was refused
+                    self.breaker.record_success()
+                    metrics.upstream_duration.observe((self.name, 'rejected'), time.perf_counter() - started)
+                    raise
+                self.breaker.record_failure()
+                metrics.upstream_duration.observe((self.name, 'error'), time.perf_counter() - started)
+                raise
+            self.breaker.record_success()
+            metrics.upstream_duration.observe((self.name, 'ok'), time.perf_counter() - started)
+            return result
+
+    def request(self, method, url, **kwargs):
+        """
+        Send an HTTP request over the pooled session
+
+        Connection failures and 502/503/504 responses are retried. Any other
+        response, including 4xx, counts as the upstream being healthy.
+
+        Returns:
+            requests.Response
+        """
+        import requests
+
+        kwargs.setdefault('timeout', self.timeout)
+
+        def send():
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code in self.RETRY_STATUSES:
+                raise UpstreamUnavailable(response)
+            return response
+
+        def retryable(e):
+            return isinstance(e, (UpstreamUnavailable, requests.ConnectionError, requests.Timeout))
+
+        try:
+            return self.call(send, retry_if=retryable)
+        except UpstreamUnavailable as e:
+            # Retries exhausted, hand the last response back to the caller
+            return e.response
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+def get_upstream(name, config=None):
+    """
+    Return the process-wide Upstream for name, creating it on first use
+
+    Settings come from <NAME>_TIMEOUT, <NAME>_RETRIES and the shared
+    UPSTREAM_* keys of config when given.
+
+    Args:
+        name: Upstream name, e.g. 'neon_auth' or 'cloudinary'
+        config: Optional application config mapping
+
+    Returns:
+        Upstream: Shared client for that upstream
+    """
+    with _upstreams_lock:
+        if name not in _upstreams:
+            config = config or {}
+            prefix = name.upper()
+            _upstreams[name] = Upstream(
+                name,
+                timeout=config.get(f'{prefix}_TIMEOUT', (3.05, 10)),
+                retries=config.get(f'{prefix}_RETRIES', config.get('UPSTREAM_RETRIES', 2)),
+                backoff=config.get('UPSTREAM_RETRY_BACKOFF', 0.2),
+                pool_size=config.get('UPSTREAM_POOL_SIZE', 10),
+                failure_threshold=config.get('UPSTREAM_BREAKER_THRESHOLD', 5),
+                reset_timeout=config.get('UPSTREAM_BREAKER_RESET', 30.0)
+            )
+        return _upstreams[name]
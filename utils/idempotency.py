@@ -0,0 +1,221 @@
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from models.idempotency import IdempotencyKey
+from utils.database import db, upsert_insert
+
+MAX_KEY_LENGTH = 200
+# How often a duplicate polls the table for the first request's response
+POLL_INTERVAL = 0.05
+PRUNE_INTERVAL = 300
+
+StoredResponse = namedtuple('StoredResponse', 'status_code body content_type')
+
+class MemoryIdempotencyStore:
+    """
+    Idempotency keys held by this worker, least recently used dropped first
+
+    Only retries that reach the same worker are deduplicated; use the
+    database store when several workers serve orders.
+    """
+
+    def __init__(self, max_keys=10000, ttl=86400):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        # key -> [fingerprint, claimed at, StoredResponse or None while in flight]
+        self._entries = OrderedDict()
+        self._changed = threading.Condition()
+
+    def claim(self, key, fingerprint, wait, lock_timeout=None):
+        """
+        Claim key for a request, or find the response stored under it
+
+        Args:
+            key: Scoped idempotency key
+            fingerprint: Hash of the request, a reused key must match it
+            wait: Seconds to wait while another request holds the key
+            lock_timeout: Unused, a crashed request releases its key on the way out
+
+        Returns:
+            tuple: (state, StoredResponse or None) where state is 'new',
+            'replay', 'mismatch' or 'busy'
+        """
+        deadline = time.monotonic() + wait
+        with self._changed:
+            while True:
+                now = time.monotonic()
+                entry = self._entries.get(key)
+                if entry is None or now - entry[1] > self.ttl:
+                    self._entries[key] = [fingerprint, now, None]
+                    self._entries.move_to_end(key)
+                    if len(self._entries) > self.max_keys:
+                        self._entries.popitem(last=False)
+                    return 'new', None
+                if entry[0] != fingerprint:
+                    return 'mismatch', None
+                if entry[2] is not None:
+                    self._entries.move_to_end(key)
+                    return 'replay', entry[2]
+                if now >= deadline:
+                    return 'busy', None
+                self._changed.wait(deadline - now)
+
+    def complete(self, key, response):
+        """Store the response of the request holding key"""
+        with self._changed:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[2] = response
+            self._changed.notify_all()
+
+    def release(self, key):
+        """Forget key so the next retry runs the request again"""
+        with self._changed:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is None:
+                del self._entries[key]
+            self._changed.notify_all()
+
+class DatabaseIdempotencyStore:
+    """
+    Idempotency keys in the idempotency_keys table, shared by every worker
+
+    A key is claimed by inserting its row; duplicates poll the row until the
+    response lands in it. A row left in flight for lock_timeout seconds,
+    e.g. by a worker that died mid-request, can be claimed again.
+    """
+
+    def __init__(self, ttl=86400):
+        self.ttl = ttl
+        self._pruned_at = 0
+
+    def _take_over(self, conn, key, fingerprint, row, now):
+        """Reclaim an expired or abandoned row, unless another request got there first"""
+        table = IdempotencyKey.__table__
+        result = conn.execute(
+            db.update(table)
+            .where(table.c.key == key, table.c.created_at == row.created_at)
+            .values(fingerprint=fingerprint, status_code=None, body=None, content_type=None, created_at=now)
+        )
+        return result.rowcount == 1
+
+    def claim(self, key, fingerprint, wait, lock_timeout=30):
+        table = IdempotencyKey.__table__
+        deadline = time.monotonic() + wait
+        while True:
+            now = time.time()
+            with db.engine.begin() as conn:
+                if now - self._pruned_at > PRUNE_INTERVAL:
+                    self._pruned_at = now
+                    conn.execute(db.delete(table).where(table.c.created_at < now - self.ttl))
+                inserted = conn.execute(
+                    upsert_insert(conn.dialect.name)(table)
+                    .values(key=key, fingerprint=fingerprint, created_at=now)
+                    .on_conflict_do_nothing(index_elements=[table.c.key])
+                    .returning(table.c.key)
+                ).first()
+                if inserted is not None:
+                    return 'new', None
+                row = conn.execute(db.select(table).where(table.c.key == key)).first()
+                if row is None:
+                    continue
+                expired = now - row.created_at > self.ttl
+                abandoned = row.status_code is None and now - row.created_at > lock_timeout
+                if expired or abandoned:
+                    if self._take_over(conn, key, fingerprint, row, now):
+                        return 'new', None
+                    continue
+                if row.fingerprint != fingerprint:
+                    return 'mismatch', None
+                if row.status_code is not None:
+                    return 'replay', StoredResponse(row.status_code, row.body, row.content_type)
+            if time.monotonic() >= deadline:
+                return 'busy', None
+            time.sleep(POLL_INTERVAL)
+
+    def complete(self, key, response):
+        table = IdempotencyKey.__table__
+        with db.engine.begin() as conn:
+            conn.execute(
+                db.update(table).where(table.c.key == key)
+                .values(status_code=response.status_code, body=response.body, content_type=response.content_type)
+            )
+
+    def release(self, key):
+        table = IdempotencyKey.__table__
+        with db.engine.begin() as conn:
+            conn.execute(db.delete(table).where(table.c.key == key, table.c.status_code.is_(None)))
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store():
+    """Return the process-wide store selected by IDEMPOTENCY_BACKEND"""
+    config = current_app.config
+    backend = config.get('IDEMPOTENCY_BACKEND', 'memory')
+    with _stores_lock:
+        if backend not in _stores:
+            ttl = config.get('IDEMPOTENCY_TTL', 86400)
+            if backend == 'database':
+                _stores[backend] = DatabaseIdempotencyStore(ttl=ttl)
+            else:
+                _stores[backend] = MemoryIdempotencyStore(max_keys=config.get('IDEMPOTENCY_MAX_KEYS', 10000), ttl=ttl)
+        return _stores[backend]
+
+def request_fingerprint():
+    """Hash of the method, path and body, so a key reused for another request is caught"""
+    digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+def _replay(stored):
+    response = current_app.response_class(stored.body, status=stored.status_code, content_type=stored.content_type)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def idempotent(view):
+    """
+    Honour an Idempotency-Key header on a write endpoint
+
+    Keys are scoped to the user, so this sits under @jwt_required(). The
+    first request with a key runs the view; successful responses (below
+    400) are stored and replayed for retries with the same key and body.
+    A retry arriving while the first request still runs waits up to
+    IDEMPOTENCY_WAIT seconds for its response, then gets 409. Errors are
+    not stored, so the client can retry them with the same key.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        header = request.headers.get('Idempotency-Key')
+        if header is None:
+            return view(*args, **kwargs)
+        if not 0 < len(header) <= MAX_KEY_LENGTH:
+            return jsonify({'error': f'Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters'}), 400
+
+        config = current_app.config
+        store = get_store()
+        key = f'{get_jwt_identity()}:{header}'
+        state, stored = store.claim(key, request_fingerprint(), wait=config.get('IDEMPOTENCY_WAIT', 10),
+                                    lock_timeout=config.get('IDEMPOTENCY_LOCK_TIMEOUT', 30))
+        if state == 'replay':
+            return _replay(stored)
+        if state == 'mismatch':
+            return jsonify({'error': 'Idempotency-Key was already used for a different request'}), 422
+        if state == 'busy':
+            return jsonify({'error': 'A request with this Idempotency-Key is still in progress'}), 409, {'Retry-After': '1'}
+
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except BaseException:
+            store.release(key)
+            raise
+        if response.status_code < 400:
+            store.complete(key, StoredResponse(response.status_code, response.get_data(), response.content_type))
+        else:
+            store.release(key)
+        return response
+    return wrapper
@@ -0,0 +1,57 @@
+import os
+import shutil
+import uuid
+from utils.cloudinary_service import upload_file
+
+class CloudinaryStorage:
+    """Stores images on Cloudinary"""
+
+    def save(self, path, folder, public_id=None):
+        """
+        Upload a local file
+
+        Args:
+            path: Path of the file on local disk
+            folder: Destination folder
+            public_id: Optional name inside the folder
+
+        Returns:
+            dict: Upload result with url and public_id, or error
+        """
+        # Files reaching storage are already resized and re-encoded
+        return upload_file(path, folder=folder, transformation={}, public_id=public_id)
+
+class LocalStorage:
+    """Stores images on the local filesystem, a stand-in for Cloudinary in development and tests"""
+
+    def __init__(self, root, base_url):
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+
+    def save(self, path, folder, public_id=None):
+        ext = os.path.splitext(path)[1].lower()
+        public_id = f"{folder.strip('/')}/{public_id or uuid.uuid4().hex}"
+        destination = os.path.join(self.root, public_id + ext)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(path, destination)
+        return {
+            "url": f"{self.base_url}/{public_id}{ext}",
+            "public_id": public_id
+        }
+
+def get_storage(config):
+    """
+    Build the storage backend selected by IMAGE_STORAGE_BACKEND
+
+    Args:
+        config: Application config mapping
+
+    Returns:
+        Storage backend with a save(path, folder) method
+    """
+    backend = config.get('IMAGE_STORAGE_BACKEND', 'cloudinary')
+    if backend == 'local':
+        return LocalStorage(config['LOCAL_STORAGE_DIR'], config['LOCAL_STORAGE_URL'])
+    if backend == 'cloudinary':
+        return CloudinaryStorage()
+    raise ValueError(f'Unknown image storage backend: {backend}')
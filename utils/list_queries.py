@@ -0,0 +1,61 @@
+from models.order import Order, OrderItem
+from models.product import Category, Product
+from utils.database import db
+
+# Read-only listings select plain column tuples instead of entities: no
+# identity map, no change tracking and no relationship loaders. Datetimes
+# are left as-is for the JSON provider to encode.
+
+PRODUCT_COLUMNS = (Product.id, Product.name, Product.description, Product.price, Product.image_url,
+                   Product.thumbnail_url, Product.is_available, Product.category_id, Product.created_at)
+CATEGORY_COLUMNS = (Category.id, Category.name, Category.description, Category.image_url,
+                    Category.thumbnail_url)
+ORDER_COLUMNS = (Order.id, Order.user_id, Order.total_amount, Order.status, Order.delivery_address,
+                 Order.phone, Order.notes, Order.created_at, Order.updated_at)
+ITEM_COLUMNS = (OrderItem.id, OrderItem.order_id, OrderItem.product_id, OrderItem.quantity, OrderItem.price,
+                Product.name.label('product_name'))
+
+def product_query():
+    """Query of product rows, filterable and paginatable like Product.query"""
+    return db.session.query(*PRODUCT_COLUMNS)
+
+def order_query():
+    """Query of order rows, filterable and paginatable like Order.query"""
+    return db.session.query(*ORDER_COLUMNS)
+
+def row_dicts(rows):
+    """Rows as dicts keyed by column name"""
+    return [row._asdict() for row in rows]
+
+def category_dicts():
+    """Every category, shaped like Category.to_dict()"""
+    return [dict(row) for row in db.session.execute(db.select(*CATEGORY_COLUMNS)).mappings()]
+
+def order_dicts(rows):
+    """
+    Shape order rows like Order.to_dict(), items included
+
+    Args:
+        rows: Rows from order_query()
+
+    Returns:
+        list: Order dicts, each with its items and their product names
+    """
+    orders = row_dicts(rows)
+    if not orders:
+        return orders
+
+    by_id = {}
+    for order in orders:
+        order['items'] = []
+        by_id[order['id']] = order
+
+    items = db.session.execute(
+        db.select(*ITEM_COLUMNS)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .where(OrderItem.order_id.in_(list(by_id)))
+        .order_by(OrderItem.order_id, OrderItem.id)
+    ).mappings()
+    for item in items:
+        by_id[item['order_id']]['items'].append(dict(item))
+    return orders
@@ -0,0 +1,94 @@
+import hashlib
+import threading
+import time
+from flask import current_app, g, request
+
+class MenuCache:
+    """
+    In-process cache of serialized menu responses
+
+    Entries hold the final JSON bytes and their ETag, so a hit never touches
+    the database or the serializer. Every write to products or categories
+    calls invalidate(), which bumps the version and drops all entries. The
+    TTL bounds how long other workers can serve a menu that was changed
+    through a different process.
+
+    Menu views read from the replica, which may not have a write yet when
+    its invalidation arrives; cached_json() rebuilds from the primary until
+    REPLICA_MAX_LAG has passed, so a stale menu is never cached under the
+    new version.
+    """
+
+    def __init__(self, ttl=60, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = 0
+        self.invalidated_at = None
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Bump the menu version and drop every cached response"""
+        with self._lock:
+            self.version += 1
+            self.invalidated_at = time.monotonic()
+            self._entries.clear()
+
+    def invalidated_within(self, seconds):
+        """Whether the last invalidation happened less than seconds ago"""
+        invalidated_at = self.invalidated_at
+        return invalidated_at is not None and time.monotonic() - invalidated_at < seconds
+
+    def fetch(self, key, build, ttl=None):
+        """
+        Return the cached (body, etag) for key, building it on a miss
+
+        Args:
+            key: Hashable cache key, e.g. the endpoint and its filters
+            build: Callable returning the JSON-serializable payload
+            ttl: Optional override of the cache TTL in seconds
+
+        Returns:
+            tuple: (body bytes, etag string)
+        """
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            version = self.version
+        if entry and entry[0] == version and now - entry[1] < ttl:
+            return entry[2], entry[3]
+
+        body = current_app.json.dumps_bytes(build()) + b'\n'
+        etag = hashlib.sha1(body).hexdigest()
+
+        with self._lock:
+            # Don't store a snapshot built from data that was invalidated meanwhile
+            if version == self.version:
+                if key not in self._entries and len(self._entries) >= self.max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+                self._entries[key] = (version, now, body, etag)
+        return body, etag
+
+menu_cache = MenuCache()
+
+def cached_json(key, build):
+    """
+    Serve a menu payload from the cache with a strong ETag
+
+    Args:
+        key: Cache key for the payload
+        build: Callable returning the payload on a cache miss
+
+    Returns:
+        Response: 200 with the JSON body, or 304 if the client's copy is current
+    """
+    if menu_cache.invalidated_within(current_app.config.get('REPLICA_MAX_LAG', 5)):
+        # The replica may not have the write yet; a miss rebuilds from the primary
+        g.use_replica = False
+    body, etag = menu_cache.fetch(key, build, ttl=current_app.config.get('MENU_CACHE_TTL'))
+
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
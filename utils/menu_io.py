@@ -0,0 +1,211 @@
+import math
+from models.product import Product, Category
+from utils.database import db
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+EXPORT_FIELDS = ['id', 'name', 'description', 'price', 'image_url', 'thumbnail_url', 'is_available', 'category']
+
+def _parse_bool(value, default=True):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('true', '1', 'yes', 'y')
+
+def _text(record, field, max_length=None):
+    """A stripped string field of a record, None when missing or empty"""
+    value = record.get(field)
+    if value is None:
+        return None
+    # NDJSON rows can carry numbers, lists or objects where text belongs
+    if not isinstance(value, str):
+        raise ValueError(f'{field} must be a string')
+    value = value.strip()
+    if max_length is not None and len(value) > max_length:
+        raise ValueError(f'{field} is longer than {max_length} characters')
+    return value or None
+
+def _integer(record, field):
+    """An integer field of a record, None when missing or empty"""
+    value = record.get(field)
+    if value is None or value == '':
+        return None
+    # int() would quietly accept True or truncate 2.5
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f'{field} must be an integer')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} must be an integer')
+
+def _normalize(record):
+    """Validate an import record and convert it to Product column values"""
+    name = _text(record, 'name', 100)
+    if not name:
+        raise ValueError('name is required')
+
+    price = record.get('price')
+    if isinstance(price, bool):
+        raise ValueError('price must be a number')
+    try:
+        price = float(price)
+    except (TypeError, ValueError):
+        raise ValueError('price must be a number')
+    if not math.isfinite(price):
+        raise ValueError('price must be a number')
+    if price < 0:
+        raise ValueError('price must not be negative')
+
+    category = _text(record, 'category', 50)
+    category_id = _integer(record, 'category_id')
+    if category_id is None and not category:
+        raise ValueError('category or category_id is required')
+
+    product_id = _integer(record, 'id')
+
+    values = {
+        'id': product_id,
+        'name': name,
+        'price': price,
+        'category_id': category_id,
+        'category': category,
+    }
+    # Optional columns are only touched when the record carries them, so a
+    # partial row does not wipe existing data on update
+    if 'description' in record:
+        values['description'] = _text(record, 'description')
+    if 'image_url' in record:
+        values['image_url'] = _text(record, 'image_url', 255)
+        # Without its own thumbnail a new image must not keep the old one
+        values['thumbnail_url'] = None
+    if 'thumbnail_url' in record:
+        values['thumbnail_url'] = _text(record, 'thumbnail_url', 255)
+    if 'is_available' in record:
+        values['is_available'] = _parse_bool(record['is_available'])
+    return values
+
+class MenuImport:
+    """
+    Upserts products (and their categories) from a stream of records
+
+    Rows are validated one by one and written in batches of BATCH_SIZE with
+    bulk INSERT/UPDATE statements, all inside the caller's transaction. A
+    product is matched on its id when given, otherwise on (category, name).
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        # Categories are few, so keep the full name -> id map in memory
+        self.categories = dict(db.session.query(Category.name, Category.id).all())
+        self.category_ids = set(self.categories.values())
+
+    def _error(self, row, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'error': message})
+
+    def _category_id(self, name):
+        if name not in self.categories:
+            category = Category(name=name)
+            db.session.add(category)
+            db.session.flush()
+            self.categories[name] = category.id
+            self.category_ids.add(category.id)
+        return self.categories[name]
+
+    def run(self, records):
+        """
+        Consume (row, record, error) tuples as produced by read_records
+
+        Returns:
+            dict: Import report
+        """
+        batch = []
+        for row, record, error in records:
+            if error:
+                self._error(row, error)
+                continue
+            try:
+                values = _normalize(record)
+                if values['category_id'] is None:
+                    values['category_id'] = self._category_id(values['category'])
+                elif values['category_id'] not in self.category_ids:
+                    raise ValueError(f"category_id {values['category_id']} does not exist")
+            except ValueError as e:
+                self._error(row, str(e))
+                continue
+
+            del values['category']
+            batch.append((row, values))
+            if len(batch) >= BATCH_SIZE:
+                self._flush(batch)
+                batch = []
+
+        if batch:
+            self._flush(batch)
+
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda error: error['row'])
+        }
+
+    def _flush(self, batch):
+        ids = {values['id'] for _, values in batch if values['id'] is not None}
+        names = {values['name'] for _, values in batch}
+
+        existing_ids = set()
+        if ids:
+            existing_ids = {
+                product_id for (product_id,) in
+                db.session.query(Product.id).filter(Product.id.in_(ids))
+            }
+        by_key = {
+            (category_id, name): product_id
+            for product_id, category_id, name in
+            db.session.query(Product.id, Product.category_id, Product.name).filter(Product.name.in_(names))
+        }
+
+        inserts = {}
+        updates = {}
+        for row, values in batch:
+            product_id = values.pop('id')
+            key = (values['category_id'], values['name'])
+            if product_id is not None:
+                if product_id not in existing_ids:
+                    self._error(row, f'Product {product_id} does not exist')
+                    continue
+            else:
+                product_id = by_key.get(key)
+
+            if product_id is not None:
+                # Later rows for the same product win
+                updates[product_id] = dict(values, id=product_id)
+            else:
+                values.setdefault('is_available', True)
+                inserts[key] = values
+
+        if inserts:
+            db.session.bulk_insert_mappings(Product, list(inserts.values()))
+            self.created += len(inserts)
+        if updates:
+            db.session.bulk_update_mappings(Product, list(updates.values()))
+            self.updated += len(updates)
+
+def export_rows():
+    """Yield every product as a flat dict, reading the table in chunks"""
+    query = (
+        db.select(Product.id, Product.name, Product.description, Product.price,
+                  Product.image_url, Product.thumbnail_url, Product.is_available, Category.name.label('category'))
+        .join(Category, Product.category_id == Category.id)
+        .order_by(Product.id)
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    for row in db.session.execute(query):
+        yield dict(row._mapping)
@@ -0,0 +1,189 @@
+import bisect
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+
+class Histogram:
+    """Bucketed observations per label set, rendered cumulatively like Prometheus expects"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts with a final +Inf slot, sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                le = 'le="' + (bound if bound == '+Inf' else _number(bound)) + '"'
+                yield f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {count}'
+
+class Metrics:
+    """
+    Process-wide request, SQL and upstream metrics
+
+    Recording an observation is a bisect and a short lock, cheap enough
+    to leave on in production. Each worker keeps its own numbers; the
+    scraper sums them across workers.
+    """
+
+    def __init__(self):
+        self.requests = Counter('http_requests_total', 'Requests handled, by route and status',
+                                ('endpoint', 'method', 'status'))
+        self.request_duration = Histogram('http_request_duration_seconds', 'Time to build the response, by route',
+                                          ('endpoint', 'method'))
+        self.request_queries = Histogram('http_request_sql_queries', 'SQL statements run per request, by route',
+                                         ('endpoint',), QUERY_COUNT_BUCKETS)
+        self.request_sql_duration = Histogram('http_request_sql_duration_seconds',
+                                              'Time spent in SQL per request, by route', ('endpoint',))
+        self.query_duration = Histogram('db_query_duration_seconds', 'SQL statement latency, by bind',
+                                        ('bind',))
+        self.upstream_duration = Histogram('upstream_request_duration_seconds',
+                                           'Upstream calls including retries, by service and outcome',
+                                           ('upstream', 'outcome'), UPSTREAM_BUCKETS)
+        self.upstream_retries = Counter('upstream_retries_total', 'Upstream attempts retried', ('upstream',))
+        self.families = [self.requests, self.request_duration, self.request_queries, self.request_sql_duration,
+                         self.query_duration, self.upstream_duration, self.upstream_retries]
+
+    def render(self, engines=None):
+        """
+        Render every metric in the Prometheus text exposition format
+
+        Args:
+            engines: Optional mapping of bind name to engine, for pool gauges
+
+        Returns:
+            str: Metrics text
+        """
+        lines = []
+        for family in self.families:
+            lines.append(f'# HELP {family.name} {family.help}')
+            lines.append(f'# TYPE {family.name} {family.kind}')
+            lines.extend(family.samples())
+        if engines:
+            lines.append('# HELP db_pool_checked_out Connections in use, by bind')
+            lines.append('# TYPE db_pool_checked_out gauge')
+            for bind, engine in engines.items():
+                if hasattr(engine.pool, 'checkedout'):
+                    lines.append(f'db_pool_checked_out{_labels(("bind",), (bind,))} {engine.pool.checkedout()}')
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+def _listen_for_queries(engine, bind):
+    from sqlalchemy import event
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_metrics_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        metrics.query_duration.observe((bind,), elapsed)
+        if has_request_context():
+            stats = g.get('_request_metrics')
+            if stats is not None:
+                stats[1] += 1
+                stats[2] += elapsed
+
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+def init_metrics(app, db):
+    """
+    Record request and SQL metrics for app
+
+    Requests slower than METRICS_SLOW_REQUEST_MS are also logged with
+    their SQL count and time. METRICS_ENABLED can be flipped at runtime.
+    """
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            _listen_for_queries(engine, bind or 'primary')
+
+    @app.before_request
+    def start_request_metrics():
+        if app.config.get('METRICS_ENABLED', True):
+            # [start, SQL statements, SQL seconds]
+            g._request_metrics = [time.perf_counter(), 0, 0.0]
+
+    @app.after_request
+    def record_request_metrics(response):
+        stats = g.pop('_request_metrics', None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats[0]
+        endpoint = request.endpoint or 'unmatched'
+        metrics.requests.inc((endpoint, request.method, str(response.status_code)))
+        metrics.request_duration.observe((endpoint, request.method), elapsed)
+        metrics.request_queries.observe((endpoint,), stats[1])
+        metrics.request_sql_duration.observe((endpoint,), stats[2])
+
+        slow_ms = current_app.config.get('METRICS_SLOW_REQUEST_MS', 1000)
+        if slow_ms and elapsed * 1000 >= slow_ms:
+            current_app.logger.warning(
+                f'Slow request {request.method} {request.path} ({endpoint}): {elapsed * 1000:.0f}ms, '
+                f'{stats[1]} queries in {stats[2] * 1000:.0f}ms, status {response.status_code}'
+            )
+        return response
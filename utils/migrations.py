@@ -0,0 +1,113 @@
+import importlib
+import pkgutil
+from collections import namedtuple
+from datetime import datetime
+from utils.database import db
+
+MIGRATIONS_PACKAGE = 'migrations'
+# Arbitrary key for the Postgres advisory lock that serializes upgrades
+ADVISORY_LOCK_KEY = 7261534
+
+Migration = namedtuple('Migration', 'version name description module')
+
+# Kept out of db.metadata so create_all/drop_all never touch it
+_metadata = db.MetaData()
+schema_migrations = db.Table(
+    'schema_migrations', _metadata,
+    db.Column('version', db.String(32), primary_key=True),
+    db.Column('description', db.String(255)),
+    db.Column('applied_at', db.DateTime, nullable=False)
+)
+
+def discover():
+    """
+    Find the migration modules, ordered by version
+
+    Modules live in the migrations package and are named
+    <version>_<name>.py, e.g. 0002_query_indexes.py. Each defines
+    upgrade(conn) and may set transactional = False to run outside a
+    transaction (needed for CREATE INDEX CONCURRENTLY on Postgres).
+
+    Returns:
+        list: Migration tuples
+    """
+    package = importlib.import_module(MIGRATIONS_PACKAGE)
+    migrations = []
+    for info in pkgutil.iter_modules(package.__path__):
+        version, _, name = info.name.partition('_')
+        if not version.isdigit():
+            continue
+        module = importlib.import_module(f'{MIGRATIONS_PACKAGE}.{info.name}')
+        description = (module.__doc__ or name).strip().splitlines()[0]
+        migrations.append(Migration(version, name, description, module))
+    return sorted(migrations, key=lambda migration: int(migration.version))
+
+def applied_versions(conn):
+    """Versions recorded in schema_migrations, creating the table on first use"""
+    _metadata.create_all(conn)
+    return set(conn.execute(db.select(schema_migrations.c.version)).scalars())
+
+def status(engine=None):
+    """
+    Report every known migration and whether it has been applied
+
+    Returns:
+        list: (Migration, applied) pairs
+    """
+    engine = engine or db.engine
+    with engine.begin() as conn:
+        applied = applied_versions(conn)
+    return [(migration, migration.version in applied) for migration in discover()]
+
+def _run(engine, migration):
+    if getattr(migration.module, 'transactional', True):
+        context = engine.begin()
+    else:
+        context = engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+    with context as conn:
+        migration.module.upgrade(conn)
+        conn.execute(schema_migrations.insert().values(
+            version=migration.version,
+            description=migration.description[:255],
+            applied_at=datetime.utcnow()
+        ))
+
+def upgrade(target=None, engine=None, log=None):
+    """
+    Apply pending migrations in version order
+
+    On Postgres an advisory lock makes concurrent upgrades (e.g. several
+    workers deploying at once) wait for each other instead of racing.
+
+    Args:
+        target: Stop after this version, defaults to the latest
+        engine: Engine to migrate, defaults to the app's
+        log: Optional callable receiving one line per applied migration
+
+    Returns:
+        list: Migrations that were applied
+    """
+    engine = engine or db.engine
+    applied = []
+    with engine.connect() as lock_conn:
+        locking = engine.dialect.name == 'postgresql'
+        if locking:
+            lock_conn.execute(db.text('SELECT pg_advisory_lock(:key)'), {'key': ADVISORY_LOCK_KEY})
+            lock_conn.commit()
+        try:
+            with engine.begin() as conn:
+                done = applied_versions(conn)
+            for migration in discover():
+                if target and int(migration.version) > int(target):
+                    break
+                if migration.version in done:
+                    continue
+                _run(engine, migration)
+                applied.append(migration)
+                if log:
+                    log(f'Applied {migration.version} {migration.description}')
+        finally:
+            if locking:
+                lock_conn.execute(db.text('SELECT pg_advisory_unlock(:key)'), {'key': ADVISORY_LOCK_KEY})
+                lock_conn.commit()
+    return applied
@@ -1,13 +1,26 @@
-import requests
 import jwt
 from flask import current_app
 from datetime import datetime, timedelta
 from models.user import User
 from utils.database import db
+from utils.http_client import CircuitOpenError, get_upstream
 
 class NeonAuth:
     """Handles authentication using Neon's authentication system"""
     
+    @staticmethod
+    def _post(path, payload):
+        """POST to the Neon Auth API over the shared pooled client"""
+        upstream = get_upstream('neon_auth', current_app.config)
+        return upstream.post(
+            f"{current_app.config['NEON_AUTH_URL']}{path}",
+            headers={
+                "Authorization": f"Bearer {current_app.config['NEON_API_KEY']}",
+                "Content-Type": "application/json"
+            },
+            json=payload
+        )
+    
     @staticmethod
     def create_user(email, password, user_data):
         """
@@ -25,18 +38,11 @@ class NeonAuth:
         if current_app.config.get('NEON_AUTH_ENABLED'):
             try:
                 # This is a hypothetical implementation as Neon Auth API details may vary
-                response = requests.post(
-                    f"{current_app.config['NEON_AUTH_URL']}/users",
-                    headers={
-                        "Authorization": f"Bearer {current_app.config['NEON_API_KEY']}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "email": email,
-                        "password": password,
-                        "user_metadata": user_data
-                    }
-                )
+                response = NeonAuth._post("/users", {
+                    "email": email,
+                    "password": password,
+                    "user_metadata": user_data
+                })
                 
                 if response.status_code == 201:
                     neon_user_id = response.json().get('id')
@@ -56,6 +62,9 @@ class NeonAuth:
                     # Fallback to local authentication if Neon Auth fails
                     return NeonAuth._create_local_user(email, password, user_data)
                     
+            except CircuitOpenError:
+                # Neon Auth is known to be down, skip straight to local auth
+                return NeonAuth._create_local_user(email, password, user_data)
             except Exception as e:
                 current_app.logger.error(f"Neon Auth error: {str(e)}")
                 # Fallback to local authentication
@@ -95,17 +104,10 @@ class NeonAuth:
         if current_app.config.get('NEON_AUTH_ENABLED'):
             try:
                 # This is a hypothetical implementation
-                response = requests.post(
-                    f"{current_app.config['NEON_AUTH_URL']}/token",
-                    headers={
-                        "Authorization": f"Bearer {current_app.config['NEON_API_KEY']}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "email": email,
-                        "password": password
-                    }
-                )
+                response = NeonAuth._post("/token", {
+                    "email": email,
+                    "password": password
+                })
                 
                 if response.status_code == 200:
                     # Find user by email
@@ -115,6 +117,9 @@ class NeonAuth:
                     # Fallback to local authentication
                     return NeonAuth._authenticate_local_user(email, password)
                     
+            except CircuitOpenError:
+                # Neon Auth is known to be down, skip straight to local auth
+                return NeonAuth._authenticate_local_user(email, password)
             except Exception as e:
                 current_app.logger.error(f"Neon Auth error: {str(e)}")
                 # Fallback to local authentication
@@ -128,6 +133,11 @@ class NeonAuth:
         """Authenticate user with local credentials"""
         user = User.query.filter_by(email=email).first()
         if user and user.check_password(password):
+            # Upgrade hashes made with an older method or cost while we
+            # still have the plaintext
+            if user.password_needs_rehash():
+                user.set_password(password)
+                db.session.commit()
             return user
         return None
     
@@ -146,14 +156,7 @@ class NeonAuth:
         if current_app.config.get('NEON_AUTH_ENABLED'):
             try:
                 # This is a hypothetical implementation
-                response = requests.post(
-                    f"{current_app.config['NEON_AUTH_URL']}/recover",
-                    headers={
-                        "Authorization": f"Bearer {current_app.config['NEON_API_KEY']}",
-                        "Content-Type": "application/json"
-                    },
-                    json={"email": email}
-                )
+                response = NeonAuth._post("/recover", {"email": email})
                 
                 return response.status_code == 200
             except Exception as e:
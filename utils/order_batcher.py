@@ -0,0 +1,244 @@
+import queue
+import threading
+import time
+from models.order import Order, OrderItem
+from models.product import Product
+from utils.database import db
+from utils.order_events import order_events, order_event_payload
+from utils.sales_rollups import record_orders
+
+def order_product_ids(data):
+    """Ids of the products an order payload asks for"""
+    return {int(item['product_id']) for item in data['items']}
+
+def lock_products(product_ids):
+    """
+    Resolve products in one round trip, keyed by id
+
+    FOR SHARE keeps a concurrent price or availability change from landing
+    between validation and commit; SQLite has no row locks and ignores it.
+    Rows are locked in id order so concurrent writers cannot deadlock.
+    """
+    return {
+        product.id: product
+        for product in Product.query.filter(Product.id.in_(sorted(product_ids)))
+                                    .order_by(Product.id)
+                                    .with_for_update(read=True)
+    }
+
+def price_order(data, products):
+    """
+    Validate an order payload against the products and price its lines
+
+    Returns:
+        tuple: (total amount, [(product_id, quantity, unit price)])
+
+    Raises:
+        ValueError: A product is missing or unavailable
+    """
+    total_amount = 0
+    lines = []
+    for item in data['items']:
+        product = products.get(int(item['product_id']))
+        if not product or not product.is_available:
+            raise ValueError(f'Product {item["product_id"]} not available')
+        total_amount += product.price * item['quantity']
+        lines.append((product.id, item['quantity'], product.price))
+    return total_amount, lines
+
+class _Ticket:
+    """One request's order, waiting for the batch that writes it"""
+
+    def __init__(self, user_id, data):
+        self.user_id = user_id
+        self.data = data
+        self.result = None
+        self.done = threading.Event()
+        self._state = 'queued'
+        self._lock = threading.Lock()
+
+    def claim(self):
+        """Take the ticket into a batch, unless its request already gave up"""
+        with self._lock:
+            if self._state != 'queued':
+                return False
+            self._state = 'claimed'
+            return True
+
+    def abandon(self):
+        """Give up on a ticket no batch has claimed yet"""
+        with self._lock:
+            if self._state != 'queued':
+                return False
+            self._state = 'abandoned'
+            return True
+
+    def finish(self, result):
+        self.result = result
+        self.done.set()
+
+class OrderBatcher:
+    """
+    Group commit for order creation
+
+    Requests queue their order and wait. A writer thread per app takes the
+    first waiting order, gathers more for up to ORDER_BATCH_LINGER_MS or
+    until ORDER_BATCH_SIZE, and writes them all in one transaction: one
+    product lookup, one multi-row insert per table and one commit. Under load the queue refills while a batch commits, so
+    batches grow with the arrival rate and the commit cost is shared.
+    """
+
+    def __init__(self):
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def _queue(self, app):
+        with self._lock:
+            if app not in self._queues:
+                self._queues[app] = queue.Queue()
+                threading.Thread(target=self._run, args=(app, self._queues[app]),
+                                 name='order-batcher', daemon=True).start()
+            return self._queues[app]
+
+    def submit(self, app, user_id, data):
+        """
+        Queue an order for the next batch and wait for its outcome
+
+        Returns:
+            tuple: (status code, response body)
+        """
+        ticket = _Ticket(user_id, data)
+        self._queue(app).put(ticket)
+        if ticket.done.wait(app.config.get('ORDER_BATCH_TIMEOUT', 10)):
+            return ticket.result
+        if ticket.abandon():
+            return 503, {'error': 'Too many orders right now, try again shortly'}
+        # Already being written; answering now could hide a committed order
+        ticket.done.wait()
+        return ticket.result
+
+    def _gather(self, app, pending):
+        batch = [pending.get()]
+        size = app.config.get('ORDER_BATCH_SIZE', 50)
+        deadline = time.monotonic() + app.config.get('ORDER_BATCH_LINGER_MS', 5) / 1000.0
+        while len(batch) < size:
+            remaining = deadline - time.monotonic()
+            try:
+                # Past the linger, still take whatever is already queued
+                batch.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+            except queue.Empty:
+                break
+        return [ticket for ticket in batch if ticket.claim()]
+
+    def _run(self, app, pending):
+        while True:
+            tickets = self._gather(app, pending)
+            if not tickets:
+                continue
+            with app.app_context():
+                try:
+                    results = self._commit(tickets)
+                except Exception as e:
+                    app.logger.error(f'Order batch failed: {str(e)}')
+                    db.session.rollback()
+                    results = [(400, {'error': str(e)})] * len(tickets)
+                # Past this point the orders are committed and must be answered as created
+                results = self._respond(app, results)
+            for ticket, result in zip(tickets, results):
+                ticket.finish(result)
+
+    def _commit(self, tickets):
+        """
+        Write tickets together, falling back to one at a time if the batch fails
+
+        Returns:
+            list: Per ticket, the new order id or an error (status, body)
+        """
+        try:
+            return self._write(tickets)
+        except Exception as e:
+            db.session.rollback()
+            if len(tickets) == 1:
+                return [(400, {'error': str(e)})]
+            # Keep one bad order from failing the rest of its batch
+            return [result for ticket in tickets for result in self._commit([ticket])]
+
+    def _write(self, tickets):
+        results = [None] * len(tickets)
+        wanted = {}
+        for index, ticket in enumerate(tickets):
+            try:
+                wanted[index] = order_product_ids(ticket.data)
+            except Exception as e:
+                results[index] = (400, {'error': str(e)})
+        products = lock_products(set().union(*wanted.values()))
+
+        accepted, rows, lines = [], [], []
+        for index in wanted:
+            data = tickets[index].data
+            try:
+                total_amount, order_lines = price_order(data, products)
+                row = {
+                    'user_id': tickets[index].user_id,
+                    'total_amount': total_amount,
+                    'delivery_address': data['delivery_address'],
+                    'phone': data['phone'],
+                    'notes': data.get('notes')
+                }
+            except Exception as e:
+                results[index] = (400, {'error': str(e)})
+                continue
+            accepted.append(index)
+            rows.append(row)
+            lines.append(order_lines)
+        if not rows:
+            db.session.rollback()
+            return results
+
+        order_ids = db.session.scalars(
+            db.insert(Order).returning(Order.id, sort_by_parameter_order=True), rows
+        ).all()
+        items = [
+            {'order_id': order_id, 'product_id': product_id, 'quantity': quantity, 'price': price}
+            for order_id, order_lines in zip(order_ids, lines)
+            for product_id, quantity, price in order_lines
+        ]
+        if items:
+            db.session.execute(db.insert(OrderItem), items)
+        record_orders(order_ids)
+        db.session.commit()
+        for index, order_id in zip(accepted, order_ids):
+            results[index] = order_id
+        return results
+
+    def _respond(self, app, results):
+        """
+        Turn committed order ids into responses, reloading the orders and items in one go
+
+        Never raises: when the reload or an event fails the orders are still
+        reported as created, if need be with just their ids.
+        """
+        order_ids = [result for result in results if isinstance(result, int)]
+        try:
+            orders = {order.id: order
+                      for order in Order.query.options(Order.with_items()).filter(Order.id.in_(order_ids))}
+        except Exception as e:
+            app.logger.error(f'Reloading created orders {order_ids} failed: {str(e)}')
+            db.session.rollback()
+            orders = {}
+        responses = []
+        for result in results:
+            if isinstance(result, int):
+                body = {'id': result}
+                order = orders.get(result)
+                if order is not None:
+                    try:
+                        body = order.to_dict()
+                        order_events.publish('order.created', order_event_payload(order))
+                    except Exception as e:
+                        app.logger.error(f'Publishing created order {result} failed: {str(e)}')
+                result = (201, {'message': 'Order created successfully', 'order': body})
+            responses.append(result)
+        return responses
+
+order_batcher = OrderBatcher()
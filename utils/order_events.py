@@ -0,0 +1,187 @@
+import itertools
+import json
+import os
+import select
+import threading
+import time
+from collections import deque
+from flask import current_app
+from utils.database import db
+
+CHANNEL = 'order_events'
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_PAYLOAD = 7900
+# Seconds start() waits for LISTEN; the listener keeps retrying after that
+LISTEN_TIMEOUT = 5
+
+def order_event_payload(order, **extra):
+    """Compact order summary carried by events"""
+    payload = {
+        'id': order.id,
+        'user_id': order.user_id,
+        'status': order.status,
+        'total_amount': order.total_amount,
+        'created_at': order.created_at.isoformat() if order.created_at else None,
+        'updated_at': order.updated_at.isoformat() if order.updated_at else None,
+        'items': [
+            {'product_id': item.product_id, 'product_name': item.product.name if item.product else None,
+             'quantity': item.quantity}
+            for item in order.items
+        ]
+    }
+    payload.update(extra)
+    return payload
+
+class OrderEventBroadcaster:
+    """
+    Fans order events out to Server-Sent Events subscribers
+
+    Keeps the last `backlog` events so a reconnecting client can resume from
+    its Last-Event-ID. With the 'memory' transport events only reach
+    subscribers of the same process. With 'postgres' they are published via
+    NOTIFY and every worker feeds its subscribers from a LISTEN thread; all
+    workers see the same events in the same order, so ids resume anywhere.
+
+    Replay only covers events this worker received while its listener was
+    connected: the app starts listening at boot, but events NOTIFY'd before
+    that, or while the listener reconnects after a dropped connection, never
+    reach the buffer. A Last-Event-ID that is no longer buffered gets a
+    'reset' event and the client should refetch the order list.
+    """
+
+    def __init__(self, backlog=1000):
+        self._events = deque(maxlen=backlog)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._counter = itertools.count(1)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+        self._listening = threading.Event()
+
+    def _new_id(self):
+        return f'{time.time_ns() // 1000000}-{os.getpid()}-{next(self._counter)}'
+
+    def _deliver(self, event):
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, event))
+            self._cond.notify_all()
+
+    def publish(self, event_type, data):
+        """
+        Publish an event to every subscriber
+
+        Best effort: callers publish after their change has committed, so a
+        failed NOTIFY is logged rather than raised and failing the request.
+
+        Args:
+            event_type: e.g. 'order.created' or 'order.status_changed'
+            data: JSON-serializable payload
+        """
+        event = {'id': self._new_id(), 'type': event_type, 'data': data}
+        if not self.start():
+            self._deliver(event)
+            return
+
+        payload = json.dumps(event)
+        if len(payload) > MAX_NOTIFY_PAYLOAD:
+            # Large orders go out without their items
+            event['data'] = dict(data, items=None, items_truncated=True)
+            payload = json.dumps(event)
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(db.text('SELECT pg_notify(:channel, :payload)'),
+                             {'channel': CHANNEL, 'payload': payload})
+        except Exception as e:
+            current_app.logger.error(f'Order event {event_type} not published: {str(e)}')
+
+    def start(self):
+        """
+        Make sure the configured transport is running
+
+        Returns:
+            bool: True when events travel through Postgres LISTEN/NOTIFY
+        """
+        if current_app.config.get('ORDER_EVENTS_TRANSPORT') != 'postgres':
+            return False
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, args=(current_app._get_current_object(),),
+                                                  name='order-events-listener', daemon=True)
+                self._listener.start()
+        # A NOTIFY sent before LISTEN is in place would skip this worker
+        self._listening.wait(LISTEN_TIMEOUT)
+        return True
+
+    def _listen(self, app):
+        """LISTEN loop feeding NOTIFY payloads into the local buffer, reconnecting on errors"""
+        while True:
+            try:
+                with app.app_context():
+                    conn = db.engine.raw_connection()
+                raw = conn.driver_connection
+                # This connection lives in autocommit mode forever, keep it
+                # out of the pool
+                conn.detach()
+                try:
+                    raw.autocommit = True
+                    raw.cursor().execute(f'LISTEN {CHANNEL}')
+                    self._listening.set()
+                    while True:
+                        if select.select([raw], [], [], 5) == ([], [], []):
+                            continue
+                        raw.poll()
+                        while raw.notifies:
+                            notify = raw.notifies.pop(0)
+                            self._deliver(json.loads(notify.payload))
+                finally:
+                    self._listening.clear()
+                    conn.close()
+            except Exception as e:
+                app.logger.error(f'Order event listener error: {str(e)}')
+                time.sleep(1)
+
+    def subscribe(self, last_event_id=None, heartbeat=15.0):
+        """
+        Yield events as they arrive, or None every heartbeat seconds of silence
+
+        Args:
+            last_event_id: Resume after this event id; when it has already
+                left the backlog a 'reset' event tells the client to reload
+            heartbeat: Seconds between keep-alives
+        """
+        missed = False
+        with self._cond:
+            position = self._seq
+            if last_event_id:
+                matches = [seq for seq, event in self._events if event['id'] == last_event_id]
+                if matches:
+                    position = matches[0]
+                else:
+                    missed = True
+        if missed:
+            yield {'id': None, 'type': 'reset', 'data': {}}
+
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._seq > position, timeout=heartbeat)
+                pending = [(seq, event) for seq, event in self._events if seq > position]
+            if not pending:
+                yield None
+                continue
+            position = pending[-1][0]
+            for _, event in pending:
+                yield event
+
+order_events = OrderEventBroadcaster()
+
+def format_sse(event):
+    """Render an event (or None for a keep-alive) in text/event-stream framing"""
+    if event is None:
+        return ': keep-alive\n\n'
+    lines = []
+    if event['id']:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event['data'])}")
+    return '\n'.join(lines) + '\n\n'
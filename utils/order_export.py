@@ -0,0 +1,108 @@
+from datetime import datetime
+from models.order import Order, OrderItem
+from models.product import Product
+from utils.database import db, timestamp_param
+
+CHUNK_SIZE = 1000
+
+ORDER_FIELDS = ['order_id', 'user_id', 'status', 'total_amount', 'delivery_address',
+                'phone', 'notes', 'created_at', 'updated_at']
+ITEM_FIELDS = ['item_id', 'product_id', 'product_name', 'quantity', 'price']
+CSV_FIELDS = ORDER_FIELDS + ITEM_FIELDS
+
+def _parse_datetime(value, name):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO date or datetime')
+
+def parse_filters(args):
+    """
+    Validate export filters before the response starts streaming
+
+    Args:
+        args: Request args with optional status, from (inclusive) and to (exclusive)
+
+    Returns:
+        dict: status, start and end, each possibly None
+    """
+    return {
+        'status': args.get('status') or None,
+        'start': _parse_datetime(args['from'], 'from') if args.get('from') else None,
+        'end': _parse_datetime(args['to'], 'to') if args.get('to') else None
+    }
+
+def _rows(filters):
+    """
+    Stream joined order/item rows matching the export filters
+
+    Reads through a server-side cursor on Postgres (yield_per implies
+    stream_results), so only CHUNK_SIZE rows are in memory at a time.
+    """
+    query = (
+        db.select(
+            Order.id.label('order_id'), Order.user_id, Order.status, Order.total_amount,
+            Order.delivery_address, Order.phone, Order.notes, Order.created_at, Order.updated_at,
+            OrderItem.id.label('item_id'), OrderItem.product_id, Product.name.label('product_name'),
+            OrderItem.quantity, OrderItem.price
+        )
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .order_by(Order.id, OrderItem.id)
+        .execution_options(yield_per=CHUNK_SIZE)
+    )
+
+    if filters['status']:
+        query = query.where(Order.status == filters['status'])
+    if filters['start']:
+        query = query.where(Order.created_at >= timestamp_param(filters['start']))
+    if filters['end']:
+        query = query.where(Order.created_at < timestamp_param(filters['end']))
+
+    for row in db.session.execute(query):
+        yield row._mapping
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+def _order_dict(row):
+    order = {field: row[field] for field in ORDER_FIELDS}
+    order['created_at'] = _iso(order['created_at'])
+    order['updated_at'] = _iso(order['updated_at'])
+    return order
+
+def export_order_lines(filters):
+    """
+    Yield one flat dict per order item, for CSV export
+
+    Orders without items yield a single row with empty item columns.
+
+    Args:
+        filters: Output of parse_filters
+    """
+    for row in _rows(filters):
+        line = _order_dict(row)
+        line.update({field: row[field] for field in ITEM_FIELDS})
+        yield line
+
+def export_orders(filters):
+    """
+    Yield one dict per order with its items nested, for NDJSON export
+
+    Rows arrive ordered by order id, so each order is complete as soon as the
+    next one starts and only one order is held at a time.
+
+    Args:
+        filters: Output of parse_filters
+    """
+    current = None
+    for row in _rows(filters):
+        if current is None or current['order_id'] != row['order_id']:
+            if current is not None:
+                yield current
+            current = _order_dict(row)
+            current['items'] = []
+        if row['item_id'] is not None:
+            current['items'].append({field: row[field] for field in ITEM_FIELDS})
+    if current is not None:
+        yield current
@@ -0,0 +1,74 @@
+from models.order import Order, ORDER_TRANSITIONS
+from utils.database import db
+
+MAX_BULK_ORDERS = 500
+
+def allowed_from(status):
+    """Statuses an order may be in to move to `status`"""
+    return [current for current, targets in ORDER_TRANSITIONS.items() if status in targets]
+
+def parse_order_ids(value):
+    """
+    Validate the order id list of a bulk request
+
+    Returns:
+        list: Distinct ids in request order
+    """
+    if not isinstance(value, list) or not value:
+        raise ValueError('order_ids must be a non-empty list')
+    if len(value) > MAX_BULK_ORDERS:
+        raise ValueError(f'At most {MAX_BULK_ORDERS} orders can be updated at once')
+    try:
+        return list(dict.fromkeys(int(order_id) for order_id in value))
+    except (TypeError, ValueError):
+        raise ValueError('order_ids must be integers')
+
+def transition_orders(order_ids, status):
+    """
+    Move many orders to one status with a single guarded UPDATE
+
+    The UPDATE only touches rows whose current status may legally move to
+    `status`, so the state machine holds even against concurrent updates.
+    Rows are read first (locked on Postgres) to report per-id outcomes.
+    The caller commits.
+
+    Args:
+        order_ids: Distinct order ids
+        status: Target status
+
+    Returns:
+        tuple: (results, updated) where results holds one compact dict per
+            id in request order and updated maps each changed id to its
+            previous status
+    """
+    if status not in ORDER_TRANSITIONS:
+        raise ValueError('Invalid status')
+    sources = allowed_from(status)
+
+    current = dict(db.session.execute(
+        db.select(Order.id, Order.status).where(Order.id.in_(order_ids)).with_for_update()
+    ).all())
+
+    stmt = (
+        db.update(Order)
+        .where(Order.id.in_(order_ids), Order.status.in_(sources))
+        .values(status=status)
+        .execution_options(synchronize_session=False)
+    )
+    if db.engine.dialect.update_returning:
+        changed = set(db.session.execute(stmt.returning(Order.id)).scalars())
+    else:
+        db.session.execute(stmt)
+        changed = {order_id for order_id, previous in current.items() if previous in sources}
+
+    results = []
+    updated = {}
+    for order_id in order_ids:
+        if order_id not in current:
+            results.append({'id': order_id, 'result': 'not_found'})
+        elif order_id in changed:
+            updated[order_id] = current[order_id]
+            results.append({'id': order_id, 'result': 'updated', 'previous_status': current[order_id]})
+        else:
+            results.append({'id': order_id, 'result': 'invalid_transition', 'status': current[order_id]})
+    return results, updated
@@ -0,0 +1,72 @@
+import base64
+import json
+from datetime import datetime
+from utils.database import db, timestamp_param
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor or limit cannot be parsed"""
+
+def wants_pagination(args):
+    """Check whether the client opted into cursor pagination"""
+    return 'limit' in args or 'cursor' in args
+
+def parse_limit(value):
+    """Parse the limit query parameter, clamped to MAX_PAGE_SIZE"""
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise InvalidCursor('limit must be an integer')
+    if limit < 1:
+        raise InvalidCursor('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
+
+def encode_cursor(created_at, row_id):
+    """Encode the (created_at, id) position of a row as an opaque cursor"""
+    raw = json.dumps([created_at.isoformat() if created_at else None, row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+def paginate(query, created_col, id_col, args):
+    """
+    Apply newest-first keyset pagination on (created_at, id) to a query
+
+    Args:
+        query: Query to paginate
+        created_col: created_at column of the paginated model
+        id_col: Primary key column of the paginated model
+        args: Request args holding optional limit and cursor
+
+    Returns:
+        tuple: (rows, next_cursor) where next_cursor is None on the last page
+    """
+    limit = parse_limit(args.get('limit'))
+    cursor = args.get('cursor')
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(
+            db.tuple_(created_col, id_col) < db.tuple_(timestamp_param(created_at), row_id)
+        )
+
+    rows = query.order_by(None).order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return rows, next_cursor
@@ -0,0 +1,85 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class HashingBusyError(RuntimeError):
+    """Raised when too many hashing jobs are already waiting"""
+
+class PasswordHasher:
+    """
+    Runs the password KDF off the request thread
+
+    Hashes are computed in a process pool so a burst of logins cannot stall
+    the web worker, and at most max_pending jobs wait at once; callers beyond
+    that fail fast with HashingBusyError. With workers=0 hashing runs inline.
+
+    The method string must be spelled out in full, e.g. pbkdf2:sha256:600000
+    or scrypt:32768:8:1, because stored hashes are compared against it to
+    decide whether they need rehashing.
+    """
+
+    def __init__(self, method='pbkdf2:sha256:600000', workers=2, max_pending=64, queue_timeout=2.0):
+        self.method = method
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn keeps forked copies of the web worker's threads and
+                # sockets out of the hashing processes
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HashingBusyError('Password hashing is overloaded, try again shortly')
+        try:
+            return self._pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        """Hash a password with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        """Check a password against a stored hash of any supported method"""
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """Check whether a stored hash was made with another method or cost"""
+        return pwhash.split('$', 1)[0] != self.method
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+def get_hasher():
+    """Return the process-wide PasswordHasher built from the app config"""
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            config = current_app.config
+            _hasher = PasswordHasher(
+                method=config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000'),
+                workers=config.get('PASSWORD_HASH_WORKERS', 2),
+                max_pending=config.get('PASSWORD_HASH_QUEUE', 64),
+                queue_timeout=config.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2.0)
+            )
+        return _hasher
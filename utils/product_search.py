@@ -0,0 +1,324 @@
+import base64
+import bisect
+import heapq
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from flask import current_app
+from models.product import Product
+from utils.database import db
+from utils.menu_cache import menu_cache
+from utils.pagination import InvalidCursor, parse_limit
+
+MAX_TERMS = 8
+MAX_OFFSET = 1000
+# Alternatives tried per misspelled term
+MAX_FUZZY_TERMS = 5
+
+def tokenize(text, fold_accents=True):
+    """Lowercase words, with accents folded the way FTS5's unicode61 tokenizer does"""
+    text = text.lower()
+    if fold_accents:
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r'\w+', text)
+
+def max_edits(term):
+    """Typos tolerated in a term: none below 4 characters, 2 from 8 on"""
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance counting a transposition as one edit, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return current[-1]
+
+def parse_query(value, fold_accents=True):
+    """
+    Validate a search string
+
+    Returns:
+        list: Search terms
+    """
+    terms = tokenize(value or '', fold_accents)
+    if not terms:
+        raise ValueError('q must contain at least one word')
+    return terms[:MAX_TERMS]
+
+def encode_offset(offset):
+    return base64.urlsafe_b64encode(json.dumps({'offset': offset}).encode()).decode().rstrip('=')
+
+def decode_offset(cursor):
+    if not cursor:
+        return 0
+    try:
+        offset = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))['offset']
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    if not isinstance(offset, int) or not 0 <= offset <= MAX_OFFSET:
+        raise InvalidCursor('Invalid cursor')
+    return offset
+
+class MemorySearchIndex:
+    """
+    Inverted index over the available products, held in process
+
+    Matches every query term (AND) against product names and descriptions
+    by exact word, prefix or, for longer terms, within max_edits typos.
+    Exact matches outrank prefixes, which outrank typos, and name matches
+    outrank description matches.
+    """
+
+    FIELD_WEIGHTS = {'name': 2.0, 'description': 1.0}
+    MATCH_WEIGHTS = {'exact': 3.0, 'prefix': 2.0, 'fuzzy': 1.0}
+
+    def __init__(self, products):
+        self.products = {}
+        self.categories = {}
+        self.postings = defaultdict(dict)
+        for product in products:
+            self.products[product['id']] = product
+            self.categories[product['id']] = product['category_id']
+            for field, weight in self.FIELD_WEIGHTS.items():
+                for term in tokenize(product[field] or ''):
+                    postings = self.postings[term]
+                    postings[product['id']] = max(postings.get(product['id'], 0), weight)
+        self.vocabulary = sorted(self.postings)
+
+    def _matches(self, term):
+        """Yield (vocabulary term, match kind) pairs for a query term"""
+        if term in self.postings:
+            yield term, 'exact'
+        start = bisect.bisect_left(self.vocabulary, term)
+        for candidate in self.vocabulary[start:]:
+            if not candidate.startswith(term):
+                break
+            if candidate != term:
+                yield candidate, 'prefix'
+        edits = max_edits(term)
+        if edits:
+            # Typos in the first letter are rare; scanning only its block keeps this cheap
+            low = bisect.bisect_left(self.vocabulary, term[0])
+            high = bisect.bisect_left(self.vocabulary, chr(ord(term[0]) + 1))
+            for candidate in self.vocabulary[low:high]:
+                if not candidate.startswith(term) and edit_distance(term, candidate, edits) <= edits:
+                    yield candidate, 'fuzzy'
+
+    def search(self, terms, category_id=None, offset=0, limit=20):
+        """
+        Rank matching products
+
+        Returns:
+            tuple: (product dicts for the page, whether more results follow)
+        """
+        scores = None
+        for term in terms:
+            term_scores = {}
+            for candidate, kind in self._matches(term):
+                for product_id, weight in self.postings[candidate].items():
+                    score = weight * self.MATCH_WEIGHTS[kind]
+                    if score > term_scores.get(product_id, 0):
+                        term_scores[product_id] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {product_id: score + term_scores[product_id]
+                          for product_id, score in scores.items() if product_id in term_scores}
+            if not scores:
+                return [], False
+
+        if category_id:
+            scores = {product_id: score for product_id, score in scores.items()
+                      if self.categories[product_id] == category_id}
+        ranked = heapq.nsmallest(offset + limit + 1, scores, key=lambda product_id: (-scores[product_id], product_id))
+        page = ranked[offset:]
+        return [self.products[product_id] for product_id in page[:limit]], len(page) > limit
+
+class MemorySearch:
+    """
+    Serves searches from a MemorySearchIndex
+
+    The index is rebuilt after menu writes in this process, and after
+    MENU_CACHE_TTL to pick up writes made by other workers. Rebuilds run in
+    the background while searches keep using the previous index, so only
+    the very first search waits for one.
+    """
+
+    fold_accents = True
+
+    def __init__(self):
+        self._index = None
+        self._version = None
+        self._built_at = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def _build(self):
+        with self._build_lock:
+            version = menu_cache.version
+            products = Product.query.filter_by(is_available=True).order_by(Product.id)
+            index = MemorySearchIndex([product.to_dict() for product in products])
+            with self._lock:
+                self._index, self._version, self._built_at = index, version, time.monotonic()
+            return index
+
+    def _refresh(self, app):
+        try:
+            with app.app_context():
+                self._build()
+        except Exception as e:
+            app.logger.error(f'Search index rebuild failed: {str(e)}')
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def index(self):
+        ttl = current_app.config.get('MENU_CACHE_TTL', 60)
+        with self._lock:
+            index = self._index
+            stale = self._version != menu_cache.version or time.monotonic() - self._built_at > ttl
+            if index is not None and stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh, args=(current_app._get_current_object(),),
+                                 name='search-index-refresh', daemon=True).start()
+        return index if index is not None else self._build()
+
+    def search(self, terms, category_id, offset, limit):
+        return self.index().search(terms, category_id, offset, limit)
+
+class SqliteSearch:
+    """FTS5 search on SQLite, ranked by bm25 with name matches weighted up"""
+
+    fold_accents = True
+
+    def _alternatives(self, term):
+        alternatives = [f'"{term}"*']
+        edits = max_edits(term)
+        if edits:
+            candidates = db.session.execute(
+                db.text(
+                    'SELECT term FROM products_fts_vocab WHERE term >= :low AND term < :high '
+                    'AND length(term) BETWEEN :shortest AND :longest'
+                ),
+                {'low': term[0], 'high': chr(ord(term[0]) + 1),
+                 'shortest': len(term) - edits, 'longest': len(term) + edits}
+            ).scalars()
+            fuzzy = [candidate for candidate in candidates
+                     if not candidate.startswith(term) and edit_distance(term, candidate, edits) <= edits]
+            alternatives += [f'"{candidate}"' for candidate in fuzzy[:MAX_FUZZY_TERMS]]
+        return '(' + ' OR '.join(alternatives) + ')'
+
+    def search(self, terms, category_id, offset, limit):
+        match = ' AND '.join(self._alternatives(term) for term in terms)
+        query = (
+            Product.query
+            .join(db.table('products_fts', db.column('rowid')), db.text('products_fts.rowid = products.id'))
+            .filter(db.text('products_fts MATCH :match').bindparams(match=match), Product.is_available.is_(True))
+            .order_by(db.text('bm25(products_fts, 10.0, 1.0)'), Product.id)
+        )
+        if category_id:
+            query = query.filter(Product.category_id == category_id)
+        rows = query.offset(offset).limit(limit + 1).all()
+        return [product.to_dict() for product in rows[:limit]], len(rows) > limit
+
+class PostgresSearch:
+    """
+    tsvector prefix search on Postgres, plus trigram matching on names
+    for typos when pg_trgm is installed
+    """
+
+    # The 'simple' text search configuration keeps accents
+    fold_accents = False
+
+    def __init__(self, trigrams):
+        self.trigrams = trigrams
+
+    def search(self, terms, category_id, offset, limit):
+        # Generated column added by migrations/0003_product_search.py
+        document = db.literal_column('products.search_vector')
+        tsquery = db.func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+        matches = document.op('@@')(tsquery)
+        score = db.func.ts_rank(document, tsquery)
+        if self.trigrams:
+            text = ' '.join(terms)
+            matches = db.or_(matches, db.literal(text).op('<%')(Product.name))
+            score = score + db.func.word_similarity(text, Product.name)
+
+        query = Product.query.filter(matches, Product.is_available.is_(True)).order_by(score.desc(), Product.id)
+        if category_id:
+            query = query.filter(Product.category_id == category_id)
+        rows = query.offset(offset).limit(limit + 1).all()
+        return [product.to_dict() for product in rows[:limit]], len(rows) > limit
+
+memory_search = MemorySearch()
+_database_backends = {}
+_backends_lock = threading.Lock()
+
+def _database_backend(engine):
+    """The engine's full-text backend, or None when its migration has not run"""
+    with _backends_lock:
+        if engine not in _database_backends:
+            backend = None
+            with engine.connect() as conn:
+                inspector = db.inspect(conn)
+                if engine.dialect.name == 'postgresql':
+                    columns = {column['name'] for column in inspector.get_columns('products')}
+                    if 'search_vector' in columns:
+                        trigrams = conn.execute(db.text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+                        backend = PostgresSearch(trigrams=bool(trigrams))
+                elif engine.dialect.name == 'sqlite' and inspector.has_table('products_fts'):
+                    backend = SqliteSearch()
+            _database_backends[engine] = backend
+        return _database_backends[engine]
+
+def get_search_backend():
+    """
+    Pick the search backend from SEARCH_BACKEND
+
+    'memory' always uses the in-process index. 'auto' uses the database's
+    full-text search once migration 0003 has run (Postgres tsvector or
+    SQLite FTS5) and falls back to the in-process index.
+    """
+    if current_app.config.get('SEARCH_BACKEND', 'auto') == 'memory':
+        return memory_search
+    return _database_backend(db.engine) or memory_search
+
+def search_products(query, category_id=None, cursor=None, limit=None):
+    """
+    Run a ranked product search
+
+    Args:
+        query: Raw search string
+        category_id: Optional category filter
+        cursor: Opaque cursor from a previous page
+        limit: Page size, defaults to DEFAULT_PAGE_SIZE
+
+    Returns:
+        dict: products for the page and next_cursor, None on the last page
+    """
+    backend = get_search_backend()
+    terms = parse_query(query, backend.fold_accents)
+    offset = decode_offset(cursor)
+    limit = parse_limit(limit)
+    products, more = backend.search(terms, category_id, offset, limit)
+    next_offset = offset + limit
+    return {
+        'products': products,
+        'next_cursor': encode_offset(next_offset) if more and next_offset <= MAX_OFFSET else None
+    }
@@ -0,0 +1,179 @@
+import functools
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from models.rate_limit import RateLimitBucket
+from utils.database import db, upsert_insert
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Buckets checked per scope: (identity kind, config key holding the limit)
+SCOPES = {
+    'login': (('ip', 'RATE_LIMIT_LOGIN_IP'), ('account', 'RATE_LIMIT_LOGIN_ACCOUNT')),
+    'register': (('ip', 'RATE_LIMIT_REGISTER_IP'),),
+    'order': (('ip', 'RATE_LIMIT_ORDER_IP'), ('user', 'RATE_LIMIT_ORDER_USER')),
+}
+
+# Idle rows older than this are deleted from the shared table; a bucket
+# refills completely within its period, so no limit may use a longer one
+PRUNE_AGE = 86400
+PRUNE_INTERVAL = 300
+
+def parse_rate(value):
+    """
+    Parse a limit such as '10/minute' or '100/3600'
+
+    Returns:
+        tuple: (requests, period in seconds), or None when the limit is off
+    """
+    if not value or value == '0':
+        return None
+    count, _, period = value.partition('/')
+    seconds = PERIODS.get(period.strip()) or float(period)
+    if int(count) < 1 or not 0 < seconds <= PRUNE_AGE:
+        raise ValueError(f'Invalid rate limit {value!r}')
+    return int(count), seconds
+
+def _refill(tokens, updated_at, now, rate, capacity):
+    return min(capacity, tokens + (now - updated_at) * rate)
+
+class MemoryBuckets:
+    """
+    Token buckets held by this worker
+
+    Each worker counts on its own, so with N workers a client can get up
+    to N times the limit. The least recently used buckets are dropped past
+    max_keys; a dropped bucket comes back full.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity, now):
+        """
+        Take one token from the bucket at key
+
+        Returns:
+            float: 0 when allowed, else seconds until a token is available
+        """
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens = _refill(tokens, updated_at, now, rate, capacity)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return 0 if allowed else (1 - tokens) / rate
+
+class DatabaseBuckets:
+    """
+    Token buckets in the rate_limit_buckets table, shared by every worker
+
+    A take is a single upsert that refills and decrements the bucket only
+    when a token is left, so concurrent workers never overspend one.
+    """
+
+    def __init__(self):
+        self._pruned_at = 0
+
+    def take(self, key, rate, capacity, now):
+        table = RateLimitBucket.__table__
+        refilled = db.case(
+            (table.c.tokens + (now - table.c.updated_at) * rate > capacity, capacity),
+            else_=table.c.tokens + (now - table.c.updated_at) * rate
+        )
+        # Its own short transaction on the primary, outside the request's session
+        with db.engine.begin() as conn:
+            insert = upsert_insert(conn.dialect.name)(table).values(key=key, tokens=capacity - 1, updated_at=now)
+            taken = conn.execute(
+                insert.on_conflict_do_update(
+                    index_elements=[table.c.key],
+                    set_={'tokens': refilled - 1, 'updated_at': now},
+                    where=refilled >= 1
+                ).returning(table.c.tokens)
+            ).first()
+            if taken is None:
+                tokens, updated_at = conn.execute(
+                    db.select(table.c.tokens, table.c.updated_at).where(table.c.key == key)
+                ).one()
+            if now - self._pruned_at > PRUNE_INTERVAL:
+                self._pruned_at = now
+                conn.execute(db.delete(table).where(table.c.updated_at < now - PRUNE_AGE))
+        if taken is not None:
+            return 0
+        return (1 - _refill(tokens, updated_at, now, rate, capacity)) / rate
+
+class RateLimiter:
+    """Checks the token buckets of a scope against the configured backend"""
+
+    def __init__(self):
+        self.memory = MemoryBuckets()
+        self.database = DatabaseBuckets()
+
+    def _identity(self, kind):
+        if kind == 'ip':
+            # The proxy's address unless TRUSTED_PROXIES is set behind one
+            return request.remote_addr
+        if kind == 'user':
+            return get_jwt_identity()
+        if kind == 'account':
+            data = request.get_json(force=True, silent=True)
+            email = data.get('email') if isinstance(data, dict) else None
+            return email.strip().lower() if isinstance(email, str) and email.strip() else None
+        raise ValueError(f'Unknown rate limit identity {kind!r}')
+
+    def hit(self, scope):
+        """
+        Take a token from each bucket of scope, stopping at the first empty one
+
+        Returns:
+            float: 0 when allowed, else seconds the client should wait
+        """
+        config = current_app.config
+        if not config.get('RATE_LIMIT_ENABLED', True):
+            return 0
+        backend = self.database if config.get('RATE_LIMIT_BACKEND') == 'database' else self.memory
+        now = time.time()
+        for kind, config_key in SCOPES[scope]:
+            limit = parse_rate(config.get(config_key))
+            identity = self._identity(kind)
+            if limit is None or identity is None:
+                continue
+            count, period = limit
+            wait = backend.take(f'{scope}:{kind}:{identity}', count / period, count, now)
+            if wait:
+                # Later buckets keep their tokens for when this one refills
+                return wait
+        return 0
+
+rate_limiter = RateLimiter()
+
+def rate_limited(scope):
+    """
+    Reject requests over the scope's limits with 429 and Retry-After
+
+    Scopes needing the user identity must sit under @jwt_required(). A
+    failing database backend lets requests through rather than locking
+    everyone out.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                wait = rate_limiter.hit(scope)
+            except Exception as e:
+                current_app.logger.error(f'Rate limit check for {scope} failed: {str(e)}')
+                wait = 0
+            if wait:
+                # Jitter spreads the retries of clients throttled together
+                retry_after = math.ceil(wait + random.uniform(0, 1))
+                return jsonify({'error': 'Too many requests, try again later'}), 429, {'Retry-After': str(retry_after)}
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,428 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event
+from models.order import Order, OrderItem
+from models.product import Product
+from models.rollup import OrderRollup, RollupChange, SalesRollup
+from utils.database import RoutingSession, db, timestamp_param, upsert_insert
+
+GRANULARITIES = ('hour', 'day', 'month')
+# Longest series one analytics request may ask for
+MAX_BUCKETS = 1000
+DEFAULT_BUCKETS = {'hour': 48, 'day': 30, 'month': 12}
+# Outbox rows applied per flush transaction
+FLUSH_CHUNK = 1000
+
+_SQLITE_FORMATS = {
+    'hour': '%Y-%m-%d %H:00:00',
+    'day': '%Y-%m-%d 00:00:00',
+    'month': '%Y-%m-01 00:00:00'
+}
+
+def _grains():
+    """One row per granularity, cross joined so every order lands in all of them"""
+    return db.union_all(*(
+        db.select(db.literal(granularity, db.String).label('granularity'))
+        for granularity in GRANULARITIES
+    )).subquery('grains')
+
+def _bucket(dialect, granularity, created_at):
+    if dialect == 'postgresql':
+        return db.func.date_trunc(granularity, created_at)
+    # SQLite keeps DateTime columns as ISO text
+    return db.case(
+        *((granularity == name, db.func.strftime(fmt, created_at)) for name, fmt in _SQLITE_FORMATS.items())
+    )
+
+def _apply(condition, sign):
+    """
+    Add (sign=1) or remove (sign=-1) the orders matching condition from
+    every rollup, with one INSERT ... SELECT ... ON CONFLICT per table
+
+    The upserts lock the current bucket rows until commit, so callers run
+    this last in a short transaction of its own.
+    """
+    dialect = db.session.get_bind().dialect.name
+    insert = upsert_insert(dialect)
+    grains = _grains()
+    bucket = _bucket(dialect, grains.c.granularity, Order.created_at)
+
+    sales = (
+        db.select(
+            grains.c.granularity, bucket, OrderItem.product_id, Product.category_id,
+            db.func.sum(OrderItem.quantity) * sign,
+            db.func.sum(OrderItem.quantity * OrderItem.price) * sign,
+            db.func.count(db.distinct(Order.id)) * sign
+        )
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .join(Product, Product.id == OrderItem.product_id)
+        .join(grains, db.true())
+        .where(condition)
+        .group_by(grains.c.granularity, bucket, OrderItem.product_id, Product.category_id)
+        # Upsert rows in key order so concurrent orders cannot deadlock
+        .order_by(grains.c.granularity, bucket, OrderItem.product_id)
+    )
+    stmt = insert(SalesRollup).from_select(
+        ['granularity', 'bucket', 'product_id', 'category_id', 'quantity', 'revenue', 'order_count'], sales
+    )
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['granularity', 'bucket', 'product_id'],
+        set_={
+            'quantity': SalesRollup.quantity + stmt.excluded.quantity,
+            'revenue': SalesRollup.revenue + stmt.excluded.revenue,
+            'order_count': SalesRollup.order_count + stmt.excluded.order_count
+        }
+    ))
+
+    orders = (
+        db.select(
+            grains.c.granularity, bucket,
+            db.func.count(Order.id) * sign,
+            db.func.sum(Order.total_amount) * sign
+        )
+        .select_from(Order)
+        .join(grains, db.true())
+        .where(condition)
+        .group_by(grains.c.granularity, bucket)
+        .order_by(grains.c.granularity, bucket)
+    )
+    stmt = insert(OrderRollup).from_select(['granularity', 'bucket', 'order_count', 'revenue'], orders)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['granularity', 'bucket'],
+        set_={
+            'order_count': OrderRollup.order_count + stmt.excluded.order_count,
+            'revenue': OrderRollup.revenue + stmt.excluded.revenue
+        }
+    ))
+
+class RollupQueue:
+    """
+    Applies the rollup_changes outbox to the rollups in batches
+
+    Every order lands in the same current hour, day and month rows, so
+    upserting them in each order's own transaction would serialize order
+    commits on those row locks. Instead record_orders() writes an outbox
+    row with the order, and a flusher thread per app drains the outbox each
+    ROLLUP_FLUSH_INTERVAL seconds, applying the net change of every order
+    in one short transaction. Analytics trail by up to the interval;
+    changes outlive restarts and are drained by whichever worker runs next.
+    """
+
+    def __init__(self):
+        self._apps = set()
+        self._lock = threading.Lock()
+
+    def start(self, app):
+        """Start the flusher thread for app, once per process"""
+        with self._lock:
+            if app in self._apps:
+                return
+            self._apps.add(app)
+        threading.Thread(target=self._run, args=(app,), name='rollup-flusher', daemon=True).start()
+
+    def flush(self, batch_size=FLUSH_CHUNK):
+        """
+        Drain the outbox into the rollups, in the current app context
+
+        Each batch is applied and deleted in one transaction. On Postgres
+        rows another worker is draining are skipped rather than waited for.
+
+        Returns:
+            int: Outbox rows drained
+        """
+        drained = 0
+        while True:
+            try:
+                changes = db.session.execute(
+                    db.select(RollupChange.id, RollupChange.order_id, RollupChange.sign)
+                    .order_by(RollupChange.id)
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
+                ).all()
+                if not changes:
+                    db.session.rollback()
+                    return drained
+
+                # An order created and cancelled before the flush nets out to nothing
+                net = {}
+                for _, order_id, sign in changes:
+                    net[order_id] = net.get(order_id, 0) + sign
+                by_sign = {}
+                for order_id, sign in sorted(net.items()):
+                    if sign:
+                        by_sign.setdefault(sign, []).append(order_id)
+
+                db.session.execute(db.delete(RollupChange).where(RollupChange.id.in_([change.id for change in changes])))
+                for sign, order_ids in sorted(by_sign.items()):
+                    _apply(Order.id.in_(order_ids), sign)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            drained += len(changes)
+            if len(changes) < batch_size:
+                return drained
+
+    def _run(self, app):
+        while True:
+            time.sleep(app.config.get('ROLLUP_FLUSH_INTERVAL', 1.0))
+            try:
+                with app.app_context():
+                    self.flush()
+            except Exception as e:
+                app.logger.error(f'Rollup flush failed: {str(e)}')
+
+rollup_queue = RollupQueue()
+
+def record_orders(order_ids, sign=1):
+    """
+    Count orders into the rollups, through the outbox
+
+    The outbox rows commit or roll back with the caller's transaction;
+    rollup_queue applies them shortly after the commit.
+
+    Args:
+        order_ids: Ids of orders whose rows are already flushed
+        sign: -1 takes them back out again
+    """
+    if order_ids:
+        db.session.execute(db.insert(RollupChange), [{'order_id': order_id, 'sign': sign} for order_id in order_ids])
+        db.session.info['rollup_changes'] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _start_flusher(session):
+    if session.info.pop('rollup_changes', None):
+        rollup_queue.start(current_app._get_current_object())
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _forget_uncommitted(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('rollup_changes', None)
+
+def record_status_changes(previous, status):
+    """
+    Keep the rollups in step with status changes
+
+    Cancelled orders are not counted, so cancelling takes an order out of
+    the rollups and reopening a cancelled order puts it back.
+
+    Args:
+        previous: Mapping of changed order id to its status before the change
+        status: The new status
+    """
+    if status == 'cancelled':
+        record_orders([order_id for order_id, old in previous.items() if old != 'cancelled'], -1)
+    else:
+        record_orders([order_id for order_id, old in previous.items() if old == 'cancelled'], 1)
+
+def _day(value):
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def backfill(start=None, end=None, window_days=31):
+    """
+    Rebuild the rollups from orders, one committed window at a time
+
+    Windows are whole UTC days, so every bucket they touch is rebuilt from
+    scratch and nothing is counted twice. Outbox changes of orders in a
+    window are dropped in the same transaction, as the rebuild already
+    reflects them. Defaults to all order history.
+
+    Args:
+        start: First day to rebuild, defaults to the oldest order
+        end: Rebuild up to (excluding) this day, defaults to after the newest order
+        window_days: Days rebuilt per transaction
+
+    Returns:
+        int: Number of orders counted
+    """
+    first, last = db.session.execute(db.select(db.func.min(Order.created_at), db.func.max(Order.created_at))).one()
+    if first is None:
+        return 0
+    start = _day(start or first)
+    end = _day(end) if end else _day(last) + timedelta(days=1)
+
+    counted = 0
+    while start < end:
+        stop = min(start + timedelta(days=window_days), end)
+        in_window = (
+            (Order.created_at >= timestamp_param(start)) &
+            (Order.created_at < timestamp_param(stop)) &
+            (Order.status != 'cancelled')
+        )
+        created_in_window = db.select(Order.id).where(
+            Order.created_at >= timestamp_param(start), Order.created_at < timestamp_param(stop)
+        )
+        db.session.execute(db.delete(RollupChange).where(RollupChange.order_id.in_(created_in_window)))
+        for model in (SalesRollup, OrderRollup):
+            db.session.execute(
+                db.delete(model)
+                .where(model.bucket >= timestamp_param(start), model.bucket < timestamp_param(stop))
+                .where(model.granularity != 'month')
+            )
+        _apply(in_window, 1)
+        counted += db.session.execute(db.select(db.func.count(Order.id)).where(in_window)).scalar()
+        db.session.commit()
+        start = stop
+
+    _rebuild_months()
+    db.session.commit()
+    return counted
+
+def _rebuild_months():
+    """Recompute month buckets from the day buckets, which backfill windows may split"""
+    dialect = db.session.get_bind().dialect.name
+    insert = upsert_insert(dialect)
+    for model, keys, columns in (
+        (SalesRollup, ['product_id'], ['quantity', 'revenue', 'order_count']),
+        (OrderRollup, [], ['order_count', 'revenue'])
+    ):
+        db.session.execute(db.delete(model).where(model.granularity == 'month'))
+        month = _bucket(dialect, db.literal('month', db.String), model.bucket)
+        extra = [SalesRollup.category_id] if model is SalesRollup else []
+        days = (
+            db.select(
+                db.literal('month', db.String), month,
+                *[getattr(model, key) for key in keys],
+                *[db.func.max(column) for column in extra],
+                *[db.func.sum(getattr(model, column)) for column in columns]
+            )
+            .where(model.granularity == 'day')
+            .group_by(month, *[getattr(model, key) for key in keys])
+        )
+        names = ['granularity', 'bucket', *keys, *[column.key for column in extra], *columns]
+        db.session.execute(insert(model).from_select(names, days))
+
+def _floor(value, granularity):
+    if granularity == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    value = _day(value)
+    return value.replace(day=1) if granularity == 'month' else value
+
+def _step(value, granularity, count=1):
+    if granularity == 'hour':
+        return value + timedelta(hours=count)
+    if granularity == 'day':
+        return value + timedelta(days=count)
+    months = value.year * 12 + value.month - 1 + count
+    return value.replace(year=months // 12, month=months % 12 + 1)
+
+def _parse_datetime(value, name):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO date or datetime')
+
+def parse_range(args, granularity=None, max_buckets=MAX_BUCKETS):
+    """
+    Validate analytics query args
+
+    Args:
+        args: Request args with optional granularity (hour, day or month),
+            from (inclusive) and to (exclusive), both rounded down to a
+            bucket boundary
+        granularity: Use this granularity instead of the one in args
+        max_buckets: Longest allowed range in buckets, None for no limit
+
+    Returns:
+        tuple: (granularity, start, end)
+    """
+    granularity = granularity or args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+    if args.get('to'):
+        end = _floor(_parse_datetime(args['to'], 'to'), granularity)
+    else:
+        end = _step(_floor(datetime.utcnow(), granularity), granularity)
+    if args.get('from'):
+        start = _floor(_parse_datetime(args['from'], 'from'), granularity)
+    else:
+        start = _step(end, granularity, -DEFAULT_BUCKETS[granularity])
+
+    if start >= end:
+        raise ValueError('from must be before to')
+    if max_buckets and _step(start, granularity, max_buckets) < end:
+        raise ValueError(f'At most {max_buckets} {granularity} buckets per request')
+    return granularity, start, end
+
+def _in_range(model, granularity, start, end):
+    return (
+        (model.granularity == granularity) &
+        (model.bucket >= timestamp_param(start)) &
+        (model.bucket < timestamp_param(end))
+    )
+
+def order_series(granularity, start, end):
+    """Order count and revenue per bucket"""
+    rows = (
+        OrderRollup.query.filter(_in_range(OrderRollup, granularity, start, end), OrderRollup.order_count > 0)
+        .order_by(OrderRollup.bucket)
+    )
+    return [row.to_dict() for row in rows]
+
+def product_series(granularity, start, end, product_id=None, category_id=None):
+    """Quantity, revenue and order count per product per bucket"""
+    # Cancellations can leave buckets counted down to zero
+    query = SalesRollup.query.filter(_in_range(SalesRollup, granularity, start, end), SalesRollup.order_count > 0)
+    if product_id:
+        query = query.filter(SalesRollup.product_id == product_id)
+    if category_id:
+        query = query.filter(SalesRollup.category_id == category_id)
+    return [row.to_dict() for row in query.order_by(SalesRollup.bucket, SalesRollup.product_id)]
+
+def category_series(granularity, start, end, category_id=None):
+    """Quantity and revenue per category per bucket"""
+    query = (
+        db.select(SalesRollup.bucket, SalesRollup.category_id,
+                  db.func.sum(SalesRollup.quantity), db.func.sum(SalesRollup.revenue))
+        .where(_in_range(SalesRollup, granularity, start, end))
+        .group_by(SalesRollup.bucket, SalesRollup.category_id)
+        .order_by(SalesRollup.bucket, SalesRollup.category_id)
+    )
+    if category_id:
+        query = query.where(SalesRollup.category_id == category_id)
+    return [
+        {'bucket': bucket.isoformat(), 'category_id': category, 'quantity': quantity, 'revenue': revenue}
+        for bucket, category, quantity, revenue in db.session.execute(query)
+    ]
+
+def top_products(start, end, limit=10, category_id=None):
+    """
+    Best sellers by revenue between two days
+
+    Whole months in the range are read from month buckets and only the
+    partial months at either end from day buckets, so long ranges stay cheap.
+    """
+    start, end = _day(start), _day(end)
+    first_month = _floor(start, 'month')
+    if first_month < start:
+        first_month = _step(first_month, 'month')
+    last_month = _floor(end, 'month')
+
+    if first_month < last_month:
+        covered = (
+            _in_range(SalesRollup, 'day', start, first_month) |
+            _in_range(SalesRollup, 'month', first_month, last_month) |
+            _in_range(SalesRollup, 'day', last_month, end)
+        )
+    else:
+        covered = _in_range(SalesRollup, 'day', start, end)
+
+    revenue = db.func.sum(SalesRollup.revenue)
+    query = (
+        db.select(SalesRollup.product_id, Product.name, db.func.sum(SalesRollup.quantity), revenue)
+        .join(Product, Product.id == SalesRollup.product_id)
+        .where(covered)
+        .group_by(SalesRollup.product_id, Product.name)
+        .order_by(revenue.desc(), SalesRollup.product_id)
+        .limit(limit)
+    )
+    if category_id:
+        query = query.where(SalesRollup.category_id == category_id)
+    return [
+        {'product_id': product_id, 'product_name': name, 'quantity': quantity, 'revenue': revenue}
+        for product_id, name, quantity, revenue in db.session.execute(query)
+    ]
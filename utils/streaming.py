@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+from flask import Response, stream_with_context
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+def request_format(request, default='ndjson'):
+    """
+    Pick csv or ndjson from the format query arg or the Content-Type header
+
+    Returns:
+        str: 'csv' or 'ndjson'
+    """
+    fmt = request.args.get('format')
+    if not fmt:
+        mimetype = request.mimetype or ''
+        fmt = 'csv' if mimetype == 'text/csv' else default
+    if fmt not in FORMATS:
+        raise ValueError(f'Unsupported format: {fmt}')
+    return fmt
+
+def _text_lines(stream):
+    """Decode a binary stream line by line without buffering the whole body"""
+    first = True
+    for line in stream:
+        text = line.decode('utf-8')
+        if first:
+            text = text.lstrip('\ufeff')
+            first = False
+        yield text
+
+def read_records(stream, fmt):
+    """
+    Iterate records from a CSV (with header row) or NDJSON stream
+
+    Args:
+        stream: Binary file-like object, e.g. request.stream
+        fmt: 'csv' or 'ndjson'
+
+    Yields:
+        tuple: (row number, dict or None, error message or None)
+    """
+    lines = _text_lines(stream)
+
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for record in reader:
+            # Header is line 1, so data rows start at 2
+            yield reader.line_num, record, None
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(record, dict):
+            yield number, None, 'Each line must be a JSON object'
+            continue
+        yield number, record, None
+
+def _csv_lines(rows, fieldnames):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        # Flush roughly every 64KB rather than once per row
+        if buffer.tell() >= 65536:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, default=str) + '\n'
+
+def stream_download(rows, fmt, fieldnames, filename):
+    """
+    Stream an iterable of dicts to the client as a CSV or NDJSON attachment
+
+    Args:
+        rows: Iterable of dicts, consumed lazily while the response is sent
+        fmt: 'csv' or 'ndjson'
+        fieldnames: Column order for CSV output
+        filename: Download name without extension
+
+    Returns:
+        Response: Streaming response
+    """
+    chunks = _csv_lines(rows, fieldnames) if fmt == 'csv' else _ndjson_lines(rows)
+    return Response(
+        stream_with_context(chunks),
+        mimetype=FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={filename}.{fmt}'}
+    )
@@ -0,0 +1,159 @@
+import os
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.utils import secure_filename
+from utils.cloudinary_service import THUMBNAIL_SUFFIX, preprocess_image
+from utils.database import db
+from utils.image_storage import get_storage
+from utils.menu_cache import menu_cache
+
+MAX_TRACKED_JOBS = 1000
+
+class UploadQueue:
+    """
+    Uploads images on a background worker pool
+
+    Requests spool the upload to disk and enqueue a job. A worker resizes and
+    re-encodes the file locally, pushes it and its thumbnail to the configured
+    storage backend and then patches image_url and thumbnail_url on the
+    target row, so a slow upstream never holds a request thread.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _pool(self, app):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=app.config.get('UPLOAD_WORKERS', 4),
+                    thread_name_prefix='image-upload'
+                )
+            return self._executor
+
+    def spool(self, file, spool_dir):
+        """
+        Save an uploaded file to the spool directory in chunks
+
+        Args:
+            file: FileStorage from request.files
+            spool_dir: Directory for pending uploads
+
+        Returns:
+            str: Path of the spooled file
+        """
+        os.makedirs(spool_dir, exist_ok=True)
+        ext = os.path.splitext(secure_filename(file.filename))[1].lower()
+        fd, path = tempfile.mkstemp(suffix=ext, dir=spool_dir)
+        with os.fdopen(fd, 'wb') as out:
+            file.save(out)
+        return path
+
+    def submit(self, app, path, folder, model, row_id):
+        """
+        Queue a spooled file for upload
+
+        Args:
+            app: Flask application the worker runs in
+            path: Path returned by spool()
+            folder: Storage folder
+            model: Model class with image_url and thumbnail_url columns
+            row_id: Primary key of the row to patch once uploaded
+
+        Returns:
+            dict: The job record
+        """
+        job = {'id': uuid.uuid4().hex, 'status': 'queued', 'target': model.__tablename__, 'target_id': row_id}
+        with self._lock:
+            self._jobs[job['id']] = job
+            while len(self._jobs) > MAX_TRACKED_JOBS:
+                self._jobs.popitem(last=False)
+            record = dict(job)
+        self._pool(app).submit(self._run, app, job, path, folder, model, row_id)
+        return record
+
+    def get(self, job_id):
+        """Return a copy of the job record, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _run(self, app, job, path, folder, model, row_id):
+        job['status'] = 'running'
+        files = [path]
+        try:
+            with app.app_context():
+                storage = get_storage(app.config)
+                thumbnail_path = None
+                
+                if app.config.get('IMAGE_PREPROCESS', True):
+                    variants = preprocess_image(
+                        path,
+                        image_format=app.config.get('IMAGE_OUTPUT_FORMAT', 'webp'),
+                        quality=app.config.get('IMAGE_QUALITY', 80)
+                    )
+                    base = os.path.splitext(path)[0]
+                    path = base + variants['extension']
+                    thumbnail_path = base + THUMBNAIL_SUFFIX + variants['extension']
+                    for variant, target in (('image', path), ('thumbnail', thumbnail_path)):
+                        with open(target, 'wb') as out:
+                            out.write(variants[variant])
+                        files.append(target)
+                
+                result = storage.save(path, folder)
+                if 'error' in result:
+                    raise RuntimeError(result['error'])
+                
+                thumbnail_url = None
+                if thumbnail_path:
+                    # Stored next to the main image, see generate_image_url()
+                    name = result['public_id'].rsplit('/', 1)[-1] + THUMBNAIL_SUFFIX
+                    thumbnail = storage.save(thumbnail_path, folder, public_id=name)
+                    if 'error' in thumbnail:
+                        raise RuntimeError(thumbnail['error'])
+                    thumbnail_url = job['thumbnail_url'] = thumbnail['url']
+
+                row = db.session.get(model, row_id)
+                if row is not None:
+                    row.image_url = result['url']
+                    row.thumbnail_url = thumbnail_url
+                    db.session.commit()
+                    menu_cache.invalidate()
+
+                job['url'] = result['url']
+                job['status'] = 'done'
+        except Exception as e:
+            app.logger.error(f"Image upload {job['id']} failed: {str(e)}")
+            job['error'] = str(e)
+            job['status'] = 'failed'
+        finally:
+            for spooled in files:
+                try:
+                    os.remove(spooled)
+                except OSError:
+                    pass
+
+upload_queue = UploadQueue()
+
+def queue_image_upload(file, folder, model, row_id):
+    """
+    Spool an uploaded image and queue it for the row's image_url
+
+    Args:
+        file: FileStorage from request.files
+        folder: Storage folder
+        model: Model class with image_url and thumbnail_url columns
+        row_id: Primary key of the row to patch
+
+    Returns:
+        dict: The job record
+    """
+    app = current_app._get_current_object()
+    path = upload_queue.spool(file, app.config['UPLOAD_SPOOL_DIR'])
+    return upload_queue.submit(app, path, folder, model, row_id)
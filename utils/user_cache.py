@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from models.user import User
+from utils.database import db
+
+class UserCache:
+    """
+    Bounded TTL cache of serialized user profiles
+
+    Holds User.to_dict() output rather than ORM objects, so entries are safe
+    to share across requests and threads. Profile writes must call
+    invalidate(); the TTL bounds staleness for changes made by other workers
+    or outside the API.
+    """
+
+    def __init__(self, ttl=60, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def set(self, user_id, profile, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[user_id] = (expires_at, profile)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+user_cache = UserCache()
+
+def get_user_profile(user_id):
+    """
+    Return the user's profile dict, from the cache when possible
+
+    Args:
+        user_id: User primary key (the JWT identity)
+
+    Returns:
+        dict: User.to_dict() output, or None if the user does not exist
+    """
+    user_id = int(user_id)
+    profile = user_cache.get(user_id)
+    if profile is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        profile = user.to_dict()
+        user_cache.set(user_id, profile, ttl=current_app.config.get('USER_CACHE_TTL'))
+    return profile
+
+def invalidate_user(user_id):
+    """Drop a user's cached profile after it changed"""
+    user_cache.invalidate(int(user_id))